@@ -106,6 +106,9 @@ _check_number_of_arguments () {
 # No arguments expected
 
 check_address_counter_file () {
+    # the read + increment + write is done under an exclusive lock (scripts can run in parallel)
+    exec 9>$address_counter_filepath.lock
+    flock 9
     if [ -f $address_counter_filepath ]; then
         info_msg "Counter file ${address_counter_filepath} exists - read the counter and increment by 1"
         address_counter_value=$(cat $address_counter_filepath)
@@ -118,11 +121,16 @@ check_address_counter_file () {
         echo 2 > $address_counter_filepath
         export address_counter_value=2
     fi
+    flock -u 9
+    exec 9>&-
 }
 
 # No arguments expected
 
 check_pool_counter_file () {
+    # the read + increment + write is done under an exclusive lock (scripts can run in parallel)
+    exec 9>$pool_counter_filepath.lock
+    flock 9
     if [ -f $pool_counter_filepath ]; then
         info_msg "Counter file $pool_counter_filepath exists - read the counter and increment by 1"
         pool_counter_value=$(cat $pool_counter_filepath)
@@ -135,6 +143,8 @@ check_pool_counter_file () {
         echo 2 > $pool_counter_filepath
         export pool_counter_value=2
     fi
+    flock -u 9
+    exec 9>&-
 }
 
 # No arguments expected
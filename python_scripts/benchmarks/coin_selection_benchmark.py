@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+# TO DO: this could be moved out of the scripts (somehow..)
+dir_path = os.path.dirname(os.path.realpath(__file__))
+parent_dir_path = os.path.abspath(os.path.join(dir_path, os.pardir))
+sys.path.insert(0, parent_dir_path)
+
+from e2e_scenarios.coin_selection import COIN_SELECTION_STRATEGIES, select_coins, CoinSelectionError
+from e2e_scenarios.fee_estimator import estimate_extra_inputs_fee, estimate_tx_out_fee
+from e2e_scenarios.utxo import UTxO
+
+# Benchmark the coin selection strategies against a synthetic utxo set (no node is needed)
+# Usage: ./coin_selection_benchmark.py --utxos 10000 --payments 100 --max-inputs 100
+
+PROTOCOL_PARAMS = {"minFeeA": 44, "minFeeB": 155381}
+
+
+def generate_utxos(no_of_utxos, rng):
+    # mostly small utxos (like the ones created by the fan-out scenarios) and a few big ones
+    utxos = []
+    for ix in range(no_of_utxos):
+        amount = int(rng.lognormvariate(14, 2)) + 1000000
+        utxos.append(UTxO("%064x" % rng.getrandbits(256), ix % 256, amount))
+    return utxos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coin selection strategies benchmark")
+    parser.add_argument("--utxos", type=int, default=10000, help="number of utxos in the synthetic utxo set")
+    parser.add_argument("--payments", type=int, default=100, help="number of payments to select inputs for")
+    parser.add_argument("--max-inputs", type=int, default=100, help="max number of inputs per transaction")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    utxos = generate_utxos(args.utxos, rng)
+    balance = sum(utxo.amount for utxo in utxos)
+    payments = [rng.randint(1000000, balance // (args.max_inputs * 10)) for _ in range(args.payments)]
+
+    def fee_for_inputs(no_of_inputs):
+        return estimate_extra_inputs_fee(PROTOCOL_PARAMS, no_of_inputs)
+
+    print(f"utxos: {args.utxos}; balance: {balance}; payments: {args.payments}; max_inputs: {args.max_inputs}")
+    print(f"{'strategy':<20}{'total time (s)':>16}{'avg inputs':>12}{'avg change':>16}{'failures':>10}")
+    for strategy in COIN_SELECTION_STRATEGIES:
+        total_inputs, total_change, failures = 0, 0, 0
+        start_time = perf_counter()
+        for amount in payments:
+            try:
+                selected = select_coins(utxos, amount, strategy=strategy, fee_for_inputs=fee_for_inputs,
+                                        max_inputs=args.max_inputs, rng=random.Random(args.seed),
+                                        change_cost=estimate_tx_out_fee(PROTOCOL_PARAMS))
+            except CoinSelectionError:
+                failures += 1
+                continue
+            total_inputs += len(selected)
+            total_change += sum(utxo.amount for utxo in selected) - amount - fee_for_inputs(len(selected))
+        duration = perf_counter() - start_time
+        successes = max(args.payments - failures, 1)
+        print(f"{strategy:<20}{duration:>16.3f}{total_inputs / successes:>12.1f}{total_change // successes:>16}"
+              f"{failures:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from time import monotonic, sleep
+
+# TO DO: this could be moved out of the scripts (somehow..)
+dir_path = os.path.dirname(os.path.realpath(__file__))
+parent_dir_path = os.path.abspath(os.path.join(dir_path, os.pardir))
+sys.path.insert(0, parent_dir_path)
+
+from e2e_scenarios.constants import TESTS_ROOT_DIR_PATH, USER1_SKEY_FILE_PATH, get_user1_address
+from e2e_scenarios.faucet import get_faucet_pool
+from e2e_scenarios.utils import create_payment_key_pair_and_address, read_address_from_file, calculate_tx_fee, \
+    get_current_tip, get_protocol_params, get_address_utxo_set, send_funds, wait_for_tx, build_raw_transaction, \
+    sign_raw_transaction, submit_raw_transaction, tip_watcher
+from e2e_scenarios.utxo import UTxO
+
+# Transaction load generator / TPS benchmark
+# 1. fan-out: chained split txs (submitted back-to-back) create txs * inputs utxos in the load generator wallet
+# 2. build and sign all the txs (txs * (inputs -> outputs)) in parallel, before the submission starts
+# 3. submit them from many workers at a target rate (or as fast as possible)
+# 4. report the achieved TPS, the submit latency percentiles and the rejection reasons
+# Usage (from the root directory - the one containing e2e-tests-directory):
+#   ./python_scripts/benchmarks/tx_load_generator.py --txs 10000 --inputs 1 --outputs 2 --workers 8 --tps 50
+
+LOAD_GENERATOR_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, "load-generator")
+WALLET_NAME = "load"
+
+# wrappers of the ledger failures in the 'transaction submit' errors; the reason is the first name that is not one
+# ex: ApplyTxError [LedgerFailure (UtxowFailure (UtxoFailure (ValueNotConservedUTxO (Coin 1) (Coin 2))))]
+REJECTION_WRAPPER_SUFFIXES = ("Failure", "Error")
+
+
+def get_rejection_reason(output):
+    for name in re.findall(r"[\[(]([A-Z][A-Za-z0-9]+)", output or ""):
+        if not name.endswith(REJECTION_WRAPPER_SUFFIXES):
+            return name
+    lines = (output or "").strip().splitlines()
+    return lines[0][:100] if lines else "unknown"
+
+
+def get_percentile(sorted_values, percentile):
+    # nearest-rank percentile
+    if not sorted_values:
+        return 0
+    index = max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def get_wallet():
+    location = os.path.join(LOAD_GENERATOR_DIR_PATH, "wallet")
+    Path(location).mkdir(parents=True, exist_ok=True)
+    skey_file = os.path.join(location, WALLET_NAME + ".skey")
+    if os.path.isfile(skey_file) and os.path.isfile(os.path.join(location, WALLET_NAME + ".addr")):
+        return read_address_from_file(location, WALLET_NAME + ".addr"), skey_file
+    address, _, skey_file = create_payment_key_pair_and_address(location, WALLET_NAME)
+    return address, skey_file
+
+
+def fan_out(faucet_address, faucet_skey, address, no_of_utxos, utxo_amount, batch_size, ttl):
+    # chained split txs: each one spends the change of the previous one, so they are all submitted without waiting
+    # for blocks; returns the list of the created utxos
+    faucet_pool = get_faucet_pool(faucet_address)
+    # the faucet pool (if any) hands out the faucet utxos; otherwise the utxo set is updated locally by send_funds
+    faucet_utxo_set = None if faucet_pool else get_address_utxo_set(faucet_address)
+    utxos, tx_ids = [], []
+    while len(utxos) < no_of_utxos:
+        batch = min(batch_size, no_of_utxos - len(utxos))
+        tx_fee = calculate_tx_fee(1, batch + 1, ttl, signing_keys=[faucet_skey])
+        tx_id = send_funds(faucet_address, tx_fee, ttl,
+                           destinations_list=[address] * batch,
+                           transferred_amounts=[utxo_amount] * batch,
+                           signing_keys=[faucet_skey],
+                           utxo_set=faucet_utxo_set)
+        tx_ids.append(tx_id)
+        utxos += [UTxO(tx_id, tx_ix, utxo_amount, address) for tx_ix in range(batch)]
+    for tx_id in tx_ids:
+        wait_for_tx(tx_id, [address])
+    return utxos
+
+
+def prepare_txs(utxos, no_of_txs, no_of_inputs, no_of_outputs, address, skey_file, ttl, work_dir, no_of_workers):
+    # returns the list of the signed tx files
+    tx_fee = calculate_tx_fee(no_of_inputs, no_of_outputs, ttl, signing_keys=[skey_file])
+    min_utxo_value = get_protocol_params().get("minUTxOValue", 0) or 0
+    output_amount = (no_of_inputs * utxos[0].amount - tx_fee) // no_of_outputs
+    if output_amount < max(min_utxo_value, 1):
+        print(f"ERROR: the outputs would be of {output_amount} Lovelace (min: {min_utxo_value}); "
+              f"use a bigger --utxo-amount")
+        exit(2)
+
+    def prepare_tx(tx_no):
+        inputs = utxos[tx_no * no_of_inputs:(tx_no + 1) * no_of_inputs]
+        # the change of the rounding goes to the fee
+        fee = sum(utxo.amount for utxo in inputs) - output_amount * no_of_outputs
+        build_result = build_raw_transaction(ttl, fee,
+                                             tx_in=[utxo.tx_in for utxo in inputs],
+                                             tx_out=[f"{address}+{output_amount}"] * no_of_outputs,
+                                             out_file=os.path.join(work_dir, f"tx{tx_no}.body"))
+        if not build_result[0]:
+            raise RuntimeError(f"tx {tx_no} not successfully built --> {build_result[1]}")
+        sign_result = sign_raw_transaction(build_result[1], signing_keys=[skey_file],
+                                           out_file=os.path.join(work_dir, f"tx{tx_no}.signed"))
+        if not sign_result[0]:
+            raise RuntimeError(f"tx {tx_no} not successfully signed --> {sign_result[1]}")
+        return sign_result[1]
+
+    with ThreadPoolExecutor(max_workers=no_of_workers) as executor:
+        return list(executor.map(prepare_tx, range(no_of_txs)))
+
+
+def submit_txs(tx_files, no_of_workers, tps):
+    # tx i is submitted at (start + i / tps) (or right away when tps = 0) by the first free worker
+    # returns the list of (tx_file, accepted, submit start, submit duration, error output)
+    next_tx_no = iter(range(len(tx_files)))
+    next_tx_lock = Lock()
+    results = []
+    start = monotonic()
+
+    def worker():
+        while True:
+            with next_tx_lock:
+                tx_no = next(next_tx_no, None)
+            if tx_no is None:
+                return
+            if tps:
+                delay = start + tx_no / tps - monotonic()
+                if delay > 0:
+                    sleep(delay)
+            submit_start = monotonic()
+            result = submit_raw_transaction(tx_files[tx_no])
+            submit_duration = monotonic() - submit_start
+            results.append((tx_files[tx_no], result[0], submit_start - start, submit_duration,
+                            None if result[0] else result[1]))
+
+    with ThreadPoolExecutor(max_workers=no_of_workers) as executor:
+        futures = [executor.submit(worker) for _ in range(no_of_workers)]
+    # re-raises the error of a failed worker (instead of a report missing its txs)
+    for future in futures:
+        future.result()
+    return results
+
+
+def get_report(results, args, prepare_duration):
+    accepted = [result for result in results if result[1]]
+    latencies = sorted(result[3] for result in results)
+    submit_duration = max((result[2] + result[3] for result in results), default=0)
+    return {
+        "txs": len(results),
+        "inputs": args.inputs,
+        "outputs": args.outputs,
+        "workers": args.workers,
+        "target_tps": args.tps,
+        "prepare_seconds": round(prepare_duration, 3),
+        "submit_seconds": round(submit_duration, 3),
+        "accepted": len(accepted),
+        "rejected": len(results) - len(accepted),
+        "achieved_tps": round(len(accepted) / submit_duration, 2) if submit_duration else 0,
+        "latency_seconds": {f"p{p}": round(get_percentile(latencies, p), 4) for p in (50, 90, 95, 99, 100)},
+        "rejection_reasons": dict(Counter(get_rejection_reason(result[4]) for result in results if not result[1])),
+    }
+
+
+def print_report(report):
+    print("======================== Load generator report ========================")
+    print(f"txs: {report['txs']} ({report['inputs']} inputs / {report['outputs']} outputs); "
+          f"workers: {report['workers']}; target TPS: {report['target_tps'] or 'max'}")
+    print(f"build + sign: {report['prepare_seconds']} seconds; submit: {report['submit_seconds']} seconds")
+    print(f"accepted: {report['accepted']}; rejected: {report['rejected']}; achieved TPS: {report['achieved_tps']}")
+    print(f"submit latency (seconds): {report['latency_seconds']}")
+    for reason, count in sorted(report["rejection_reasons"].items(), key=lambda item: -item[1]):
+        print(f"  rejected - {reason}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transaction load generator / TPS benchmark")
+    parser.add_argument("--txs", type=int, default=1000, help="number of transactions")
+    parser.add_argument("--inputs", type=int, default=1, help="number of inputs of each transaction")
+    parser.add_argument("--outputs", type=int, default=1, help="number of outputs of each transaction")
+    parser.add_argument("--workers", type=int, default=4, help="number of submitting workers")
+    parser.add_argument("--build-workers", type=int, default=os.cpu_count(),
+                        help="number of workers building and signing the transactions")
+    parser.add_argument("--tps", type=float, default=0, help="target submission rate; 0 = as fast as possible")
+    parser.add_argument("--utxo-amount", type=int, default=5000000, help="Lovelace in each fan-out utxo")
+    parser.add_argument("--split-batch", type=int, default=100, help="number of outputs of each fan-out tx")
+    parser.add_argument("--ttl-slots", type=int, default=10000, help="ttl of the transactions (from the tip)")
+    parser.add_argument("--report-file", default=None, help="write the report to this JSON file")
+    parser.add_argument("--keep-files", action="store_true", help="don't remove the tx files")
+    args = parser.parse_args()
+
+    address, skey_file = get_wallet()
+    ttl = get_current_tip(exact=True) + args.ttl_slots
+    work_dir = tempfile.mkdtemp(prefix="run_", dir=LOAD_GENERATOR_DIR_PATH)
+    try:
+        print(f"====== Fan-out: {args.txs * args.inputs} utxos of {args.utxo_amount} Lovelace for {address}")
+        with tip_watcher:
+            utxos = fan_out(get_user1_address(), USER1_SKEY_FILE_PATH, address, args.txs * args.inputs,
+                            args.utxo_amount, args.split_batch, ttl)
+
+        print(f"====== Build and sign {args.txs} transactions in {work_dir}")
+        prepare_start = monotonic()
+        tx_files = prepare_txs(utxos, args.txs, args.inputs, args.outputs, address, skey_file, ttl, work_dir,
+                               args.build_workers)
+        prepare_duration = monotonic() - prepare_start
+
+        print(f"====== Submit {args.txs} transactions with {args.workers} workers")
+        report = get_report(submit_txs(tx_files, args.workers, args.tps), args, prepare_duration)
+    finally:
+        if not args.keep_files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.report_file:
+        with open(args.report_file, 'w') as file:
+            file.write(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
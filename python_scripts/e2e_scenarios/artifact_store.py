@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+from threading import Lock
+from time import time
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)))
+
+from e2e_scenarios.constants import ARTIFACTS_DIR_PATH, ARTIFACT_STORE_DB_PATH
+
+# seconds to wait for the database lock held by another process (ex: parallel scenarios)
+DB_LOCK_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    scenario TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    work_dir TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT,
+    value TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_role ON artifacts (kind, name);
+CREATE INDEX IF NOT EXISTS artifacts_by_run ON artifacts (run_id);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ArtifactStore:
+    # catalog (SQLite) of the files created by the scenarios: every run gets its own work directory (so parallel
+    # runs of the same scenario never collide) and every key, address, certificate and tx file is indexed by its
+    # role (kind + name), so it can be found without walking the directories
+    # - runs: 1 row per scenario run (+ its work directory); finished is set when the process exits
+    # - artifacts: (kind, name) = role; ex: ("payment_skey", "addr0"), ("pool_registration_cert", "node1")
+    # - counters: named counters incremented atomically (ex: the address/pool counters of the bash scripts)
+    def __init__(self, db_path=ARTIFACT_STORE_DB_PATH, artifacts_dir_path=ARTIFACTS_DIR_PATH):
+        self.db_path = db_path
+        self.artifacts_dir_path = artifacts_dir_path
+        self.run_id = None
+        self.work_dir = None
+        self._connection = None
+        self._lock = Lock()
+
+    def _connect(self):
+        # 1 connection per store (the store is used by the threads of 1 process under self._lock)
+        if self._connection is None:
+            Path(os.path.dirname(self.db_path) or ".").mkdir(parents=True, exist_ok=True)
+            # isolation_level=None: the transactions are started explicitly (BEGIN IMMEDIATE for the writes)
+            self._connection = sqlite3.connect(self.db_path, timeout=DB_LOCK_TIMEOUT, isolation_level=None,
+                                               check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _write(self, statements):
+        # statements = function receiving the connection; it runs inside 1 write transaction; BEGIN IMMEDIATE
+        # takes the database write lock before the first read, so read-modify-write sequences are atomic
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(connection)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            return result
+
+    def _read(self, query, parameters=()):
+        with self._lock:
+            return [dict(row) for row in self._connect().execute(query, parameters).fetchall()]
+
+    def next_counter(self, name, initial=2):
+        # the new value of the counter (initial for a new counter; same as check_address_counter_file)
+        def increment(connection):
+            row = connection.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+            value = initial if row is None else row["value"] + 1
+            connection.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, value))
+            return value
+        return self._write(increment)
+
+    def get_counter(self, name):
+        rows = self._read("SELECT value FROM counters WHERE name = ?", (name,))
+        return rows[0]["value"] if rows else None
+
+    def start_run(self, scenario):
+        # creates the (unique) work directory of this run; returns its path
+        run_id = f"{scenario}_{int(time())}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        work_dir = os.path.join(self.artifacts_dir_path, scenario, run_id)
+        Path(work_dir).mkdir(parents=True, exist_ok=True)
+        self._write(lambda connection: connection.execute(
+            "INSERT INTO runs (run_id, scenario, pid, work_dir, started) VALUES (?, ?, ?, ?, ?)",
+            (run_id, scenario, os.getpid(), work_dir, time())))
+        self.run_id, self.work_dir = run_id, work_dir
+        return work_dir
+
+    def finish_run(self, run_id=None):
+        run_id = run_id or self.run_id
+        if run_id:
+            self._write(lambda connection: connection.execute(
+                "UPDATE runs SET finished = ? WHERE run_id = ?", (time(), run_id)))
+
+    def add(self, kind, name, path=None, value=None, run_id=None):
+        # index 1 artifact of the current run (ignored when no run was started, ex: the runner/benchmark files)
+        run_id = run_id or self.run_id
+        if not run_id:
+            return
+        self._write(lambda connection: connection.execute(
+            "INSERT INTO artifacts (run_id, kind, name, path, value, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, kind, name, path, value, time())))
+
+    def find(self, kind=None, name=None, run_id=None, scenario=None):
+        # the artifacts with the given role (any of the filters can be omitted), the newest first;
+        # each artifact: {"run_id", "scenario", "kind", "name", "path", "value", "created"}
+        conditions, parameters = [], []
+        for column, value in (("a.kind", kind), ("a.name", name), ("a.run_id", run_id), ("r.scenario", scenario)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        query = ("SELECT a.run_id, r.scenario, a.kind, a.name, a.path, a.value, a.created "
+                 "FROM artifacts a JOIN runs r ON a.run_id = r.run_id")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return self._read(query + " ORDER BY a.id DESC", parameters)
+
+    def find_one(self, kind, name, run_id=None):
+        # the newest artifact with this role in the current run (or the given run); None if not found
+        artifacts = self.find(kind=kind, name=name, run_id=run_id or self.run_id)
+        return artifacts[0] if artifacts else None
+
+    def get_runs(self, scenario=None):
+        if scenario is None:
+            return self._read("SELECT * FROM runs ORDER BY started DESC")
+        return self._read("SELECT * FROM runs WHERE scenario = ? ORDER BY started DESC", (scenario,))
+
+    def gc(self, keep_runs=1, max_age=None):
+        # deletes the work directories (and the catalog rows) of the old runs: for each scenario, the last
+        # keep_runs finished runs are kept (for debugging) and, if max_age is given, only the runs older than
+        # max_age seconds are deleted; the runs still in progress are never deleted (their process is alive)
+        # returns the list of the deleted run ids
+        now = time()
+        to_delete = []
+        for run in self.get_runs():
+            in_progress = run["finished"] is None and _is_process_alive(run["pid"])
+            if in_progress or run["run_id"] == self.run_id:
+                continue
+            if max_age is not None and now - run["started"] < max_age:
+                continue
+            to_delete.append(run)
+        kept_per_scenario = {}
+        for run in list(to_delete):
+            kept_per_scenario[run["scenario"]] = kept_per_scenario.get(run["scenario"], 0) + 1
+            if kept_per_scenario[run["scenario"]] <= keep_runs:
+                to_delete.remove(run)
+
+        for run in to_delete:
+            shutil.rmtree(run["work_dir"], ignore_errors=True)
+        self._write(lambda connection: connection.executemany(
+            "DELETE FROM runs WHERE run_id = ?", [(run["run_id"],) for run in to_delete]))
+        return [run["run_id"] for run in to_delete]
+
+
+def main():
+    # command line access to the store (ex: the counters used by the bash scripts)
+    parser = argparse.ArgumentParser(description="Query/update the artifact store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    counter_parser = subparsers.add_parser("next-counter", help="increment a counter and print its new value")
+    counter_parser.add_argument("name")
+    counter_parser.add_argument("--initial", type=int, default=2)
+    find_parser = subparsers.add_parser("find", help="print the values (or paths) of the artifacts with a role")
+    find_parser.add_argument("kind")
+    find_parser.add_argument("name", nargs="?")
+    find_parser.add_argument("--scenario", default=None)
+    gc_parser = subparsers.add_parser("gc", help="delete the work directories of the old runs")
+    gc_parser.add_argument("--keep-runs", type=int, default=1)
+    gc_parser.add_argument("--max-age", type=int, default=None, help="seconds")
+    args = parser.parse_args()
+
+    store = ArtifactStore()
+    if args.command == "next-counter":
+        print(store.next_counter(args.name, initial=args.initial))
+    elif args.command == "find":
+        for artifact in store.find(kind=args.kind, name=args.name, scenario=args.scenario):
+            print(artifact["path"] if artifact["value"] is None else artifact["value"])
+    elif args.command == "gc":
+        deleted_runs = store.gc(keep_runs=args.keep_runs, max_age=args.max_age)
+        print(f"Deleted {len(deleted_runs)} run(s)")
+
+
+if __name__ == "__main__":
+    main()
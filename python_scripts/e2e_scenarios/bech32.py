@@ -0,0 +1,66 @@
+# Bech32 (BIP 173) encoding/decoding used for the Shelley addresses (ex: addr_test1...); unlike BIP 173,
+# there is no 90 characters limit (the Shelley base addresses are longer)
+
+CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+
+
+class Bech32Error(ValueError):
+    pass
+
+
+def _polymod(values):
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            checksum ^= GENERATOR[i] if ((top >> i) & 1) else 0
+    return checksum
+
+
+def _hrp_expand(hrp):
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+
+def _create_checksum(hrp, data):
+    polymod = _polymod(_hrp_expand(hrp) + data + [0, 0, 0, 0, 0, 0]) ^ 1
+    return [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+
+
+def _convert_bits(data, from_bits, to_bits, pad=True):
+    accumulator, bits, result = 0, 0, []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & max_value)
+    if pad and bits:
+        result.append((accumulator << (to_bits - bits)) & max_value)
+    elif not pad and (bits >= from_bits or ((accumulator << (to_bits - bits)) & max_value)):
+        raise Bech32Error("invalid padding")
+    return result
+
+
+def encode(hrp, data):
+    # data = bytes (ex: the address header + key hash)
+    values = _convert_bits(data, 8, 5)
+    return hrp + "1" + "".join(CHARSET[v] for v in values + _create_checksum(hrp, values))
+
+
+def decode(bech32_string):
+    # returns (hrp, data bytes)
+    bech32_string = bech32_string.lower()
+    separator = bech32_string.rfind("1")
+    if separator < 1 or separator + 7 > len(bech32_string):
+        raise Bech32Error(f"invalid bech32 string: {bech32_string}")
+    hrp = bech32_string[:separator]
+    try:
+        values = [CHARSET.index(c) for c in bech32_string[separator + 1:]]
+    except ValueError:
+        raise Bech32Error(f"invalid bech32 character in {bech32_string}")
+    if _polymod(_hrp_expand(hrp) + values) != 1:
+        raise Bech32Error(f"invalid bech32 checksum: {bech32_string}")
+    return hrp, bytes(_convert_bits(values[:-6], 5, 8, pad=False))
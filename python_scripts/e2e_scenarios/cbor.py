@@ -0,0 +1,201 @@
+import struct
+
+# Minimal CBOR (RFC 7049) encoder/decoder for the structures used by the Shelley transactions and the
+# node-to-client mini-protocols: unsigned/negative integers, byte/text strings, arrays, maps, tags,
+# simple values (false, true, null) and floats.
+
+MAJOR_UINT = 0
+MAJOR_NEGINT = 1
+MAJOR_BYTES = 2
+MAJOR_TEXT = 3
+MAJOR_ARRAY = 4
+MAJOR_MAP = 5
+MAJOR_TAG = 6
+MAJOR_SIMPLE = 7
+
+INDEFINITE_LENGTH = 31
+BREAK = 0xff
+
+
+class CBORTag:
+    __slots__ = ("tag", "value")
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, CBORTag) and (self.tag, self.value) == (other.tag, other.value)
+
+    def __repr__(self):
+        return f"CBORTag({self.tag}, {self.value!r})"
+
+
+class CBORDecodeError(ValueError):
+    pass
+
+
+class RawCBOR:
+    # already encoded CBOR data, written as it is by encode()
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = bytes(data)
+
+
+def encode_head(major_type, value):
+    if value < 24:
+        return bytes([(major_type << 5) | value])
+    if value < 2 ** 8:
+        return bytes([(major_type << 5) | 24, value])
+    if value < 2 ** 16:
+        return bytes([(major_type << 5) | 25]) + struct.pack(">H", value)
+    if value < 2 ** 32:
+        return bytes([(major_type << 5) | 26]) + struct.pack(">I", value)
+    return bytes([(major_type << 5) | 27]) + struct.pack(">Q", value)
+
+
+def encode(value):
+    # dicts are encoded in their insertion order (the caller is responsible for the canonical key order)
+    if value is None:
+        return b"\xf6"
+    if value is True:
+        return b"\xf5"
+    if value is False:
+        return b"\xf4"
+    if isinstance(value, int):
+        if value >= 0:
+            return encode_head(MAJOR_UINT, value)
+        return encode_head(MAJOR_NEGINT, -1 - value)
+    if isinstance(value, (bytes, bytearray)):
+        return encode_head(MAJOR_BYTES, len(value)) + bytes(value)
+    if isinstance(value, str):
+        encoded = value.encode("utf-8")
+        return encode_head(MAJOR_TEXT, len(encoded)) + encoded
+    if isinstance(value, (list, tuple)):
+        return encode_head(MAJOR_ARRAY, len(value)) + b"".join(encode(item) for item in value)
+    if isinstance(value, dict):
+        return encode_head(MAJOR_MAP, len(value)) + \
+               b"".join(encode(key) + encode(item) for key, item in value.items())
+    if isinstance(value, CBORTag):
+        return encode_head(MAJOR_TAG, value.tag) + encode(value.value)
+    if isinstance(value, RawCBOR):
+        return value.data
+    if isinstance(value, float):
+        return b"\xfb" + struct.pack(">d", value)
+    raise TypeError(f"Can't CBOR encode {type(value)}")
+
+
+def _decode_head(data, offset):
+    if offset >= len(data):
+        raise CBORDecodeError("unexpected end of data")
+    initial_byte = data[offset]
+    major_type, additional_info = initial_byte >> 5, initial_byte & 0x1f
+    offset += 1
+    if additional_info < 24:
+        return major_type, additional_info, offset
+    if additional_info == INDEFINITE_LENGTH:
+        return major_type, None, offset
+    size = {24: 1, 25: 2, 26: 4, 27: 8}.get(additional_info)
+    if size is None or offset + size > len(data):
+        raise CBORDecodeError(f"invalid additional info {additional_info} at offset {offset - 1}")
+    return major_type, int.from_bytes(data[offset:offset + size], "big"), offset + size
+
+
+def decode_item(data, offset=0):
+    # returns (value, offset of the next item)
+    initial_byte_offset = offset
+    major_type, value, offset = _decode_head(data, offset)
+    if major_type == MAJOR_UINT:
+        return value, offset
+    if major_type == MAJOR_NEGINT:
+        return -1 - value, offset
+    if major_type in (MAJOR_BYTES, MAJOR_TEXT):
+        if value is None:
+            chunks = []
+            while data[offset] != BREAK:
+                chunk, offset = decode_item(data, offset)
+                chunks.append(chunk)
+            result = (b"" if major_type == MAJOR_BYTES else "").join(chunks)
+            return result, offset + 1
+        if offset + value > len(data):
+            raise CBORDecodeError("unexpected end of data")
+        raw = bytes(data[offset:offset + value])
+        return (raw if major_type == MAJOR_BYTES else raw.decode("utf-8")), offset + value
+    if major_type == MAJOR_ARRAY:
+        items = []
+        if value is None:
+            while data[offset] != BREAK:
+                item, offset = decode_item(data, offset)
+                items.append(item)
+            return items, offset + 1
+        for _ in range(value):
+            item, offset = decode_item(data, offset)
+            items.append(item)
+        return items, offset
+    if major_type == MAJOR_MAP:
+        items = {}
+        count = 0
+        while (data[offset] != BREAK) if value is None else (count < value):
+            key, offset = decode_item(data, offset)
+            item, offset = decode_item(data, offset)
+            # arrays (ex: tx inputs) can't be dict keys
+            items[tuple(key) if isinstance(key, list) else key] = item
+            count += 1
+        return items, (offset + 1 if value is None else offset)
+    if major_type == MAJOR_TAG:
+        item, offset = decode_item(data, offset)
+        return CBORTag(value, item), offset
+    # major type 7: simple values and floats
+    additional_info = data[initial_byte_offset] & 0x1f
+    if additional_info == 20:
+        return False, offset
+    if additional_info == 21:
+        return True, offset
+    if additional_info in (22, 23):
+        return None, offset
+    if additional_info == 25:
+        return _decode_half_float(data[offset - 2:offset]), offset
+    if additional_info == 26:
+        return struct.unpack(">f", data[offset - 4:offset])[0], offset
+    if additional_info == 27:
+        return struct.unpack(">d", data[offset - 8:offset])[0], offset
+    return value, offset
+
+
+def _decode_half_float(raw):
+    half = int.from_bytes(raw, "big")
+    exponent, mantissa = (half >> 10) & 0x1f, half & 0x3ff
+    if exponent == 0:
+        result = mantissa * 2 ** -24
+    elif exponent == 31:
+        result = float("inf") if mantissa == 0 else float("nan")
+    else:
+        result = (mantissa + 1024) * 2 ** (exponent - 25)
+    return -result if half & 0x8000 else result
+
+
+def decode(data):
+    value, offset = decode_item(data, 0)
+    if offset != len(data):
+        raise CBORDecodeError(f"{len(data) - offset} bytes left after the CBOR item")
+    return value
+
+
+def get_item_end(data, offset=0):
+    # offset of the first byte after the item starting at offset
+    return decode_item(data, offset)[1]
+
+
+def split_array(data, offset=0):
+    # the raw CBOR (bytes) of each element of the (definite length) array starting at offset;
+    # used when the exact encoding of an element matters (ex: for hashing the tx body)
+    major_type, length, offset = _decode_head(data, offset)
+    if major_type != MAJOR_ARRAY or length is None:
+        raise CBORDecodeError("a definite length CBOR array was expected")
+    items = []
+    for _ in range(length):
+        end = get_item_end(data, offset)
+        items.append(bytes(data[offset:end]))
+        offset = end
+    return items
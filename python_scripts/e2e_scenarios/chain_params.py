@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import datetime, timezone
+from threading import Lock
+from time import time
+
+from e2e_scenarios.constants import GENESIS_FILE_PATH
+
+# used only when the genesis file is not available (ex: when the scripts are run outside of the test cluster)
+DEFAULT_CHAIN_PARAMS = {
+    "slotLength": 0.1,
+    "epochLength": 1500,
+    "slotsPerKESPeriod": 129600,
+    "maxKESEvolutions": 60,
+    "systemStart": None,
+}
+
+
+def parse_system_start(system_start):
+    # "2020-07-28T20:00:00Z" (the fraction of the second is optional) -> POSIX timestamp
+    system_start = system_start.replace("Z", "+00:00")
+    start = datetime.fromisoformat(system_start)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return start.timestamp()
+
+
+class ChainParams:
+    # the chain parameters from the (Shelley) genesis file; the file is read only once per process
+    def __init__(self, genesis_file_path=GENESIS_FILE_PATH):
+        self.genesis_file_path = genesis_file_path
+        self._params = None
+        self._system_start = None
+        self._lock = Lock()
+
+    def _get(self, name):
+        with self._lock:
+            if self._params is None:
+                self._params = dict(DEFAULT_CHAIN_PARAMS)
+                if os.path.isfile(self.genesis_file_path):
+                    with open(self.genesis_file_path, 'r') as file:
+                        genesis = json.loads(file.read())
+                    self._params.update({key: genesis[key] for key in DEFAULT_CHAIN_PARAMS if key in genesis})
+                else:
+                    print(f"WARNING: genesis file not found ({self.genesis_file_path}); using the default chain "
+                          f"parameters: {DEFAULT_CHAIN_PARAMS}")
+                if self._params["systemStart"]:
+                    self._system_start = parse_system_start(self._params["systemStart"])
+            return self._params[name]
+
+    def reload(self):
+        with self._lock:
+            self._params = None
+            self._system_start = None
+
+    @property
+    def slot_length(self):
+        return float(self._get("slotLength"))
+
+    @property
+    def epoch_length(self):
+        return int(self._get("epochLength"))
+
+    @property
+    def slots_per_kes_period(self):
+        return int(self._get("slotsPerKESPeriod"))
+
+    @property
+    def max_kes_evolutions(self):
+        return int(self._get("maxKESEvolutions"))
+
+    @property
+    def system_start(self):
+        # POSIX timestamp of slot 0 or None if unknown
+        self._get("systemStart")
+        return self._system_start
+
+    def get_slot_time(self, slot_no):
+        # wall-clock time (POSIX timestamp) of the beginning of the slot
+        if self.system_start is None:
+            raise RuntimeError("systemStart is not known (genesis file not found)")
+        return self.system_start + slot_no * self.slot_length
+
+    def get_slot_at(self, timestamp=None):
+        # the slot number at the given wall-clock time (default: now)
+        if self.system_start is None:
+            raise RuntimeError("systemStart is not known (genesis file not found)")
+        timestamp = time() if timestamp is None else timestamp
+        return int((timestamp - self.system_start) / self.slot_length)
+
+    def get_epoch_start_slot(self, epoch_no):
+        return epoch_no * self.epoch_length
+
+    def get_seconds_until_slot(self, slot_no):
+        # <= 0 if the slot already started; None if systemStart is not known
+        if self.system_start is None:
+            return None
+        return self.get_slot_time(slot_no) - time()
@@ -0,0 +1,116 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from time import perf_counter
+
+from e2e_scenarios.instrumentation import record_call, call_records, CLI
+
+# path to the cardano-cli binary; it can be overwritten with the CARDANO_CLI env variable
+CARDANO_CLI_ENV_VAR = "CARDANO_CLI"
+
+_cardano_cli_path = None
+
+
+class CLIError(RuntimeError):
+    def __init__(self, cmd, returncode, output):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.output = ' '.join(str(output).split())
+        super().__init__("command '{}' return with error (code {}): {}".format(cmd, returncode, self.output))
+
+
+def get_cardano_cli_path():
+    # the binary is resolved only once per process and not by /bin/sh on every call
+    global _cardano_cli_path
+    if _cardano_cli_path is None:
+        cli_path = os.environ.get(CARDANO_CLI_ENV_VAR) or shutil.which("cardano-cli")
+        if not cli_path:
+            raise RuntimeError("cardano-cli binary was not found in PATH")
+        _cardano_cli_path = cli_path
+    return _cardano_cli_path
+
+
+def _get_subcommand(cmd):
+    # ex: "query utxo", "transaction build-raw"
+    return " ".join(cmd[2:4])
+
+
+def _get_argv_bytes(cmd):
+    return sum(len(arg) + 1 for arg in cmd)
+
+
+class _CountingReader:
+    # file-like wrapper counting the bytes read from the stream
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def run_cli(args):
+    # args = list of arguments for 'cardano-cli shelley' (ex: ["query", "tip", "--testnet-magic", "42"])
+    cmd = [get_cardano_cli_path(), "shelley"] + [str(arg) for arg in args]
+    start_time = perf_counter()
+    result = None
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    finally:
+        record_call(CLI, _get_subcommand(cmd), perf_counter() - start_time, argv_bytes=_get_argv_bytes(cmd),
+                    exit_code=result.returncode if result else None,
+                    output_bytes=len(result.stdout) if result else 0)
+    output = result.stdout.decode("utf-8").strip()
+    if result.returncode != 0:
+        raise CLIError(" ".join(cmd), result.returncode, output)
+    return output
+
+
+@contextmanager
+def stream_cli(args):
+    # like run_cli, but the output is not loaded into memory: yields the (binary) stdout of the running process so
+    # it can be parsed while it is written (ex: 'query ledger-state'); stderr goes to a temporary file, so a full
+    # stderr pipe can't block the process
+    # when the caller stops reading before the end of the output, the process is killed
+    cmd = [get_cardano_cli_path(), "shelley"] + [str(arg) for arg in args]
+    start_time = perf_counter()
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        # True until the caller read the whole output (also when the caller raised an exception)
+        stopped_early = True
+        stdout = _CountingReader(process.stdout)
+        try:
+            yield stdout
+            stopped_early = stdout.read(1) != b""
+        except Exception as e:
+            # the parser fails on the truncated output of a failed process: when the whole output was read, the
+            # process exits and its error (stderr) is reported instead of the parsing error
+            if stdout.read(1) != b"":
+                raise
+            stopped_early = False
+            returncode = process.wait()
+            if returncode == 0:
+                raise
+            raise CLIError(" ".join(cmd), returncode, _read_stderr(stderr_file)) from e
+        finally:
+            if stopped_early:
+                process.kill()
+            process.stdout.close()
+            returncode = process.wait()
+            record_call(CLI, _get_subcommand(cmd), perf_counter() - start_time, argv_bytes=_get_argv_bytes(cmd),
+                        exit_code=returncode, output_bytes=stdout.bytes_read)
+        if returncode != 0 and not stopped_early:
+            raise CLIError(" ".join(cmd), returncode, _read_stderr(stderr_file))
+
+
+def _read_stderr(stderr_file):
+    stderr_file.seek(0)
+    return stderr_file.read().decode("utf-8").strip()
+
+
+def get_cli_calls_total_time():
+    return sum(record["duration"] for record in list(call_records) if record["category"] == CLI)
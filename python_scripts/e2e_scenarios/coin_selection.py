@@ -0,0 +1,158 @@
+import random
+from bisect import bisect_left
+
+# max number of nodes visited by the branch and bound search before giving up (and using largest-first)
+BNB_MAX_TRIES = 20000
+
+
+class CoinSelectionError(RuntimeError):
+    pass
+
+
+def no_fee(no_of_inputs):
+    return 0
+
+
+def _get_max_inputs(utxos, max_inputs):
+    return len(utxos) if max_inputs is None else min(max_inputs, len(utxos))
+
+
+def select_largest_first(utxos, amount, fee_for_inputs=no_fee, max_inputs=None, **options):
+    # spend the biggest utxos first until they cover the amount + the fee for the selected number of inputs
+    max_inputs = _get_max_inputs(utxos, max_inputs)
+    selected, selected_amount = [], 0
+    for utxo in sorted(utxos, key=lambda u: u.amount, reverse=True)[:max_inputs]:
+        selected.append(utxo)
+        selected_amount += utxo.amount
+        if selected_amount >= amount + fee_for_inputs(len(selected)):
+            return selected
+    raise CoinSelectionError(f"Not enough funds in {max_inputs} input(s) to cover {amount} + fee; "
+                             f"Available: {selected_amount}")
+
+
+def select_random_improve(utxos, amount, fee_for_inputs=no_fee, max_inputs=None, **options):
+    # CIP-2 random-improve: select random utxos until the amount is covered, then keep adding random utxos
+    # while that brings the selection closer to 2 * amount (without going over 3 * amount); this leaves
+    # change outputs of a size similar to the payments and keeps the utxo set healthy
+    max_inputs = _get_max_inputs(utxos, max_inputs)
+    rng = options.get("rng") or random
+    available = list(utxos)
+    rng.shuffle(available)
+
+    selected, selected_amount = [], 0
+    while selected_amount < amount + fee_for_inputs(len(selected)):
+        if not available or len(selected) == max_inputs:
+            # random selection failed; largest-first is the best effort with the input limit
+            return select_largest_first(utxos, amount, fee_for_inputs, max_inputs)
+        utxo = available.pop()
+        selected.append(utxo)
+        selected_amount += utxo.amount
+
+    ideal_amount, max_amount = 2 * amount, 3 * amount
+    while available and len(selected) < max_inputs:
+        utxo = available.pop()
+        new_amount = selected_amount + utxo.amount
+        if abs(ideal_amount - new_amount) < abs(ideal_amount - selected_amount) and new_amount <= max_amount \
+                and new_amount >= amount + fee_for_inputs(len(selected) + 1):
+            selected.append(utxo)
+            selected_amount = new_amount
+    return selected
+
+
+def _find_single_match(candidates, low, high):
+    # candidates sorted by increasing amount; the utxo with the lowest amount in [low, high] or None
+    index = bisect_left([utxo.amount for utxo in candidates], low)
+    if index < len(candidates) and candidates[index].amount <= high:
+        return [candidates[index]]
+    return None
+
+
+def _find_pair_match(candidates, low, high):
+    # candidates sorted by increasing amount; the 2 utxos with the lowest total in [low, high] or None
+    # (2 pointers: O(number of candidates))
+    best_pair, best_total = None, None
+    left, right = 0, len(candidates) - 1
+    while left < right:
+        total = candidates[left].amount + candidates[right].amount
+        if total < low:
+            left += 1
+            continue
+        if total <= high and (best_total is None or total < best_total):
+            best_pair, best_total = [candidates[right], candidates[left]], total
+        right -= 1
+    return best_pair
+
+
+def select_branch_and_bound(utxos, amount, fee_for_inputs=no_fee, max_inputs=None, **options):
+    # search for a set of inputs with a total in [amount + fee, amount + fee + change_cost], so the transaction
+    # needs no change output: 1 input, then 2 inputs (exhaustive, in linear time), then a bounded depth first
+    # search; falls back to largest-first when no such set is found
+    max_inputs = _get_max_inputs(utxos, max_inputs)
+    change_cost = options.get("change_cost", 0)
+    max_tries = options.get("max_tries", BNB_MAX_TRIES)
+    # a utxo bigger than the highest possible target can't be part of a selection without change
+    max_target = amount + fee_for_inputs(max_inputs) + change_cost
+    ascending = sorted((utxo for utxo in utxos if utxo.amount <= max_target), key=lambda u: u.amount)
+
+    if max_inputs >= 1:
+        selection = _find_single_match(ascending, amount + fee_for_inputs(1), amount + fee_for_inputs(1) + change_cost)
+        if selection:
+            return selection
+    if max_inputs >= 2:
+        selection = _find_pair_match(ascending, amount + fee_for_inputs(2), amount + fee_for_inputs(2) + change_cost)
+        if selection:
+            return selection
+
+    candidates = ascending[::-1]
+    # remaining[i] = sum of the amounts of candidates[i:] (used to prune the branches that can't reach the target)
+    remaining = [0] * (len(candidates) + 1)
+    for index in range(len(candidates) - 1, -1, -1):
+        remaining[index] = remaining[index + 1] + candidates[index].amount
+
+    best_selection, best_waste = None, None
+    tries = 0
+    # stack of (next candidate index, selected indexes, selected amount)
+    stack = [(0, [], 0)]
+    while stack and tries < max_tries:
+        tries += 1
+        index, selected, selected_amount = stack.pop()
+        target = amount + fee_for_inputs(len(selected))
+        if selected and selected_amount >= target:
+            waste = selected_amount - target
+            if waste <= change_cost and (best_waste is None or waste < best_waste):
+                best_selection, best_waste = selected, waste
+                if waste == 0:
+                    break
+            # adding more inputs only increases the waste
+            continue
+        if index == len(candidates) or len(selected) == max_inputs:
+            continue
+        if selected_amount + remaining[index] < target:
+            continue
+        # explore the "omit" branch after the "include" branch (the stack is LIFO); a candidate that overshoots
+        # the target + change_cost is never included
+        stack.append((index + 1, selected, selected_amount))
+        new_amount = selected_amount + candidates[index].amount
+        if new_amount <= amount + fee_for_inputs(len(selected) + 1) + change_cost:
+            stack.append((index + 1, selected + [index], new_amount))
+
+    if best_selection is None:
+        return select_largest_first(utxos, amount, fee_for_inputs, max_inputs)
+    return [candidates[index] for index in best_selection]
+
+
+COIN_SELECTION_STRATEGIES = {
+    "largest_first": select_largest_first,
+    "random_improve": select_random_improve,
+    "branch_and_bound": select_branch_and_bound,
+}
+
+
+def select_coins(utxos, amount, strategy="largest_first", fee_for_inputs=no_fee, max_inputs=None, **options):
+    # utxos = list of UTxO objects; amount = funds required without the tx fee
+    # fee_for_inputs = function returning the tx fee for a given number of inputs
+    # **options are passed to the strategy (ex: change_cost for branch_and_bound, rng for random_improve)
+    if strategy not in COIN_SELECTION_STRATEGIES:
+        raise CoinSelectionError(f"Unknown coin selection strategy: {strategy}; "
+                                 f"Available: {list(COIN_SELECTION_STRATEGIES)}")
+    return COIN_SELECTION_STRATEGIES[strategy](list(utxos), amount, fee_for_inputs, max_inputs, **options)
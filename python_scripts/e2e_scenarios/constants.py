@@ -19,8 +19,57 @@ NODE_SOCKET_PATH = os.path.join(POOL_1_DIR_PATH, SOCKET_FILE_NAME)
 GENESIS_FILE_NAME = "genesis.json"
 GENESIS_FILE_PATH = os.path.join(TESTS_ROOT_DIR_PATH, GENESIS_FILE_NAME)
 
+FAUCET_POOLS_DIR_NAME = "faucet-pools"
+FAUCET_POOLS_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, FAUCET_POOLS_DIR_NAME)
+
+KEY_STOCK_DIR_NAME = "key-stock"
+KEY_STOCK_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, KEY_STOCK_DIR_NAME)
+
+STAKE_DISTRIBUTION_HISTORY_FILE_NAME = "stake-distribution-history.jsonl"
+STAKE_DISTRIBUTION_HISTORY_FILE_PATH = os.path.join(TESTS_ROOT_DIR_PATH, STAKE_DISTRIBUTION_HISTORY_FILE_NAME)
+
+# the work directories of the scenario runs + the catalog of the files created in them (see artifact_store.py)
+ARTIFACTS_DIR_NAME = "artifacts"
+ARTIFACTS_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, ARTIFACTS_DIR_NAME)
+ARTIFACT_STORE_DB_PATH = os.path.join(ARTIFACTS_DIR_PATH, "catalog.sqlite")
+
+# time profile of each scenario run: cardano-cli calls, sleeps and waits (see instrumentation.py)
+PROFILES_DIR_NAME = "profiles"
+PROFILES_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, PROFILES_DIR_NAME)
+
+# the state of the cardano-cli simulator (see simulator/cardano_cli.py)
+SIMULATOR_DIR_NAME = "simulator"
+SIMULATOR_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, SIMULATOR_DIR_NAME)
+SIMULATOR_LEDGER_FILE_PATH = os.path.join(SIMULATOR_DIR_PATH, "ledger.json")
+
 PROTOCOL_PARAMS_FILENAME = "protocol-params.json"
 PROTOCOL_PARAMS_FILEPATH = os.path.join(TESTS_ROOT_DIR_PATH, PROTOCOL_PARAMS_FILENAME)
 
-USER1_SKEY_FILE_PATH = os.path.join(ADDRESSES_DIR_PATH, "user1.skey")
-USER1_VKEY_FILE_PATH = os.path.join(ADDRESSES_DIR_PATH, "user1.vkey")
+# base directory of the tx workspace (see tx_workspace.py; default: /dev/shm): every build/sign/submit cycle of
+# every process gets its own directory, so the scenarios and their threads can build txs in parallel
+TX_FILES_DIR_PATH = os.environ.get("E2E_TX_FILES_DIR", "")
+
+# the faucet: user1 by default; the scenarios runner gives each worker its own (sub-)wallet
+USER1_SKEY_FILE_PATH = os.environ.get("E2E_FAUCET_SKEY", os.path.join(ADDRESSES_DIR_PATH, "user1.skey"))
+USER1_VKEY_FILE_PATH = os.environ.get("E2E_FAUCET_VKEY", os.path.join(ADDRESSES_DIR_PATH, "user1.vkey"))
+USER1_ADDRESS_FILE_PATH = os.path.join(ADDRESSES_DIR_PATH, "user1.addr")
+
+
+def get_user1_address():
+    # E2E_FAUCET_ADDRESS or the content of user1.addr, read when it is used (ex: the simulator creates user1.addr
+    # at its first run)
+    user1_address = os.environ.get("E2E_FAUCET_ADDRESS")
+    if user1_address:
+        return user1_address
+    if not os.path.isfile(USER1_ADDRESS_FILE_PATH):
+        print(f"ERROR: no faucet address: E2E_FAUCET_ADDRESS is not set and {USER1_ADDRESS_FILE_PATH} does not exist")
+        exit(2)
+    with open(USER1_ADDRESS_FILE_PATH) as user1_address_file:
+        return user1_address_file.read().strip()
+
+
+def __getattr__(name):
+    # USER1_ADDRESS (imported by the scenarios) is resolved when it is imported, not when this module is loaded
+    if name == "USER1_ADDRESS":
+        return get_user1_address()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import os, sys
-from pathlib import Path
 
 # TO DO: this could be moved out of the scripts (somehow..)
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -10,9 +9,9 @@ sys.path.insert(0, parent_dir_path)
 
 from e2e_scenarios.constants import USER1_ADDRESS, USER1_SKEY_FILE_PATH, POOL1_COLD_VKEY_FILE_PATH
 from e2e_scenarios.utils import create_payment_key_pair_and_address, calculate_tx_fee, calculate_tx_ttl, send_funds, \
-    get_address_balance, wait_for_new_tip, assert_address_balance, create_stake_key_pair_and_address, \
+    get_address_balance, wait_for_tx, assert_address_balance, create_stake_key_pair_and_address, \
     create_stake_addr_registration_cert, get_key_deposit, delegate_stake_address, get_stake_address_info, \
-    get_stake_distribution, create_stake_addr_delegation_cert
+    get_stake_distribution, create_stake_addr_delegation_cert, create_work_dir
 
 # Scenario
 # 1. Step1: create 1 new payment key pair and addresses (addr0.addr)
@@ -24,8 +23,7 @@ from e2e_scenarios.utils import create_payment_key_pair_and_address, calculate_t
 # 7. Step7: check the delegation details for addr0_stake.addr
 
 print("Creating a new folder for the files created by the current test...")
-tmp_directory_for_script_files = "tmp_" + sys.argv[0].split(".")[0]
-Path(tmp_directory_for_script_files).mkdir(parents=True, exist_ok=True)
+tmp_directory_for_script_files = create_work_dir(sys.argv[0])
 
 print(f"====== Step1: create 1 new payment key pair and addresses (addr0.addr)")
 addr_name = "addr0"
@@ -60,13 +58,12 @@ src_add_balance_init = get_address_balance(src_address)
 dst_init_balance = get_address_balance(dst_addresses_list[0])
 
 print(f"Send {transferred_amounts_list} Lovelace from {src_address} to {dst_addresses_list}")
-send_funds(src_address, tx_fee, tx_ttl,
-           destinations_list=dst_addresses_list,
-           transferred_amounts=transferred_amounts_list,
-           signing_keys=signing_keys_list)
+tx_id = send_funds(src_address, tx_fee, tx_ttl,
+                   destinations_list=dst_addresses_list,
+                   transferred_amounts=transferred_amounts_list,
+                   signing_keys=signing_keys_list)
 
-wait_for_new_tip()
-wait_for_new_tip()
+wait_for_tx(tx_id)
 
 print(f"Check that the balance for source address was correctly updated")
 assert_address_balance(src_address, src_add_balance_init - tx_fee - transferred_amounts_list[0])
@@ -90,12 +87,11 @@ print(f"tx_fee: {tx_fee}")
 print(f"key_deposit: {key_deposit}")
 print(f"src_add_balance_init: {src_add_balance_init}")
 
-send_funds(src_address, tx_fee + key_deposit, tx_ttl,
-           certificates=certificates_list,
-           signing_keys=signing_keys_list)
+tx_id = send_funds(src_address, tx_fee + key_deposit, tx_ttl,
+                   certificates=certificates_list,
+                   signing_keys=signing_keys_list)
 
-wait_for_new_tip()
-wait_for_new_tip()
+wait_for_tx(tx_id)
 
 print(f"Check that the balance for source address was correctly updated")
 assert_address_balance(src_address, src_add_balance_init - tx_fee)
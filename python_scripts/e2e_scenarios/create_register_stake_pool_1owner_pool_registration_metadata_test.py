@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import os, sys
-from pathlib import Path
 
 # TO DO: this could be moved out of the scripts (somehow..)
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -10,11 +9,11 @@ sys.path.insert(0, parent_dir_path)
 
 from e2e_scenarios.constants import USER1_ADDRESS, USER1_SKEY_FILE_PATH
 from e2e_scenarios.utils import create_payment_key_pair_and_address, calculate_tx_fee, calculate_tx_ttl, send_funds, \
-    get_address_balance, wait_for_new_tip, assert_address_balance, create_stake_key_pair_and_address, \
+    get_address_balance, wait_for_tx, assert_address_balance, create_stake_key_pair_and_address, \
     create_stake_addr_registration_cert, get_key_deposit, delegate_stake_address, get_stake_address_info, \
     get_pool_deposit, gen_kes_key_pair, gen_vrf_key_pair, gen_cold_key_pair_and_counter, gen_node_operational_cert, \
-    get_actual_kes_period, gen_pool_registration_cert, create_stake_addr_delegation_cert, get_ledger_state, \
-    get_registered_stake_pools_ledger_state, get_stake_pool_id, write_to_file, gen_pool_metadata_hash
+    get_actual_kes_period, gen_pool_registration_cert, create_stake_addr_delegation_cert, \
+    get_registered_stake_pools_ledger_state, get_stake_pool_id, write_to_file, gen_pool_metadata_hash, create_work_dir
 
 # Scenario
 # 1. Step1: create 1 new payment key pair and addresses (addr0.addr)
@@ -48,8 +47,7 @@ pool_metadata = {
 pool_metadata_url = "www.where_metadata_file_is_located.com"
 
 print("Creating a new folder for the files created by the current test...")
-tmp_directory_for_script_files = "tmp_" + sys.argv[0].split(".")[0]
-Path(tmp_directory_for_script_files).mkdir(parents=True, exist_ok=True)
+tmp_directory_for_script_files = create_work_dir(sys.argv[0])
 
 print("Add the pool metadata into a different file")
 pool_metadata_file = write_to_file(tmp_directory_for_script_files, pool_metadata, "pool_metadata.json")
@@ -82,13 +80,12 @@ src_add_balance_init = get_address_balance(src_address)
 dst_init_balance = get_address_balance(dst_addresses_list[0])
 
 print(f"Send {transferred_amounts_list} Lovelace from {src_address} to {dst_addresses_list}")
-send_funds(src_address, tx_fee, tx_ttl,
-           destinations_list=dst_addresses_list,
-           transferred_amounts=transferred_amounts_list,
-           signing_keys=signing_keys_list)
+tx_id = send_funds(src_address, tx_fee, tx_ttl,
+                   destinations_list=dst_addresses_list,
+                   transferred_amounts=transferred_amounts_list,
+                   signing_keys=signing_keys_list)
 
-wait_for_new_tip()
-wait_for_new_tip()
+wait_for_tx(tx_id)
 
 print(f"Check that the balance for source address was correctly updated")
 assert_address_balance(src_address, src_add_balance_init - tx_fee - transferred_amounts_list[0])
@@ -140,12 +137,11 @@ tx_fee = calculate_tx_fee(1, 1, tx_ttl, certificates=certificates_list, signing_
 
 src_add_balance_init = get_address_balance(src_address)
 
-send_funds(src_address, tx_fee + key_deposit, tx_ttl,
-           certificates=certificates_list,
-           signing_keys=signing_keys_list)
+tx_id = send_funds(src_address, tx_fee + key_deposit, tx_ttl,
+                   certificates=certificates_list,
+                   signing_keys=signing_keys_list)
 
-wait_for_new_tip()
-wait_for_new_tip()
+wait_for_tx(tx_id)
 
 print(f"Check that the balance for source address was correctly updated")
 assert_address_balance(src_address, src_add_balance_init - tx_fee)
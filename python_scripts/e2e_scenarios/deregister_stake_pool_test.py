@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import os, sys
-from pathlib import Path
 
 # TO DO: this could be moved out of the scripts (somehow..)
 dir_path = os.path.dirname(os.path.realpath(__file__))
@@ -10,11 +9,11 @@ sys.path.insert(0, parent_dir_path)
 
 from e2e_scenarios.constants import USER1_ADDRESS, USER1_SKEY_FILE_PATH
 from e2e_scenarios.utils import create_payment_key_pair_and_address, calculate_tx_fee, calculate_tx_ttl, send_funds, \
-    get_address_balance, wait_for_new_tip, assert_address_balance, create_stake_key_pair_and_address, \
+    get_address_balance, wait_for_tx, assert_address_balance, create_stake_key_pair_and_address, \
     create_stake_addr_registration_cert, get_key_deposit, get_pool_deposit, get_registered_stake_pools_ledger_state, \
     create_and_register_stake_pool, write_to_file, gen_pool_metadata_hash, gen_pool_deregistration_cert, \
-    get_current_epoch_no, wait_for_new_epoch, get_stake_distribution, create_stake_addr_delegation_cert, \
-    deregister_stake_pool
+    get_current_epoch_no, at_epoch, get_stake_distribution, create_stake_addr_delegation_cert, \
+    deregister_stake_pool, create_work_dir
 
 # Scenario
 # 1. Step1: create 1 new payment key pair and addresses (addr0.addr)
@@ -45,8 +44,7 @@ pool_metadata = {
 pool_metadata_url = "www.where_metadata_file_is_located.com"
 
 print("Creating a new folder for the files created by the current test...")
-tmp_directory_for_script_files = "tmp_" + sys.argv[0].split(".")[0]
-Path(tmp_directory_for_script_files).mkdir(parents=True, exist_ok=True)
+tmp_directory_for_script_files = create_work_dir(sys.argv[0])
 
 print("Add the pool metadata into a different file")
 pool_metadata_file = write_to_file(tmp_directory_for_script_files, pool_metadata, "pool_metadata.json")
@@ -79,13 +77,12 @@ src_add_balance_init = get_address_balance(src_address)
 dst_init_balance = get_address_balance(dst_addresses_list[0])
 
 print(f"Send {transferred_amounts_list} Lovelace from {src_address} to {dst_addresses_list}")
-send_funds(src_address, tx_fee, tx_ttl,
-           destinations_list=dst_addresses_list,
-           transferred_amounts=transferred_amounts_list,
-           signing_keys=signing_keys_list)
+tx_id = send_funds(src_address, tx_fee, tx_ttl,
+                   destinations_list=dst_addresses_list,
+                   transferred_amounts=transferred_amounts_list,
+                   signing_keys=signing_keys_list)
 
-wait_for_new_tip()
-wait_for_new_tip()
+wait_for_tx(tx_id)
 
 print(f"Check that the balance for source address was correctly updated")
 assert_address_balance(src_address, src_add_balance_init - tx_fee - transferred_amounts_list[0])
@@ -117,12 +114,11 @@ tx_ttl = calculate_tx_ttl()
 tx_fee = calculate_tx_fee(1, 1, tx_ttl, certificates=certificates_list, signing_keys=signing_keys_list)
 src_add_balance_init = get_address_balance(src_address)
 
-send_funds(src_address, tx_fee + key_deposit, tx_ttl,
-           certificates=certificates_list,
-           signing_keys=signing_keys_list)
+tx_id = send_funds(src_address, tx_fee + key_deposit, tx_ttl,
+                   certificates=certificates_list,
+                   signing_keys=signing_keys_list)
 
-wait_for_new_tip()
-wait_for_new_tip()
+wait_for_tx(tx_id)
 
 print(f"Check that the balance for source address was correctly updated")
 assert_address_balance(src_address, src_add_balance_init - tx_fee)
@@ -140,9 +136,8 @@ print(f"====== Step10: wait for the pool id to be shown into the stake-distribut
 current_epoch = get_current_epoch_no()
 expected_epoch = current_epoch + 2
 
-while current_epoch != expected_epoch:
-    wait_for_new_epoch()
-    current_epoch = get_current_epoch_no()
+
+def check_pool_in_stake_distribution(current_epoch, expected_epoch):
     if stake_pool_id not in get_stake_distribution():
         print(f"{stake_pool_id} was NOT included into the stake distribution of epoch {current_epoch}")
         if current_epoch == expected_epoch:
@@ -150,6 +145,13 @@ while current_epoch != expected_epoch:
     else:
         print(f"OK: {stake_pool_id} was included into the stake distribution of epoch {current_epoch}")
 
+
+# the checks of all the epochs are registered up front and run by the epoch scheduler at the beginning of each epoch
+epoch_checks = [at_epoch(epoch_no, check_pool_in_stake_distribution, expected_epoch)
+                for epoch_no in range(current_epoch + 1, expected_epoch + 1)]
+for epoch_check in epoch_checks:
+    epoch_check.result()
+
 print(f"====== Step11: create and send through a tx a pool deregistration certificate and submit it")
 current_epoch = get_current_epoch_no()
 deregister_stake_pool(pool_owner, node_cold_vkey_file, node_cold_skey_file, current_epoch + 1,
@@ -160,12 +162,17 @@ print(f"====== Step12: wait for the pool id to NOT be shown into the stake-distr
 current_epoch = get_current_epoch_no()
 expected_epoch = current_epoch + 3
 
-while current_epoch != expected_epoch:
-    wait_for_new_epoch()
-    current_epoch = get_current_epoch_no()
+
+def check_pool_not_in_stake_distribution(current_epoch, expected_epoch):
     if stake_pool_id in get_stake_distribution():
         print(f"{stake_pool_id} was included into the stake distribution of epoch {current_epoch}")
         if current_epoch == expected_epoch:
             print(f"ERROR: {stake_pool_id} was STILL included into the stake distribution of epoch {current_epoch}")
     else:
         print(f"OK: {stake_pool_id} was NOT included into the stake distribution of epoch {current_epoch}")
+
+
+epoch_checks = [at_epoch(epoch_no, check_pool_not_in_stake_distribution, expected_epoch)
+                for epoch_no in range(current_epoch + 1, expected_epoch + 1)]
+for epoch_check in epoch_checks:
+    epoch_check.result()
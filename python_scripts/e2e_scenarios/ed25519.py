@@ -0,0 +1,70 @@
+import hashlib
+
+# Ed25519 (RFC 8032) public key derivation and signing; used for generating the payment key pairs without
+# cardano-cli and by the cardano-cli simulator (the scenarios still sign with 'transaction sign')
+
+P = 2 ** 255 - 19
+L = 2 ** 252 + 27742317777372353535851937790883648493
+D = -121665 * pow(121666, P - 2, P) % P
+
+SEED_SIZE = 32
+
+# base point in extended coordinates (X, Y, Z, T)
+_BX = 15112221349535400772501151409588531511454012693041857206046113283949847762202
+_BY = 46316835694926478169428394003475163141307993866256225615783033603165251855960
+BASE_POINT = (_BX, _BY, 1, _BX * _BY % P)
+NEUTRAL_POINT = (0, 1, 1, 0)
+
+
+def _point_add(point1, point2):
+    x1, y1, z1, t1 = point1
+    x2, y2, z2, t2 = point2
+    a = (y1 - x1) * (y2 - x2) % P
+    b = (y1 + x1) * (y2 + x2) % P
+    c = 2 * D * t1 * t2 % P
+    d = 2 * z1 * z2 % P
+    e, f, g, h = b - a, d - c, d + c, b + a
+    return e * f % P, g * h % P, f * g % P, e * h % P
+
+
+def _scalar_mult(scalar, point):
+    result = NEUTRAL_POINT
+    while scalar:
+        if scalar & 1:
+            result = _point_add(result, point)
+        point = _point_add(point, point)
+        scalar >>= 1
+    return result
+
+
+def _encode_point(point):
+    x, y, z, _ = point
+    z_inv = pow(z, P - 2, P)
+    x, y = x * z_inv % P, y * z_inv % P
+    return (y | ((x & 1) << 255)).to_bytes(32, "little")
+
+
+def get_secret_scalar(seed):
+    digest = hashlib.sha512(seed).digest()
+    scalar = int.from_bytes(digest[:32], "little")
+    scalar &= (1 << 254) - 8
+    scalar |= 1 << 254
+    return scalar
+
+
+def get_public_key(seed):
+    # seed = the 32 bytes private key (the content of the cardano-cli .skey files)
+    if len(seed) != SEED_SIZE:
+        raise ValueError(f"Ed25519 seed must have {SEED_SIZE} bytes; got {len(seed)}")
+    return _encode_point(_scalar_mult(get_secret_scalar(seed), BASE_POINT))
+
+
+def sign(seed, message):
+    # the 64 bytes signature of message (RFC 8032, 5.1.6)
+    digest = hashlib.sha512(seed).digest()
+    public_key = get_public_key(seed)
+    r = int.from_bytes(hashlib.sha512(digest[32:] + message).digest(), "little") % L
+    encoded_r = _encode_point(_scalar_mult(r, BASE_POINT))
+    k = int.from_bytes(hashlib.sha512(encoded_r + public_key + message).digest(), "little") % L
+    s = (r + k * get_secret_scalar(seed)) % L
+    return encoded_r + s.to_bytes(32, "little")
@@ -0,0 +1,98 @@
+from threading import Condition, Event, Thread
+
+
+class EpochCheckTimeout(RuntimeError):
+    pass
+
+
+class EpochCheck:
+    # a check registered with EpochScheduler.at_epoch(); result() blocks until the check was run
+    def __init__(self, epoch_no, check, args, name=None):
+        self.epoch_no = epoch_no
+        self.check = check
+        self.args = args
+        self.name = name or getattr(check, "__name__", "check")
+        # the epoch in which the check was actually run (the scheduler can be late, never early)
+        self.run_at_epoch = None
+        self.value = None
+        self.error = None
+        self._done = Event()
+
+    def _run(self, current_epoch_no):
+        self.run_at_epoch = current_epoch_no
+        try:
+            self.value = self.check(current_epoch_no, *self.args)
+        except BaseException as e:
+            # including SystemExit (the scenarios call exit(2) on errors); raised again by result()
+            self.error = e
+        self._done.set()
+
+    def _fail(self, error):
+        self.error = error
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise EpochCheckTimeout(f"{self.name} (epoch {self.epoch_no}) was not run after {timeout} seconds")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class EpochScheduler:
+    # "at epoch E, run check C": one clock thread waits for the epoch boundaries and, right after the first block
+    # of each epoch, runs all the checks registered for it; all the checks registered in the process (ex: the
+    # per-epoch checks of a scenario, registered up front) share the same epoch waits
+    # 1 scheduler per process: run_scenarios.py runs each scenario in its own process, so the epoch waits of
+    # different scenarios overlap because the runner runs them in parallel, not through this class
+    def __init__(self, wait_for_epoch, get_current_epoch_no):
+        # wait_for_epoch = function blocking until the first block of the given epoch; returns the current epoch no
+        # get_current_epoch_no = function returning the current epoch number (from the node)
+        self.wait_for_epoch = wait_for_epoch
+        self.get_current_epoch_no = get_current_epoch_no
+        self._pending = []
+        self._condition = Condition()
+        self._thread = None
+
+    def at_epoch(self, epoch_no, check, *args, name=None):
+        # check(current_epoch_no, *args) is run once the epoch epoch_no started (right away if it already started);
+        # returns an EpochCheck: .result() waits for the check and returns its result (or raises its exception)
+        epoch_check = EpochCheck(epoch_no, check, args, name)
+        with self._condition:
+            self._pending.append(epoch_check)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="epoch-scheduler", daemon=True)
+                self._thread.start()
+        return epoch_check
+
+    def get_pending_checks(self):
+        with self._condition:
+            return list(self._pending)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._thread = None
+                    return
+                next_epoch_no = min(epoch_check.epoch_no for epoch_check in self._pending)
+            try:
+                current_epoch_no = self.get_current_epoch_no()
+                if next_epoch_no > current_epoch_no:
+                    # 1 epoch at a time, so the checks registered meanwhile for an earlier epoch are not delayed
+                    current_epoch_no = self.wait_for_epoch(current_epoch_no + 1)
+            except Exception as e:
+                # the clock is broken (ex: no new blocks); all the pending checks fail with the same error
+                with self._condition:
+                    failed, self._pending = self._pending, []
+                for epoch_check in failed:
+                    epoch_check._fail(e)
+                continue
+            with self._condition:
+                due = [epoch_check for epoch_check in self._pending if epoch_check.epoch_no <= current_epoch_no]
+                self._pending = [epoch_check for epoch_check in self._pending if epoch_check not in due]
+            for epoch_check in due:
+                epoch_check._run(current_epoch_no)
@@ -0,0 +1,174 @@
+import fcntl
+import json
+import os
+import threading
+from pathlib import Path
+from threading import Lock
+from time import time
+
+from e2e_scenarios.constants import FAUCET_POOLS_DIR_PATH
+from e2e_scenarios.instrumentation import timed_sleep
+from e2e_scenarios.utxo import UTxO
+
+# a lease not released after this number of seconds is considered abandoned
+LEASE_TIMEOUT = 600
+# seconds between the checks for a released utxo when all the big enough utxos are leased
+LEASE_POLL_INTERVAL = 0.2
+LEASE_WAIT_TIMEOUT = 300
+
+
+class FaucetPoolError(RuntimeError):
+    pass
+
+
+def get_faucet_pool_file_path(address):
+    return os.path.join(FAUCET_POOLS_DIR_PATH, address + ".json")
+
+
+def get_faucet_pool(address):
+    # the pool of the faucet address or None if the faucet was not split (see utils.split_faucet)
+    if os.path.isfile(get_faucet_pool_file_path(address)):
+        return FaucetPool(address)
+    return None
+
+
+def _is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class FaucetPool:
+    # the utxos of a faucet address shared by many concurrent senders (threads and processes);
+    # each sender leases 1 utxo, spends it and returns the change to the pool, so 2 senders never pick the same utxo
+    # pool file: {"address": .., "utxos": {"utxo_hash#utxo_ix": {"amount": .., "lease": null or [pid, thread, time]}}}
+    # the file is changed under a threading lock (threads) + an exclusive lock on a '.lock' file (processes)
+    _thread_lock = Lock()
+
+    def __init__(self, address, pool_file_path=None):
+        self.address = address
+        self.pool_file_path = pool_file_path or get_faucet_pool_file_path(address)
+        self.lock_file_path = self.pool_file_path + ".lock"
+
+    def _locked(self, update):
+        # update = function receiving the pool dict; it can change it in place; its result is returned
+        Path(os.path.dirname(self.pool_file_path)).mkdir(parents=True, exist_ok=True)
+        with self._thread_lock, open(self.lock_file_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.path.isfile(self.pool_file_path):
+                    with open(self.pool_file_path, 'r') as file:
+                        pool = json.loads(file.read())
+                else:
+                    pool = {"address": self.address, "utxos": {}}
+                result = update(pool)
+                tmp_file_path = self.pool_file_path + ".tmp"
+                with open(tmp_file_path, 'w') as file:
+                    file.write(json.dumps(pool))
+                os.replace(tmp_file_path, self.pool_file_path)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _get_utxo(self, tx_in, entry):
+        tx_hash, tx_ix = tx_in.split("#")
+        return UTxO(tx_hash, int(tx_ix), entry["amount"], self.address)
+
+    @staticmethod
+    def _is_leased(entry):
+        if not entry["lease"]:
+            return False
+        pid, _, lease_time = entry["lease"]
+        return _is_process_alive(pid) and time() - lease_time < LEASE_TIMEOUT
+
+    @staticmethod
+    def _new_lease():
+        return [os.getpid(), threading.get_ident(), time()]
+
+    def _is_leased_by_other(self, entry):
+        return self._is_leased(entry) and entry["lease"][:2] != [os.getpid(), threading.get_ident()]
+
+    def reset(self, utxos):
+        # replace the content of the pool (ex: after the faucet was split)
+        def update(pool):
+            pool["utxos"] = {utxo.tx_in: {"amount": utxo.amount, "lease": None} for utxo in utxos}
+        self._locked(update)
+
+    def get_utxos(self):
+        return self._locked(lambda pool: [self._get_utxo(tx_in, entry) for tx_in, entry in pool["utxos"].items()])
+
+    def get_balance(self):
+        return sum(utxo.amount for utxo in self.get_utxos())
+
+    def _try_lease(self, min_amount):
+        # returns the leased utxo, False (all the big enough utxos are leased) or None (no big enough utxo)
+        def update(pool):
+            big_enough = [(tx_in, entry) for tx_in, entry in pool["utxos"].items() if entry["amount"] >= min_amount]
+            free = [(tx_in, entry) for tx_in, entry in big_enough if not self._is_leased(entry)]
+            if not free:
+                return False if big_enough else None
+            # the smallest big enough utxo; the big ones are kept for the big payments
+            tx_in, entry = min(free, key=lambda item: item[1]["amount"])
+            entry["lease"] = self._new_lease()
+            return self._get_utxo(tx_in, entry)
+        return self._locked(update)
+
+    def lease(self, min_amount, timeout=LEASE_WAIT_TIMEOUT):
+        # returns a utxo with amount >= min_amount reserved for the caller or None if the pool has no such utxo
+        deadline = time() + timeout
+        while True:
+            utxo = self._try_lease(min_amount)
+            if utxo is not False:
+                return utxo
+            if time() > deadline:
+                raise FaucetPoolError(f"Timeout after {timeout} seconds waiting for a utxo >= {min_amount} "
+                                      f"from the {self.address} faucet pool")
+            timed_sleep(LEASE_POLL_INTERVAL, "faucet lease (all the utxos are leased)")
+
+    def get_available_tx_ins(self):
+        # the utxos (utxo_hash#utxo_ix) of the pool not leased by the other senders; a utxo set of the faucet address
+        # (queried from the node or tracked locally) can also contain utxos spent or leased by the other senders
+        return self._locked(lambda pool: {tx_in for tx_in, entry in pool["utxos"].items()
+                                          if not self._is_leased_by_other(entry)})
+
+    def claim(self, utxos):
+        # leases the given utxos (selected by the caller); returns False (nothing is leased) if any of them is not in
+        # the pool anymore or is leased by another sender
+        def update(pool):
+            if any(utxo.tx_in not in pool["utxos"] or self._is_leased_by_other(pool["utxos"][utxo.tx_in])
+                   for utxo in utxos):
+                return False
+            for utxo in utxos:
+                pool["utxos"][utxo.tx_in]["lease"] = self._new_lease()
+            return True
+        return self._locked(update)
+
+    def release(self, utxos):
+        # the leased utxos were not spent (or the chain of txs spending them ended); the utxos leased by the other
+        # senders are left as they are
+        def update(pool):
+            for utxo in utxos:
+                if utxo.tx_in in pool["utxos"] and not self._is_leased_by_other(pool["utxos"][utxo.tx_in]):
+                    pool["utxos"][utxo.tx_in]["lease"] = None
+        self._locked(update)
+
+    def spend(self, utxos, change_utxos=(), keep_leased=False):
+        # the leased utxos were spent; the change (utxos of the faucet address created by the tx) goes back to the
+        # pool; keep_leased = the change stays leased by the caller (ex: it is spent by the next tx of a chain) until
+        # it is released (see utils.end_utxo_chain)
+        def update(pool):
+            for utxo in utxos:
+                pool["utxos"].pop(utxo.tx_in, None)
+            for change_utxo in change_utxos:
+                pool["utxos"][change_utxo.tx_in] = {"amount": change_utxo.amount,
+                                                    "lease": self._new_lease() if keep_leased else None}
+        self._locked(update)
+
+    def remove(self):
+        for file_path in (self.pool_file_path, self.lock_file_path):
+            if os.path.isfile(file_path):
+                os.remove(file_path)
@@ -0,0 +1,124 @@
+import json
+import os
+import random
+
+# Size model (in bytes) of a signed Shelley transaction: [tx_body, witness_set, metadata]
+# All the variable length values use their worst case CBOR encoding so the estimated fee is never
+# lower than the fee calculated by 'cardano-cli shelley transaction calculate-min-fee'.
+TX_ARRAY_HEADER_SIZE = 1
+TX_BODY_MAP_HEADER_SIZE = 1
+MAP_KEY_SIZE = 1
+# [tx_hash (32 bytes), tx_ix (uint16)]
+TX_IN_SIZE = 1 + (2 + 32) + 3
+# [address (bytes), amount (uint64)]; a Shelley base address has 57 bytes (an enterprise one has 29)
+TX_OUT_ADDRESS_SIZE = 57
+TX_OUT_AMOUNT_SIZE = 9
+FEE_SIZE = 9
+# [vkey (32 bytes), signature (64 bytes)]
+VKEY_WITNESS_SIZE = 1 + (2 + 32) + (2 + 64)
+# {reward_account (29 bytes): amount (uint64)}
+WITHDRAWAL_SIZE = (2 + 29) + 9
+METADATA_HASH_SIZE = 2 + 32
+NULL_METADATA_SIZE = 1
+
+
+def get_cbor_uint_size(value):
+    if value < 24:
+        return 1
+    if value < 2 ** 8:
+        return 2
+    if value < 2 ** 16:
+        return 3
+    if value < 2 ** 32:
+        return 5
+    return 9
+
+
+def get_certificate_size(certificate_file):
+    # certificate files are text envelopes: {"type": .., "description": .., "cborHex": ..}
+    with open(certificate_file, 'r') as file:
+        certificate = json.loads(file.read())
+    return len(certificate["cborHex"]) // 2
+
+
+def estimate_tx_size(tx_in_count, tx_out_count, ttl, witness_count, **options):
+    # **options can be: certificates (list of certificate files), withdrawal_count, metadata_size,
+    #                   tx_out_address_size
+    tx_out_address_size = options.get("tx_out_address_size", TX_OUT_ADDRESS_SIZE)
+    tx_out_size = 1 + get_cbor_uint_size(tx_out_address_size) + tx_out_address_size + TX_OUT_AMOUNT_SIZE
+
+    body_size = TX_BODY_MAP_HEADER_SIZE
+    body_size += MAP_KEY_SIZE + get_cbor_uint_size(tx_in_count) + tx_in_count * TX_IN_SIZE
+    body_size += MAP_KEY_SIZE + get_cbor_uint_size(tx_out_count) + tx_out_count * tx_out_size
+    body_size += MAP_KEY_SIZE + FEE_SIZE
+    body_size += MAP_KEY_SIZE + get_cbor_uint_size(ttl)
+
+    certificates = options.get("certificates") or []
+    if certificates:
+        body_size += MAP_KEY_SIZE + get_cbor_uint_size(len(certificates))
+        body_size += sum(get_certificate_size(cert) for cert in certificates)
+
+    withdrawal_count = options.get("withdrawal_count", 0)
+    if withdrawal_count:
+        body_size += MAP_KEY_SIZE + get_cbor_uint_size(withdrawal_count) + withdrawal_count * WITHDRAWAL_SIZE
+
+    metadata_size = options.get("metadata_size", 0)
+    if metadata_size:
+        body_size += MAP_KEY_SIZE + METADATA_HASH_SIZE
+
+    witness_set_size = 1
+    if witness_count:
+        witness_set_size += MAP_KEY_SIZE + get_cbor_uint_size(witness_count) + witness_count * VKEY_WITNESS_SIZE
+
+    return TX_ARRAY_HEADER_SIZE + body_size + witness_set_size + (metadata_size or NULL_METADATA_SIZE)
+
+
+def estimate_min_fee(protocol_params, tx_in_count, tx_out_count, ttl, witness_count, **options):
+    # Shelley linear fee: minFeeA * tx_size + minFeeB
+    tx_size = estimate_tx_size(tx_in_count, tx_out_count, ttl, witness_count, **options)
+    return protocol_params["minFeeA"] * tx_size + protocol_params["minFeeB"]
+
+
+# fraction (0..1) of the estimated fees that are cross-checked against 'calculate-min-fee'; on top of that sample,
+# the first estimate of each tx shape (inputs, outputs, witnesses, certificates, withdrawals) is always cross-checked;
+# 0 disables all the cross-checks
+FEE_CROSS_CHECK_RATE_ENV_VAR = "E2E_FEE_CROSS_CHECK_RATE"
+DEFAULT_FEE_CROSS_CHECK_RATE = "0.1"
+
+# results of the cross-checks made by the current process: [(estimated_fee, cli_fee), ...]
+fee_cross_checks = []
+# the tx shapes already cross-checked by the current process
+cross_checked_tx_shapes = set()
+
+
+def get_fee_cross_check_rate():
+    return float(os.environ.get(FEE_CROSS_CHECK_RATE_ENV_VAR, DEFAULT_FEE_CROSS_CHECK_RATE))
+
+
+def should_cross_check_fee(tx_shape=None):
+    cross_check_rate = get_fee_cross_check_rate()
+    if cross_check_rate <= 0:
+        return False
+    if tx_shape is not None and tx_shape not in cross_checked_tx_shapes:
+        cross_checked_tx_shapes.add(tx_shape)
+        return True
+    return random.random() < cross_check_rate
+
+
+def record_fee_cross_check(estimated_fee, cli_fee):
+    fee_cross_checks.append((estimated_fee, cli_fee))
+    if estimated_fee < cli_fee:
+        print(f"WARNING: estimated fee {estimated_fee} is lower than the 'calculate-min-fee' fee {cli_fee}")
+
+
+def estimate_extra_inputs_fee(protocol_params, tx_in_count, assumed_tx_in_count=1):
+    # fee to add when a tx has tx_in_count inputs but its fee was calculated for assumed_tx_in_count inputs
+    extra_size = estimate_tx_size(tx_in_count, 1, 0, 0) - estimate_tx_size(assumed_tx_in_count, 1, 0, 0)
+    return protocol_params["minFeeA"] * max(extra_size, 0)
+
+
+def estimate_tx_out_fee(protocol_params, tx_out_address_size=TX_OUT_ADDRESS_SIZE):
+    # fee for one more output (ex: the change output)
+    extra_size = estimate_tx_size(1, 2, 0, 0, tx_out_address_size=tx_out_address_size) - \
+                 estimate_tx_size(1, 1, 0, 0, tx_out_address_size=tx_out_address_size)
+    return protocol_params["minFeeA"] * extra_size
@@ -0,0 +1,106 @@
+import atexit
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, sleep, time
+
+from e2e_scenarios.constants import PROFILES_DIR_PATH
+
+# Where does the time of a scenario go: every cardano-cli call (see cli.py), every native node query (see
+# local_state_query.py) and every sleep/wait is recorded here;
+# at exit, the profile of the process is written as JSON and printed as a table (see enable_profile_report)
+
+# categories of the records
+CLI = "cli"
+NODE = "node"
+SLEEP = "sleep"
+WAIT = "wait"
+
+_start_time = perf_counter()
+_lock = Lock()
+# 1 record per call: {"category", "name", "duration", "argv_bytes", "exit_code", "output_bytes"}
+call_records = []
+
+
+def record_call(category, name, duration, argv_bytes=0, exit_code=None, output_bytes=0):
+    with _lock:
+        call_records.append({"category": category, "name": name, "duration": duration, "argv_bytes": argv_bytes,
+                             "exit_code": exit_code, "output_bytes": output_bytes})
+
+
+def timed_sleep(seconds, name):
+    # time.sleep + a record (name = why the process is sleeping; ex: "until epoch boundary")
+    start_time = perf_counter()
+    try:
+        sleep(seconds)
+    finally:
+        record_call(SLEEP, name, perf_counter() - start_time)
+
+
+@contextmanager
+def timed_wait(name):
+    # records the time spent inside the block (ex: waiting for the tip watcher)
+    start_time = perf_counter()
+    try:
+        yield
+    finally:
+        record_call(WAIT, name, perf_counter() - start_time)
+
+
+def get_profile():
+    # {"runtime": seconds since the start of the process, "calls": [1 entry per (category, name)]}; the entries
+    # are sorted by their total duration (the biggest first)
+    runtime = perf_counter() - _start_time
+    with _lock:
+        records = list(call_records)
+    entries = {}
+    for record in records:
+        entry = entries.setdefault((record["category"], record["name"]), {
+            "category": record["category"], "name": record["name"], "calls": 0, "total": 0.0, "max": 0.0,
+            "errors": 0, "argv_bytes": 0, "output_bytes": 0})
+        entry["calls"] += 1
+        entry["total"] += record["duration"]
+        entry["max"] = max(entry["max"], record["duration"])
+        entry["errors"] += record["exit_code"] not in (None, 0)
+        entry["argv_bytes"] += record["argv_bytes"]
+        entry["output_bytes"] += record["output_bytes"]
+    for entry in entries.values():
+        entry["mean"] = entry["total"] / entry["calls"]
+        # can be more than 100% when the calls are made by parallel threads
+        entry["runtime_percent"] = 100 * entry["total"] / runtime if runtime else 0
+    return {"runtime": runtime, "calls": sorted(entries.values(), key=lambda e: e["total"], reverse=True)}
+
+
+def format_profile(profile):
+    lines = [f"{'category':<8} {'name':<36} {'calls':>6} {'total s':>9} {'% run':>6} {'mean s':>8} {'max s':>8} "
+             f"{'errors':>6} {'out bytes':>11}"]
+    for entry in profile["calls"]:
+        lines.append(f"{entry['category']:<8} {entry['name'][:36]:<36} {entry['calls']:>6} {entry['total']:>9.2f} "
+                     f"{entry['runtime_percent']:>6.1f} {entry['mean']:>8.3f} {entry['max']:>8.3f} "
+                     f"{entry['errors']:>6} {entry['output_bytes']:>11}")
+    lines.append(f"runtime: {round(profile['runtime'], 2)} seconds")
+    return "\n".join(lines)
+
+
+def write_profile(file_path, profile=None, **extra):
+    # extra = other fields for the JSON file (ex: scenario name)
+    profile = profile or get_profile()
+    Path(os.path.dirname(file_path) or ".").mkdir(parents=True, exist_ok=True)
+    with open(file_path, 'w') as file:
+        file.write(json.dumps(dict(extra, **profile), indent=4))
+    return file_path
+
+
+def enable_profile_report(scenario, profiles_dir_path=PROFILES_DIR_PATH):
+    # at exit: write profiles/<scenario>_<pid>.json and print the profile table
+    def report():
+        profile = get_profile()
+        if not profile["calls"]:
+            return
+        file_path = os.path.join(profiles_dir_path, f"{scenario}_{os.getpid()}.json")
+        write_profile(file_path, profile, scenario=scenario, finished=time())
+        print(f"======================== Profile of {scenario} ({file_path}) ========================")
+        print(format_profile(profile))
+    atexit.register(report)
@@ -0,0 +1,187 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+from e2e_scenarios.bech32 import encode as bech32_encode
+from e2e_scenarios.cli import run_cli, CLIError
+from e2e_scenarios.constants import TESTNET_MAGIC, KEY_STOCK_DIR_PATH
+from e2e_scenarios.ed25519 import get_public_key, SEED_SIZE
+
+# Shelley enterprise address (payment key hash, no stake reference) on the testnet: header 0110 0000
+ENTERPRISE_ADDRESS_HEADER_TESTNET = 0x60
+ADDRESS_HRP_TESTNET = "addr_test"
+KEY_HASH_SIZE = 28
+# the .skey/.vkey cborHex is a CBOR byte string of 32 bytes
+CBOR_BYTES_32_PREFIX = bytes([0x58, 0x20])
+
+# used until calibrate() reads the envelopes written by cardano-cli
+DEFAULT_SKEY_ENVELOPE = ("PaymentSigningKeyShelley_ed25519", "Payment Signing Key")
+DEFAULT_VKEY_ENVELOPE = ("PaymentVerificationKeyShelley_ed25519", "Payment Verification Key")
+
+DEFAULT_CLI_WORKERS = 8
+
+
+def get_address_bytes(vkey):
+    return bytes([ENTERPRISE_ADDRESS_HEADER_TESTNET]) + hashlib.blake2b(vkey, digest_size=KEY_HASH_SIZE).digest()
+
+
+def format_address(address_bytes, address_format):
+    if address_format == "bech32":
+        return bech32_encode(ADDRESS_HRP_TESTNET, address_bytes)
+    return address_bytes.hex()
+
+
+def _read_envelope(file_path):
+    with open(file_path, 'r') as file:
+        envelope = json.loads(file.read())
+    return envelope["type"], envelope["description"], bytes.fromhex(envelope["cborHex"])
+
+
+def _write_envelope(file_path, envelope_type, description, key):
+    with open(file_path, 'w') as file:
+        file.write(json.dumps({"type": envelope_type, "description": description,
+                               "cborHex": (CBOR_BYTES_32_PREFIX + key).hex()}, indent=4))
+
+
+def _write_address(file_path, address):
+    with open(file_path, 'w') as file:
+        file.write(address)
+
+
+def _get_key_pair_files(location, name):
+    return location + "/" + name + ".vkey", location + "/" + name + ".skey", location + "/" + name + ".addr"
+
+
+class KeyFactory:
+    # payment key pairs + (enterprise) addresses in bulk:
+    # - checked out (os.rename) from a stock of pre-generated key pairs, when the stock is not empty
+    # - generated in Python (Ed25519 + blake2b-224 + bech32) when they are identical to the cardano-cli ones
+    #   (checked once by calibrate()); ~4 ms per key pair vs 2 cardano-cli calls
+    # - generated by concurrent cardano-cli calls otherwise
+    def __init__(self, stock_dir_path=KEY_STOCK_DIR_PATH, cli_workers=DEFAULT_CLI_WORKERS):
+        self.stock_dir_path = stock_dir_path
+        self.cli_workers = cli_workers
+        # None = not calibrated yet
+        self.native = None
+        self.address_format = "bech32"
+        self.skey_envelope = DEFAULT_SKEY_ENVELOPE
+        self.vkey_envelope = DEFAULT_VKEY_ENVELOPE
+        self._lock = Lock()
+
+    def calibrate(self):
+        # generate 1 key pair and address with cardano-cli and derive the same from its signing key in Python;
+        # the native generation is used only if the results are identical
+        with self._lock:
+            if self.native is not None:
+                return self.native
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                try:
+                    cli_vkey_file, cli_skey_file, cli_addr_file = self._create_cli(tmp_dir, "calibration")
+                    skey_type, skey_description, skey_cbor = _read_envelope(cli_skey_file)
+                    vkey_type, vkey_description, vkey_cbor = _read_envelope(cli_vkey_file)
+                    with open(cli_addr_file, 'r') as file:
+                        cli_address = file.read().strip()
+                except (CLIError, ValueError, KeyError) as e:
+                    print(f"WARNING: key factory calibration failed; using cardano-cli for the keys: {e}")
+                    self.native = False
+                    return self.native
+
+            seed, cli_vkey = skey_cbor[len(CBOR_BYTES_32_PREFIX):], vkey_cbor[len(CBOR_BYTES_32_PREFIX):]
+            address_bytes = get_address_bytes(cli_vkey)
+            address_formats = [f for f in ("bech32", "hex") if format_address(address_bytes, f) == cli_address]
+            self.native = len(seed) == SEED_SIZE and get_public_key(seed) == cli_vkey and bool(address_formats)
+            if self.native:
+                self.address_format = address_formats[0]
+                self.skey_envelope = (skey_type, skey_description)
+                self.vkey_envelope = (vkey_type, vkey_description)
+            else:
+                print(f"WARNING: the native key pairs are different from the cardano-cli ones; using cardano-cli")
+            return self.native
+
+    def _create_cli(self, location, name):
+        vkey_file, skey_file, addr_file = _get_key_pair_files(location, name)
+        run_cli(["address", "key-gen",
+                 "--verification-key-file", vkey_file,
+                 "--signing-key-file", skey_file])
+        run_cli(["address", "build",
+                 "--payment-verification-key-file", vkey_file,
+                 "--testnet-magic", TESTNET_MAGIC,
+                 "--out-file", addr_file])
+        return vkey_file, skey_file, addr_file
+
+    def _create_native(self, location, name):
+        vkey_file, skey_file, addr_file = _get_key_pair_files(location, name)
+        seed = os.urandom(SEED_SIZE)
+        vkey = get_public_key(seed)
+        _write_envelope(skey_file, *self.skey_envelope, seed)
+        _write_envelope(vkey_file, *self.vkey_envelope, vkey)
+        _write_address(addr_file, format_address(get_address_bytes(vkey), self.address_format))
+        return vkey_file, skey_file, addr_file
+
+    def _generate(self, location, names):
+        # returns [(vkey_file, skey_file, addr_file), ...]
+        Path(location).mkdir(parents=True, exist_ok=True)
+        if self.calibrate():
+            return [self._create_native(location, name) for name in names]
+        with ThreadPoolExecutor(max_workers=self.cli_workers) as executor:
+            return list(executor.map(lambda name: self._create_cli(location, name), names))
+
+    def get_stock_size(self):
+        return len(glob.glob(os.path.join(self.stock_dir_path, "*.skey")))
+
+    def fill_stock(self, stock_size):
+        # top up the stock to stock_size key pairs; the key pairs are generated in a tmp directory and moved into
+        # the stock with the .skey file last, so a key pair is never checked out before all its files are there
+        no_of_key_pairs = stock_size - self.get_stock_size()
+        if no_of_key_pairs <= 0:
+            return 0
+        Path(self.stock_dir_path).mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.stock_dir_path) as tmp_dir:
+            prefix = os.path.basename(tmp_dir)
+            for files in self._generate(tmp_dir, [f"{prefix}_{i}" for i in range(no_of_key_pairs)]):
+                for file_path in sorted(files, key=lambda f: f.endswith(".skey")):
+                    os.rename(file_path, os.path.join(self.stock_dir_path, os.path.basename(file_path)))
+        return no_of_key_pairs
+
+    def checkout(self, location, name):
+        # move a key pair from the stock to location/name.{vkey,skey,addr}; returns (addr, vkey_file, skey_file)
+        # or None when the stock is empty; renaming the .skey file claims the key pair (atomic, so 2 processes
+        # never get the same key pair)
+        for stock_skey_file in glob.glob(os.path.join(self.stock_dir_path, "*.skey")):
+            claimed_skey_file = f"{stock_skey_file}.{os.getpid()}.{threading.get_ident()}"
+            try:
+                os.rename(stock_skey_file, claimed_skey_file)
+            except FileNotFoundError:
+                # checked out by someone else
+                continue
+            Path(location).mkdir(parents=True, exist_ok=True)
+            stock_vkey_file, _, stock_addr_file = _get_key_pair_files(self.stock_dir_path,
+                                                                      os.path.basename(stock_skey_file)[:-5])
+            vkey_file, skey_file, addr_file = _get_key_pair_files(location, name)
+            shutil.move(claimed_skey_file, skey_file)
+            shutil.move(stock_vkey_file, vkey_file)
+            shutil.move(stock_addr_file, addr_file)
+            with open(addr_file, 'r') as file:
+                return file.read().strip(), vkey_file, skey_file
+        return None
+
+    def create_key_pairs_and_addresses(self, location, names):
+        # [(addr, vkey_file, skey_file), ...] in the order of names
+        results = {}
+        for name in names:
+            checked_out = self.checkout(location, name)
+            if not checked_out:
+                break
+            results[name] = checked_out
+        missing_names = [name for name in names if name not in results]
+        for name, (vkey_file, skey_file, addr_file) in zip(missing_names, self._generate(location, missing_names)):
+            with open(addr_file, 'r') as file:
+                results[name] = file.read().strip(), vkey_file, skey_file
+        return [results[name] for name in names]
@@ -0,0 +1,193 @@
+import json
+import re
+from threading import Lock
+
+# Streaming extraction of a few subtrees from a (very big) JSON document, like the output of 'query ledger-state':
+# only the requested subtrees are converted to Python objects; everything else is skipped while it is read
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+REGISTERED_POOLS_PATH = ("esLState", "_delegationState", "_pstate", "_pParams")
+
+_WHITESPACE = b" \t\r\n"
+# when skipping an object/array only the brackets matter: this skips everything else, including complete strings
+# (that might contain brackets); an incomplete string (at the end of the buffer) is left for _skip_string
+_SKIP_RE = re.compile(rb'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_SCALAR_END_RE = re.compile(rb'[,}\]\s]')
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+class _JSONStream:
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = bytearray()
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self, keep_from):
+        # keep_from = buffer offset of the first byte still needed; returns the new value of keep_from
+        if self.eof:
+            raise JSONStreamError("unexpected end of the JSON document")
+        chunk = self.stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return keep_from
+        del self.buffer[:keep_from]
+        self.buffer += chunk
+        self.pos -= keep_from
+        return 0
+
+    def _ensure(self, keep_from=None):
+        # make sure there is at least 1 byte at self.pos
+        keep_from = self.pos if keep_from is None else keep_from
+        while self.pos >= len(self.buffer):
+            keep_from = self._read_more(keep_from)
+            if self.eof and self.pos >= len(self.buffer):
+                raise JSONStreamError("unexpected end of the JSON document")
+        return keep_from
+
+    def skip_whitespace(self):
+        while True:
+            self._ensure()
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.skip_whitespace() != char:
+            raise JSONStreamError(f"expected {char} at {self.buffer[self.pos:self.pos + 20]}")
+        self.pos += 1
+
+    def _skip_string(self, start, keep):
+        # self.pos is at the opening quote; returns the new offset of start (the buffer is shifted when more data
+        # is read); the string itself is always kept in the buffer (the escapes are checked backwards)
+        quote_pos = self.pos
+        self.pos += 1
+        while True:
+            end = self.buffer.find(b'"', self.pos)
+            if end == -1:
+                self.pos = len(self.buffer)
+                keep_from = start if keep else quote_pos
+                self._read_more(keep_from)
+                start, quote_pos = 0, quote_pos - keep_from
+                continue
+            backslashes = 0
+            while self.buffer[end - 1 - backslashes] == ord("\\"):
+                backslashes += 1
+            self.pos = end + 1
+            if backslashes % 2 == 0:
+                return start
+
+    def skip_value(self, keep=False):
+        # moves self.pos after the value starting at self.pos (after whitespace); keep=True returns the raw bytes
+        # of the value (the skipped values are not kept in memory)
+        self.skip_whitespace()
+        start = self.pos
+        first = self.buffer[start:start + 1]
+        if first == b'"':
+            start = self._skip_string(start, keep)
+        elif first in (b"{", b"["):
+            depth = 0
+            while True:
+                self.pos = _SKIP_RE.match(self.buffer, self.pos).end()
+                if self.pos == len(self.buffer):
+                    start = self._read_more(start if keep else self.pos)
+                    continue
+                char = self.buffer[self.pos]
+                if char == ord('"'):
+                    start = self._skip_string(start, keep)
+                    continue
+                self.pos += 1
+                depth += 1 if char in b"{[" else -1
+                if depth == 0:
+                    break
+        else:
+            while True:
+                match = _SCALAR_END_RE.search(self.buffer, self.pos)
+                if match is not None:
+                    self.pos = match.start()
+                    break
+                self.pos = len(self.buffer)
+                if self.eof:
+                    break
+                start = self._read_more(start if keep else self.pos)
+        return bytes(self.buffer[start:self.pos]) if keep else None
+
+    def read_key(self):
+        return json.loads(self.skip_value(keep=True))
+
+
+def _walk_object(json_stream, path, wanted_paths, found):
+    # json_stream.pos is at the '{' of the object at path; the values at wanted_paths are added to found;
+    # returns False when all the wanted paths were found (the rest of the document is not needed)
+    json_stream.expect(b"{")
+    if json_stream.skip_whitespace() == b"}":
+        json_stream.pos += 1
+        return True
+    while True:
+        key = json_stream.read_key()
+        json_stream.expect(b":")
+        key_path = path + (key,)
+        if key_path in wanted_paths:
+            found[key_path] = json.loads(json_stream.skip_value(keep=True))
+            if len(found) == len(wanted_paths):
+                return False
+        elif any(p[:len(key_path)] == key_path for p in wanted_paths) and json_stream.skip_whitespace() == b"{":
+            if not _walk_object(json_stream, key_path, wanted_paths, found):
+                return False
+        else:
+            json_stream.skip_value()
+        separator = json_stream.skip_whitespace()
+        json_stream.pos += 1
+        if separator == b"}":
+            return True
+        if separator != b",":
+            raise JSONStreamError(f"expected , or }} after the {key_path} value")
+
+
+def extract_json_paths(stream, paths):
+    # stream = binary file-like object (ex: the stdout of 'cardano-cli shelley query ledger-state')
+    # paths = list of key tuples (ex: [("esLState", "_delegationState", "_pstate", "_pParams")])
+    # returns {path: value} for the paths found in the document; it stops reading when all of them were found
+    wanted_paths = set(tuple(path) for path in paths)
+    found = {}
+    json_stream = _JSONStream(stream)
+    if json_stream.skip_whitespace() == b"{":
+        _walk_object(json_stream, (), wanted_paths, found)
+    return found
+
+
+class LedgerStateCache:
+    # the extracted ledger state subtrees are remembered for the current tip (slot number), so the lookups made
+    # while the tip doesn't change (ex: check + error message) reuse 1 'query ledger-state' call
+    def __init__(self, query_paths, get_slot):
+        # query_paths = function returning {path: value} for a list of paths (see extract_json_paths)
+        # get_slot = function returning the current tip (slot number) of the node
+        self.query_paths = query_paths
+        self.get_slot = get_slot
+        self.slot_no = None
+        self.values = {}
+        self._lock = Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.slot_no = None
+            self.values = {}
+
+    def get(self, paths):
+        paths = [tuple(path) for path in paths]
+        slot_no = self.get_slot()
+        with self._lock:
+            if slot_no != self.slot_no:
+                self.slot_no, self.values = slot_no, {}
+            missing_paths = [path for path in paths if path not in self.values]
+            if missing_paths:
+                self.values.update(self.query_paths(missing_paths))
+            for path in paths:
+                if path not in self.values:
+                    raise KeyError(f"{'.'.join(path)} was not found in the ledger state")
+            return {path: self.values[path] for path in paths}
@@ -0,0 +1,166 @@
+import os
+from time import perf_counter
+
+from e2e_scenarios.bech32 import decode as bech32_decode
+from e2e_scenarios.cbor import CBORTag
+from e2e_scenarios.instrumentation import record_call, NODE
+from e2e_scenarios.key_factory import format_address
+from e2e_scenarios.ouroboros import NodeConnection, NodeClientError, CHAIN_SYNC_PROTOCOL, LOCAL_STATE_QUERY_PROTOCOL
+from e2e_scenarios.stake_distribution import StakeDistribution
+from e2e_scenarios.utxo import UTxO
+
+# Native client for the local-state-query mini-protocol (+ the chain-sync intersection used to find the tip):
+# the queries are sent over 1 long-lived connection to the node socket (see ouroboros.py) and the results are
+# returned as the types used by the scripts (slot number, protocol parameters dict, StakeDistribution, UTxO)
+# instead of a cardano-cli process + the parsing of its text output
+# enabled with E2E_LOCAL_STATE_QUERY=1; the callers fall back to cardano-cli on NodeClientError (see utils.py)
+
+LOCAL_STATE_QUERY_ENV_VAR = "E2E_LOCAL_STATE_QUERY"
+
+# chain-sync messages
+MSG_FIND_INTERSECT = 4
+MSG_INTERSECT_FOUND = 5
+MSG_INTERSECT_NOT_FOUND = 6
+
+# local-state-query messages
+MSG_ACQUIRE = 0
+MSG_ACQUIRED = 1
+MSG_FAILURE = 2
+MSG_QUERY = 3
+MSG_RESULT = 4
+MSG_RELEASE = 5
+
+# Shelley ledger queries
+QUERY_LEDGER_TIP = 0
+QUERY_EPOCH_NO = 1
+QUERY_CURRENT_PROTOCOL_PARAMS = 3
+QUERY_STAKE_DISTRIBUTION = 5
+QUERY_FILTERED_UTXO = 6
+QUERY_UTXO = 7
+
+# the Shelley PParams CBOR array -> the names used by 'query protocol-parameters'
+PROTOCOL_PARAMS_NAMES = ["minFeeA", "minFeeB", "maxBlockBodySize", "maxTxSize", "maxBlockHeaderSize", "keyDeposit",
+                         "poolDeposit", "eMax", "nOpt", "a0", "rho", "tau", "decentralisationParam", "extraEntropy",
+                         "protocolVersionMajor", "protocolVersionMinor", "minUTxOValue", "minPoolCost"]
+
+
+def to_float(rational):
+    # unit intervals/rationals: tag 30 [numerator, denominator] (or a plain array)
+    if isinstance(rational, CBORTag):
+        rational = rational.value
+    if isinstance(rational, list):
+        return rational[0] / rational[1]
+    return float(rational)
+
+
+def decode_address(address):
+    # bech32 or hex -> bytes
+    try:
+        return bech32_decode(address)[1]
+    except ValueError:
+        return bytes.fromhex(address)
+
+
+def parse_protocol_params(pparams):
+    params = dict(zip(PROTOCOL_PARAMS_NAMES, pparams))
+    for name in ("a0", "rho", "tau", "decentralisationParam"):
+        params[name] = to_float(params[name])
+    extra_entropy = params["extraEntropy"]
+    params["extraEntropy"] = {"tag": "NeutralNonce"} if extra_entropy[0] == 0 else \
+        {"tag": "Nonce", "contents": extra_entropy[1].hex()}
+    params["protocolVersion"] = {"major": params.pop("protocolVersionMajor"),
+                                 "minor": params.pop("protocolVersionMinor")}
+    return params
+
+
+def parse_stake_distribution(pool_distribution):
+    # {pool key hash: [stake fraction, vrf key hash]}
+    return StakeDistribution(None, {pool_hash.hex(): to_float(individual_stake[0])
+                                    for pool_hash, individual_stake in pool_distribution.items()})
+
+
+def parse_utxo(utxo, addresses_by_bytes=None):
+    # {(tx id, tx ix): [address bytes, amount]}; the addresses keep the format of the queried ones (bech32 for the
+    # others)
+    addresses_by_bytes = addresses_by_bytes or {}
+    utxos = []
+    for (tx_hash, tx_ix), tx_out in utxo.items():
+        address = addresses_by_bytes.get(tx_out[0]) or format_address(tx_out[0], "bech32")
+        utxos.append(UTxO(tx_hash.hex(), tx_ix, tx_out[1], address))
+    return utxos
+
+
+def _parse(parser, result, *args):
+    # a result that can't be parsed (ex: a different node version) is reported like the protocol errors
+    try:
+        return parser(result, *args)
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+        raise NodeClientError(f"unexpected query result ({type(e).__name__}: {e}): {str(result)[:200]}")
+
+
+class LocalStateQueryClient:
+    def __init__(self, socket_path, network_magic, enabled=None):
+        self.connection = NodeConnection(socket_path, network_magic)
+        self.enabled = os.environ.get(LOCAL_STATE_QUERY_ENV_VAR) == "1" if enabled is None else enabled
+
+    def disable(self):
+        self.enabled = False
+        with self.connection.lock:
+            self.connection.close()
+
+    def _find_tip(self):
+        # called with the connection lock held; an intersection with no points returns the tip: [point, block no]
+        # (or [slot, hash, block no])
+        reply = self.connection.request(CHAIN_SYNC_PROTOCOL, [MSG_FIND_INTERSECT, []])
+        if reply[0] not in (MSG_INTERSECT_FOUND, MSG_INTERSECT_NOT_FOUND):
+            raise NodeClientError(f"unexpected chain-sync message: {reply}")
+        tip = reply[-1]
+        if not isinstance(tip, list) or not tip:
+            raise NodeClientError(f"unexpected chain-sync tip: {tip}")
+        return tip[0] if isinstance(tip[0], list) else tip[:2]
+
+    def _acquire(self):
+        # acquires the ledger state at the tip; returns the acquired point
+        for _ in range(2):
+            point = self._find_tip()
+            reply = self.connection.request(LOCAL_STATE_QUERY_PROTOCOL, [MSG_ACQUIRE, point])
+            if reply[0] == MSG_ACQUIRED:
+                return point
+            if reply[0] != MSG_FAILURE:
+                raise NodeClientError(f"unexpected local-state-query message: {reply}")
+            # the tip changed (rollback) between the 2 messages; retried once with the new tip
+        raise NodeClientError(f"the ledger state can't be acquired: {reply}")
+
+    def query(self, query, name="query"):
+        # 1 query on the ledger state at the tip (acquire + query + release); returns the decoded result
+        start_time = perf_counter()
+        with self.connection.lock:
+            self._acquire()
+            reply = self.connection.request(LOCAL_STATE_QUERY_PROTOCOL, [MSG_QUERY, query])
+            self.connection.send(LOCAL_STATE_QUERY_PROTOCOL, [MSG_RELEASE])
+        record_call(NODE, name, perf_counter() - start_time)
+        if reply[0] != MSG_RESULT:
+            raise NodeClientError(f"unexpected local-state-query message: {reply}")
+        return reply[1]
+
+    def query_tip(self):
+        # the slot number of the tip (same as 'query tip')
+        start_time = perf_counter()
+        with self.connection.lock:
+            point = self._find_tip()
+        record_call(NODE, "query tip", perf_counter() - start_time)
+        return point[0] if point else 0
+
+    def query_protocol_params(self):
+        return _parse(parse_protocol_params, self.query([QUERY_CURRENT_PROTOCOL_PARAMS], "query protocol-parameters"))
+
+    def query_stake_distribution(self):
+        return _parse(parse_stake_distribution, self.query([QUERY_STAKE_DISTRIBUTION], "query stake-distribution"))
+
+    def query_utxo(self, addresses=None):
+        # the UTxOs of the given addresses (all of them with addresses=None)
+        if addresses is None:
+            return _parse(parse_utxo, self.query([QUERY_UTXO], "query utxo"))
+        addresses_by_bytes = {decode_address(address): address for address in addresses}
+        utxo = self.query([QUERY_FILTERED_UTXO, list(addresses_by_bytes)], "query utxo")
+        return _parse(parse_utxo, utxo, addresses_by_bytes)
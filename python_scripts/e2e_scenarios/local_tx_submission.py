@@ -0,0 +1,195 @@
+import os
+from collections import deque
+from concurrent.futures import Future
+from threading import Lock, Semaphore
+from time import perf_counter
+
+from e2e_scenarios.cbor import RawCBOR
+from e2e_scenarios.instrumentation import record_call, NODE
+from e2e_scenarios.ouroboros import NodeConnection, NodeClientError, LOCAL_TX_SUBMISSION_PROTOCOL
+from e2e_scenarios.transaction import get_tx_body_cbor, calculate_tx_id
+
+# Native client for the local-tx-submission mini-protocol: the signed txs are sent over 1 long-lived connection to
+# the node socket (see ouroboros.py) instead of 1 'transaction submit' process per tx; many txs can be sent without
+# waiting for the reply of the previous ones (pipelining; the node replies in order) and each reply is returned as
+# a TxSubmitResult with the decoded ledger failures of the rejected txs; the txs submitted by concurrent threads
+# share the same pipeline (window)
+# enabled with E2E_TX_SUBMISSION=native (see utils.submit_raw_transaction)
+
+TX_SUBMISSION_ENV_VAR = "E2E_TX_SUBMISSION"
+
+# local-tx-submission messages
+MSG_SUBMIT_TX = 0
+MSG_ACCEPT_TX = 1
+MSG_REJECT_TX = 2
+
+# max number of txs sent and not answered yet
+DEFAULT_PIPELINE_WINDOW = 16
+
+# names of the Shelley ledger predicate failures, by (rule, tag); a failure of a rule containing the failures of an
+# inner rule is [tag, inner failure]; the other failures are [tag, args...]
+LEDGER_FAILURES = {
+    "LEDGER": {0: ("UtxowFailure", "UTXOW"), 1: ("DelegsFailure", "DELEGS")},
+    "UTXOW": {0: ("InvalidWitnessesUTXOW", None), 1: ("MissingVKeyWitnessesUTXOW", None),
+              2: ("MissingScriptWitnessesUTXOW", None), 3: ("ScriptWitnessNotValidatingUTXOW", None),
+              4: ("UtxoFailure", "UTXO"), 5: ("MIRInsufficientGenesisSigsUTXOW", None),
+              6: ("MissingTxBodyMetaDataHash", None), 7: ("MissingTxMetaData", None),
+              8: ("ConflictingMetaDataHash", None), 9: ("InvalidMetaData", None)},
+    "UTXO": {0: ("BadInputsUTxO", None), 1: ("ExpiredUTxO", None), 2: ("MaxTxSizeUTxO", None),
+             3: ("InputSetEmptyUTxO", None), 4: ("FeeTooSmallUTxO", None), 5: ("ValueNotConservedUTxO", None),
+             6: ("WrongNetwork", None), 7: ("WrongNetworkWithdrawal", None), 8: ("OutputTooSmallUTxO", None),
+             9: ("UpdateFailure", None), 10: ("OutputBootAddrAttrsTooBig", None)},
+    "DELEGS": {0: ("DelegateeNotRegisteredDELEG", None), 1: ("WithdrawalsNotInRewardsDELEGS", None),
+               2: ("DelplFailure", "DELPL")},
+    "DELPL": {0: ("PoolFailure", "POOL"), 1: ("DelegFailure", "DELEG")},
+    "POOL": {0: ("StakePoolNotRegisteredOnKeyPOOL", None), 1: ("StakePoolRetirementWrongEpochPOOL", None),
+             2: ("WrongCertificateTypePOOL", None), 3: ("StakePoolCostTooLowPOOL", None)},
+    "DELEG": {0: ("StakeKeyAlreadyRegisteredDELEG", None), 1: ("StakeKeyInRewardsDELEG", None),
+              2: ("StakeKeyNotRegisteredDELEG", None), 3: ("StakeKeyNonZeroAccountBalanceDELEG", None),
+              4: ("StakeDelegationImpossibleDELEG", None), 5: ("WrongCertificateTypeDELEG", None),
+              6: ("GenesisKeyNotInMappingDELEG", None), 7: ("DuplicateGenesisDelegateDELEG", None),
+              8: ("InsufficientForInstantaneousRewardsDELEG", None), 9: ("MIRCertificateTooLateinEpochDELEG", None),
+              10: ("DuplicateGenesisVRFDELEG", None)},
+}
+
+
+def _format_arg(arg):
+    if isinstance(arg, bytes):
+        return arg.hex()
+    if isinstance(arg, list):
+        return "[" + ", ".join(_format_arg(item) for item in arg) + "]"
+    if isinstance(arg, dict):
+        return "{" + ", ".join(f"{_format_arg(key)}: {_format_arg(value)}" for key, value in arg.items()) + "}"
+    return str(arg)
+
+
+def decode_ledger_failure(failure, rule="LEDGER"):
+    # -> {"name": the innermost failure (ex: "ValueNotConservedUTxO"), "path": the names from the outermost one,
+    #     "args": the arguments of the innermost failure}
+    path = []
+    while True:
+        if not isinstance(failure, list) or not failure or not isinstance(failure[0], int):
+            return {"name": "Unknown" + rule, "path": path, "args": [failure]}
+        name, inner_rule = LEDGER_FAILURES.get(rule, {}).get(failure[0], (f"Unknown{rule}Failure{failure[0]}", None))
+        path.append(name)
+        if inner_rule is None:
+            return {"name": name, "path": path, "args": failure[1:]}
+        failure, rule = failure[1], inner_rule
+
+
+def format_ledger_failure(failure):
+    # like the cardano-cli errors: UtxowFailure (UtxoFailure (ValueNotConservedUTxO 1000 1200))
+    innermost = " ".join([failure["name"]] + [_format_arg(arg) for arg in failure["args"]])
+    text = innermost
+    for name in reversed(failure["path"][:-1]):
+        text = f"{name} ({text})"
+    return text
+
+
+class TxRejection(str):
+    # the error returned by submit_raw_transaction for a rejected tx: the text (like the cardano-cli error, so the
+    # scenarios can still look for the failure names in it) + the decoded failures
+    def __new__(cls, failures):
+        text = "ApplyTxError [" + ", ".join(f"LedgerFailure ({format_ledger_failure(f)})" for f in failures) + "]"
+        rejection = super().__new__(cls, text)
+        rejection.failures = failures
+        return rejection
+
+    @property
+    def failure_names(self):
+        return [failure["name"] for failure in self.failures]
+
+
+class TxSubmitResult:
+    __slots__ = ("tx_id", "accepted", "rejection")
+
+    def __init__(self, tx_id, accepted, rejection=None):
+        self.tx_id = tx_id
+        self.accepted = accepted
+        # TxRejection when the tx was rejected
+        self.rejection = rejection
+
+    def __repr__(self):
+        return f"TxSubmitResult({self.tx_id}, {'accepted' if self.accepted else self.rejection})"
+
+
+def decode_reject_reason(reason):
+    # Shelley: ApplyTxError = [ledger failure, ...]
+    failures = reason if isinstance(reason, list) else [reason]
+    return TxRejection([decode_ledger_failure(failure) for failure in failures])
+
+
+class LocalTxSubmissionClient:
+    def __init__(self, socket_path, network_magic, enabled=None, window=DEFAULT_PIPELINE_WINDOW):
+        self.connection = NodeConnection(socket_path, network_magic)
+        self.enabled = os.environ.get(TX_SUBMISSION_ENV_VAR) == "native" if enabled is None else enabled
+        self.window = window
+        # the txs sent and not answered yet, in the send order (= the reply order): [(tx id, message CBOR, Future)]
+        self._in_flight = deque()
+        self._window_slots = Semaphore(window)
+        # held by the thread reading the next reply; the sends (with self.connection.lock) don't wait for it
+        self._receive_lock = Lock()
+
+    def disable(self):
+        self.enabled = False
+        with self.connection.lock:
+            self.connection.close()
+
+    def _receive_result(self, tx_id, message_cbor):
+        reply, reply_cbor = self.connection.receive(LOCAL_TX_SUBMISSION_PROTOCOL)
+        self.connection.record(LOCAL_TX_SUBMISSION_PROTOCOL, message_cbor, reply_cbor)
+        if reply[0] == MSG_ACCEPT_TX:
+            return TxSubmitResult(tx_id, True)
+        if reply[0] == MSG_REJECT_TX:
+            return TxSubmitResult(tx_id, False, decode_reject_reason(reply[1]))
+        raise NodeClientError(f"unexpected local-tx-submission message: {reply}")
+
+    def _receive_next(self):
+        # receives the next reply, for the tx of any thread; after an error, the connection is closed so all the
+        # txs in flight fail
+        with self._receive_lock:
+            if not self._in_flight:
+                return
+            tx_id, message_cbor, future = self._in_flight.popleft()
+            try:
+                future.set_result(self._receive_result(tx_id, message_cbor))
+            except NodeClientError as e:
+                future.set_exception(e)
+                while self._in_flight:
+                    self._in_flight.popleft()[2].set_exception(e)
+                    self._window_slots.release()
+            finally:
+                self._window_slots.release()
+
+    def _send(self, tx_cbor):
+        # returns the Future of the TxSubmitResult; while the window is full, the caller receives the next reply
+        while not self._window_slots.acquire(blocking=False):
+            self._receive_next()
+        future = Future()
+        try:
+            with self.connection.lock:
+                message_cbor = self.connection.send(LOCAL_TX_SUBMISSION_PROTOCOL, [MSG_SUBMIT_TX, RawCBOR(tx_cbor)],
+                                                    record=False)
+                self._in_flight.append((calculate_tx_id(get_tx_body_cbor(tx_cbor)), message_cbor, future))
+        except BaseException:
+            self._window_slots.release()
+            raise
+        return future
+
+    def _get_result(self, future):
+        # the replies of the txs sent before this one (by any thread) are received first
+        while not future.done():
+            self._receive_next()
+        return future.result()
+
+    def submit_many(self, txs):
+        # txs = the CBOR of the signed txs; returns 1 TxSubmitResult per tx, in the same order; up to self.window txs
+        # (of all the threads) are in flight at any time
+        start_time = perf_counter()
+        futures = [self._send(tx_cbor) for tx_cbor in txs]
+        results = [self._get_result(future) for future in futures]
+        record_call(NODE, "transaction submit", perf_counter() - start_time, argv_bytes=sum(len(tx) for tx in txs))
+        return results
+
+    def submit(self, tx_cbor):
+        return self.submit_many([tx_cbor])[0]
@@ -0,0 +1,185 @@
+import json
+import os
+import socket
+import struct
+from threading import Lock
+from time import perf_counter
+
+from e2e_scenarios.cbor import encode, decode_item, CBORDecodeError
+
+# Node-to-client connection over the node socket: the multiplexer (mux) framing + the handshake mini-protocol;
+# the other mini-protocols (ex: local_state_query.py) send/receive their CBOR messages through it
+# mux segment: 4 bytes transmission time (microseconds), 2 bytes mini-protocol id (the highest bit is set on the
+# segments sent by the node - the responder), 2 bytes payload length; a message can span many segments
+
+HANDSHAKE_PROTOCOL = 0
+CHAIN_SYNC_PROTOCOL = 5
+LOCAL_TX_SUBMISSION_PROTOCOL = 6
+LOCAL_STATE_QUERY_PROTOCOL = 7
+
+RESPONDER_BIT = 0x8000
+SEGMENT_HEADER_SIZE = 8
+MAX_SEGMENT_PAYLOAD_SIZE = 12288
+
+# node-to-client versions 1..8 (from the 2nd one, the version number has the bit 15 set); the version data is the
+# network magic
+NODE_TO_CLIENT_VERSIONS = [1] + [version | RESPONDER_BIT for version in range(2, 9)]
+
+# handshake messages
+MSG_PROPOSE_VERSIONS = 0
+MSG_ACCEPT_VERSION = 1
+MSG_REFUSE = 2
+
+DEFAULT_SOCKET_TIMEOUT = 60
+
+# the exchanged messages are appended to this file (JSONL) when set; see simulator/replay_node.py
+NODE_RECORDING_FILE_ENV_VAR = "E2E_NODE_RECORDING_FILE"
+
+
+class NodeClientError(RuntimeError):
+    # the socket is not available, the connection was closed, the handshake was refused, unexpected messages..
+    pass
+
+
+def encode_segment(protocol_id, payload, responder=False):
+    timestamp = int(perf_counter() * 1000000) & 0xffffffff
+    protocol_id = protocol_id | RESPONDER_BIT if responder else protocol_id
+    return struct.pack(">IHH", timestamp, protocol_id, len(payload)) + payload
+
+
+def encode_segments(protocol_id, message_cbor, responder=False):
+    return b"".join(encode_segment(protocol_id, message_cbor[offset:offset + MAX_SEGMENT_PAYLOAD_SIZE], responder)
+                    for offset in range(0, max(len(message_cbor), 1), MAX_SEGMENT_PAYLOAD_SIZE))
+
+
+class MuxReader:
+    # reassembles the messages of each mini-protocol from the segments read from a socket
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffers = {}
+
+    def _read_exactly(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise NodeClientError("the connection was closed by the node")
+            data += chunk
+        return data
+
+    def read_segment(self):
+        # returns (protocol id without the responder bit, payload)
+        _, protocol_id, length = struct.unpack(">IHH", self._read_exactly(SEGMENT_HEADER_SIZE))
+        return protocol_id & ~RESPONDER_BIT, self._read_exactly(length)
+
+    def read_message(self, protocol_id):
+        # returns (decoded message, raw CBOR) of the next message of the mini-protocol
+        while True:
+            buffer = self.buffers.get(protocol_id, b"")
+            if buffer:
+                try:
+                    message, end = decode_item(buffer)
+                    self.buffers[protocol_id] = buffer[end:]
+                    return message, buffer[:end]
+                except (CBORDecodeError, IndexError):
+                    # incomplete message; its next part is in the next segment
+                    pass
+            segment_protocol_id, payload = self.read_segment()
+            self.buffers[segment_protocol_id] = self.buffers.get(segment_protocol_id, b"") + payload
+
+
+class NodeConnection:
+    # 1 long-lived connection to the node (reconnected after an error); the requests of the different threads are
+    # serialized: request() sends 1 message and returns the next message of the same mini-protocol
+    def __init__(self, socket_path, network_magic, timeout=DEFAULT_SOCKET_TIMEOUT, recording_file_path=None):
+        self.socket_path = socket_path
+        self.network_magic = int(network_magic)
+        self.timeout = timeout
+        self.recording_file_path = recording_file_path or os.environ.get(NODE_RECORDING_FILE_ENV_VAR)
+        self.version = None
+        self.sock = None
+        self.reader = None
+        # held by the mini-protocol clients for a whole exchange (ex: acquire + query + release)
+        self.lock = Lock()
+
+    def connect(self):
+        # called with self.lock held
+        if self.sock is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise NodeClientError(f"can't connect to {self.socket_path}: {e}")
+        self.sock, self.reader = sock, MuxReader(sock)
+        try:
+            self._handshake()
+        except (NodeClientError, OSError):
+            self.close()
+            raise
+
+    def _handshake(self):
+        versions = {version: self.network_magic for version in NODE_TO_CLIENT_VERSIONS}
+        reply = self._request(HANDSHAKE_PROTOCOL, [MSG_PROPOSE_VERSIONS, versions])
+        if reply[0] == MSG_ACCEPT_VERSION:
+            self.version = reply[1]
+            return
+        if reply[0] == MSG_REFUSE:
+            raise NodeClientError(f"handshake refused by the node: {reply[1]}")
+        raise NodeClientError(f"unexpected handshake message: {reply}")
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock, self.reader, self.version = None, None, None
+
+    def _send(self, protocol_id, message_cbor):
+        try:
+            self.sock.sendall(encode_segments(protocol_id, message_cbor))
+        except OSError as e:
+            self.close()
+            raise NodeClientError(f"can't send to the node: {e}")
+
+    def send(self, protocol_id, message, record=True):
+        # called with self.lock held; for the messages without reply (ex: release) or sent without waiting for
+        # their reply (record=False; the caller records the message with its reply, see receive() and record());
+        # returns the CBOR of the message
+        self.connect()
+        message_cbor = encode(message)
+        self._send(protocol_id, message_cbor)
+        if record:
+            self.record(protocol_id, message_cbor, None)
+        return message_cbor
+
+    def receive(self, protocol_id):
+        # called with self.lock held
+        try:
+            return self.reader.read_message(protocol_id)
+        except (OSError, NodeClientError) as e:
+            self.close()
+            raise NodeClientError(f"can't read from the node: {e}")
+
+    def _request(self, protocol_id, message):
+        message_cbor = encode(message)
+        self._send(protocol_id, message_cbor)
+        reply, reply_cbor = self.receive(protocol_id)
+        self.record(protocol_id, message_cbor, reply_cbor)
+        return reply
+
+    def request(self, protocol_id, message):
+        # called with self.lock held; returns the reply (decoded)
+        self.connect()
+        return self._request(protocol_id, message)
+
+    def record(self, protocol_id, message_cbor, reply_cbor):
+        # reply_cbor = None for the messages without reply; no-op when no recording file was given
+        if not self.recording_file_path:
+            return
+        with open(self.recording_file_path, 'a') as file:
+            file.write(json.dumps({"protocol": protocol_id, "request": message_cbor.hex(),
+                                   "reply": None if reply_cbor is None else reply_cbor.hex()}) + "\n")
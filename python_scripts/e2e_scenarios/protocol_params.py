@@ -0,0 +1,45 @@
+import json
+import os
+from threading import Lock
+
+
+class ProtocolParamsCache:
+    # keeps the parsed protocol parameters in memory; they are re-queried only when the epoch changes
+    # (protocol parameter updates are applied only at the epoch boundary)
+    def __init__(self, query_params, get_epoch_no):
+        # query_params = function returning the protocol parameters (dict) from the node
+        # get_epoch_no = function returning the current epoch number
+        self.query_params = query_params
+        self.get_epoch_no = get_epoch_no
+        self.epoch_no = None
+        self.params = None
+        self.written_file_path = None
+        self._lock = Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.epoch_no = None
+            self.params = None
+            self.written_file_path = None
+
+    def get(self):
+        epoch_no = self.get_epoch_no()
+        with self._lock:
+            if self.params is None or epoch_no != self.epoch_no:
+                self.params = self.query_params()
+                self.epoch_no = epoch_no
+                self.written_file_path = None
+            return self.params
+
+    def get_file(self, file_path):
+        # the file is (re)written only when the cached parameters changed since the last write
+        params = self.get()
+        with self._lock:
+            if self.written_file_path != file_path:
+                # write + rename, so other processes (parallel scenarios) never read a partially written file
+                tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+                with open(tmp_file_path, 'w') as file:
+                    file.write(json.dumps(params))
+                os.replace(tmp_file_path, file_path)
+                self.written_file_path = file_path
+        return file_path
@@ -0,0 +1,145 @@
+import fcntl
+import json
+import os
+import re
+from pathlib import Path
+from threading import Lock
+
+from e2e_scenarios.constants import STAKE_DISTRIBUTION_HISTORY_FILE_PATH
+
+
+class StakeDistributionError(ValueError):
+    pass
+
+
+class StakeDistribution(dict):
+    # {stake_pool_id: stake fraction (float)} + the epoch in which it was queried; the pool ids keep the order of
+    # the 'query stake-distribution' output
+    def __init__(self, epoch_no, stake=()):
+        super().__init__(stake)
+        self.epoch_no = epoch_no
+
+    @property
+    def total(self):
+        return sum(self.values())
+
+    def to_json(self):
+        return {"epoch": self.epoch_no, "stake": dict(self)}
+
+    @classmethod
+    def from_json(cls, entry):
+        return cls(entry["epoch"], entry["stake"])
+
+    def __repr__(self):
+        return f"StakeDistribution(epoch {self.epoch_no}, {dict.__repr__(self)})"
+
+
+def parse_stake_distribution(output, epoch_no=None):
+    # output of 'query stake-distribution': 2 header lines ('PoolId  Stake frac' and '-----') and then 1 line per
+    # pool: 'pool_id   1.000e0'
+    stake_distribution = StakeDistribution(epoch_no)
+    for line in output.splitlines()[2:]:
+        if not line.strip():
+            continue
+        formatted_pool_stake = re.split("[\\s,]+", line.strip())
+        try:
+            stake_distribution[formatted_pool_stake[0]] = float(formatted_pool_stake[1])
+        except (IndexError, ValueError):
+            raise StakeDistributionError(f"unexpected stake distribution line: {line}")
+    return stake_distribution
+
+
+def diff_stake_distributions(old, new):
+    # returns {"added": {pool_id: fraction}, "removed": {pool_id: fraction}, "changed": {pool_id: (old, new)}}
+    return {
+        "added": {pool_id: new[pool_id] for pool_id in new if pool_id not in old},
+        "removed": {pool_id: old[pool_id] for pool_id in old if pool_id not in new},
+        "changed": {pool_id: (old[pool_id], new[pool_id]) for pool_id in new
+                    if pool_id in old and old[pool_id] != new[pool_id]},
+    }
+
+
+class StakeDistributionHistory:
+    # 1 stake distribution snapshot per epoch (the distribution used by the ledger changes only at the epoch
+    # boundary): the repeated lookups inside an epoch don't query the node again and the snapshots are appended
+    # to a JSONL file (1 line per epoch), so the scenarios can compare epochs without re-querying
+    # the file is shared by the parallel scenarios: appended under an exclusive lock on the file
+    def __init__(self, query_stake_distribution, get_epoch_no, history_file_path=STAKE_DISTRIBUTION_HISTORY_FILE_PATH):
+        # query_stake_distribution = function returning the output of 'query stake-distribution' (or a
+        #                            StakeDistribution, from the native client)
+        # get_epoch_no = function returning the current epoch number
+        self.query_stake_distribution = query_stake_distribution
+        self.get_epoch_no = get_epoch_no
+        self.history_file_path = history_file_path
+        self.snapshots = {}
+        self._lock = Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.snapshots = {}
+
+    def _append(self, snapshot):
+        Path(os.path.dirname(self.history_file_path) or ".").mkdir(parents=True, exist_ok=True)
+        with open(self.history_file_path, 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                file.write(json.dumps(snapshot.to_json(), separators=(",", ":")) + "\n")
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _load(self):
+        # the snapshots written by all the processes; the last snapshot of an epoch wins
+        snapshots = {}
+        if os.path.isfile(self.history_file_path):
+            with open(self.history_file_path, 'r') as file:
+                for line in file:
+                    if not line.strip():
+                        continue
+                    try:
+                        snapshot = StakeDistribution.from_json(json.loads(line))
+                    except (ValueError, KeyError) as e:
+                        # a line being written by another process
+                        print(f"WARNING: {e}")
+                        continue
+                    snapshots[snapshot.epoch_no] = snapshot
+        return snapshots
+
+    def get(self):
+        # the stake distribution of the current epoch
+        with self._lock:
+            while True:
+                epoch_no = self.get_epoch_no()
+                snapshot = self.snapshots.get(epoch_no)
+                if snapshot is not None:
+                    return snapshot
+                output = self.query_stake_distribution()
+                # an epoch boundary passed during the query: the distribution can belong to either epoch, so it is
+                # not recorded and the query is made again
+                if self.get_epoch_no() != epoch_no:
+                    continue
+                snapshot = output if isinstance(output, StakeDistribution) else \
+                    parse_stake_distribution(output, epoch_no)
+                snapshot.epoch_no = epoch_no
+                self._append(snapshot)
+                self.snapshots[epoch_no] = snapshot
+                return snapshot
+
+    def get_snapshot(self, epoch_no):
+        # the recorded stake distribution of a past (or the current) epoch; None if it was never queried
+        with self._lock:
+            if epoch_no not in self.snapshots:
+                self.snapshots.update({e: s for e, s in self._load().items() if e not in self.snapshots})
+            return self.snapshots.get(epoch_no)
+
+    def get_epochs(self):
+        with self._lock:
+            self.snapshots.update({e: s for e, s in self._load().items() if e not in self.snapshots})
+            return sorted(self.snapshots)
+
+    def diff(self, from_epoch_no, to_epoch_no):
+        # see diff_stake_distributions; the epochs must have been recorded (by get())
+        old, new = self.get_snapshot(from_epoch_no), self.get_snapshot(to_epoch_no)
+        for epoch_no, snapshot in ((from_epoch_no, old), (to_epoch_no, new)):
+            if snapshot is None:
+                raise StakeDistributionError(f"the stake distribution of epoch {epoch_no} was not recorded")
+        return diff_stake_distributions(old, new)
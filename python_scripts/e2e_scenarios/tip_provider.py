@@ -0,0 +1,45 @@
+from threading import Lock
+from time import monotonic
+
+# after this many seconds the extrapolated slot is not trusted anymore and the node is queried again
+DEFAULT_MAX_STALENESS = 10
+
+
+class TipProvider:
+    # remembers the last observed tip (slot number + the wall-clock time when it was observed) and
+    # extrapolates the current slot from the slot length instead of querying the node every time
+    def __init__(self, query_tip, get_slot_length, max_staleness=DEFAULT_MAX_STALENESS):
+        # query_tip = function returning the current slot number (exact, from the node)
+        # get_slot_length = function returning the slot length in seconds
+        self.query_tip = query_tip
+        self.get_slot_length = get_slot_length
+        self.max_staleness = max_staleness
+        self.last_slot = None
+        self.last_observed_at = None
+        self._lock = Lock()
+
+    def update(self, slot_no, observed_at=None):
+        with self._lock:
+            self.last_slot = slot_no
+            self.last_observed_at = monotonic() if observed_at is None else observed_at
+
+    def invalidate(self):
+        with self._lock:
+            self.last_slot = None
+            self.last_observed_at = None
+
+    def get_exact_tip(self):
+        slot_no = self.query_tip()
+        self.update(slot_no)
+        return slot_no
+
+    def get_tip(self, exact=False, max_staleness=None):
+        # exact=True always queries the node; otherwise the slot is extrapolated from the last observed tip
+        # as long as that observation is not older than max_staleness seconds
+        if max_staleness is None:
+            max_staleness = self.max_staleness
+        with self._lock:
+            last_slot, last_observed_at = self.last_slot, self.last_observed_at
+        if exact or last_slot is None or monotonic() - last_observed_at > max_staleness:
+            return self.get_exact_tip()
+        return last_slot + int((monotonic() - last_observed_at) / self.get_slot_length())
@@ -0,0 +1,150 @@
+from threading import Condition, Thread, current_thread
+from time import monotonic
+
+# the poll interval starts at (slot length * MIN_POLL_INTERVAL_SLOTS) after every new block and it is doubled
+# while no new block is seen, up to (slot length * MAX_POLL_INTERVAL_SLOTS)
+MIN_POLL_INTERVAL_SLOTS = 1
+MAX_POLL_INTERVAL_SLOTS = 16
+
+
+class TipWaitTimeout(RuntimeError):
+    pass
+
+
+class TipWatcher:
+    # a single background thread polls the tip (with adaptive backoff) and wakes up all the waiters;
+    # many waiters (threads, scenarios sharing a process) can wait for "next block", "slot >= N" or
+    # "epoch >= E" without each of them running its own polling loop
+    def __init__(self, query_tip, get_slot_length, get_epoch_length, on_new_tip=None):
+        # query_tip = function returning the current slot number (exact, from the node)
+        # on_new_tip = function called with every new slot number (ex: to update the TipProvider cache)
+        self.query_tip = query_tip
+        self.get_slot_length = get_slot_length
+        self.get_epoch_length = get_epoch_length
+        self.on_new_tip = on_new_tip
+        self.slot_no = None
+        self.block_counter = 0
+        self.poll_interval = None
+        self.poll_errors = 0
+        self.last_error = None
+        self._condition = Condition()
+        # slot numbers the waiters are waiting for; the poller sleeps longer while all of them are far away
+        self._target_slots = []
+        self._subscribers = 0
+        self._thread = None
+
+    def start(self):
+        # reference counted; the poller thread runs while there is at least 1 subscriber
+        with self._condition:
+            self._subscribers += 1
+            # a poller that was stopped but did not exit yet keeps running (it exits only while there is no
+            # subscriber, checked with the lock held)
+            if self._thread is None:
+                # the tip seen by a previous poller might be old
+                self.slot_no = None
+                self._thread = Thread(target=self._poll, name="tip-watcher", daemon=True)
+                self._thread.start()
+            return self
+
+    def stop(self):
+        with self._condition:
+            self._subscribers = max(self._subscribers - 1, 0)
+            if self._subscribers == 0:
+                self._condition.notify_all()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _poll(self):
+        try:
+            slot_length = self.get_slot_length()
+            min_interval = slot_length * MIN_POLL_INTERVAL_SLOTS
+            max_interval = slot_length * MAX_POLL_INTERVAL_SLOTS
+            self.poll_interval = min_interval
+            while True:
+                try:
+                    slot_no = self.query_tip()
+                    self.poll_errors = 0
+                except Exception as e:
+                    # the node might be restarting (or its output can't be parsed); keep the last known tip and
+                    # retry with backoff; the error is reported by the waits that time out
+                    slot_no = None
+                    self.poll_errors += 1
+                    self.last_error = e
+                with self._condition:
+                    if slot_no is not None and slot_no != self.slot_no:
+                        self.block_counter += self.slot_no is not None
+                        self.slot_no = slot_no
+                        self.poll_interval = min_interval
+                        if self.on_new_tip:
+                            self.on_new_tip(slot_no)
+                    else:
+                        self.poll_interval = min(self.poll_interval * 2, max_interval)
+                    self._condition.notify_all()
+                    if self._subscribers == 0:
+                        self._thread = None
+                        return
+                    self._condition.wait(self._get_sleep_time(slot_length))
+                    if self._subscribers == 0:
+                        self._thread = None
+                        return
+        except Exception as e:
+            self.last_error = e
+        finally:
+            # whatever stopped the poller, the next start() launches a new one (unless it already did)
+            with self._condition:
+                if self._thread is current_thread():
+                    self._thread = None
+                self._condition.notify_all()
+
+    def _get_sleep_time(self, slot_length):
+        # called with the lock held
+        if self.slot_no is None or not self._target_slots:
+            return self.poll_interval
+        slots_to_nearest_target = min(self._target_slots) - self.slot_no
+        return max(self.poll_interval, slots_to_nearest_target * slot_length)
+
+    def _wait_until(self, predicate, timeout, target_slot=None):
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._condition:
+            if target_slot is not None:
+                self._target_slots.append(target_slot)
+                # wake up the poller so its sleep time takes the new target into account
+                self._condition.notify_all()
+            try:
+                while not predicate():
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TipWaitTimeout(f"Timeout after {timeout} seconds; last seen slot: {self.slot_no}; "
+                                             f"last tip query error: {self.last_error}")
+                    self._condition.wait(remaining)
+                return self.slot_no
+            finally:
+                if target_slot is not None:
+                    self._target_slots.remove(target_slot)
+
+    def _wait_first_tip(self, timeout):
+        return self._wait_until(lambda: self.slot_no is not None, timeout)
+
+    def wait_for_next_block(self, timeout=None):
+        # returns the slot number of the next block (the first tip change after the call)
+        # 1 deadline for both waits (the first tip, then the next block)
+        deadline = None if timeout is None else monotonic() + timeout
+        with self:
+            self._wait_first_tip(timeout)
+            with self._condition:
+                block_counter = self.block_counter
+                next_slot = self.slot_no + 1
+            remaining = None if deadline is None else max(deadline - monotonic(), 0)
+            return self._wait_until(lambda: self.block_counter > block_counter, remaining, next_slot)
+
+    def wait_for_slot(self, slot_no, timeout=None):
+        with self:
+            return self._wait_until(lambda: self.slot_no is not None and self.slot_no >= slot_no, timeout, slot_no)
+
+    def wait_for_epoch(self, epoch_no, timeout=None):
+        # returns the slot number of the first block of the epoch
+        return self.wait_for_slot(epoch_no * self.get_epoch_length(), timeout)
@@ -0,0 +1,48 @@
+import hashlib
+import json
+
+from e2e_scenarios.cbor import decode_item, split_array, MAJOR_MAP, MAJOR_ARRAY
+
+TX_ID_SIZE = 32
+
+
+def read_text_envelope(file_path):
+    # cardano-cli files (keys, certificates, tx bodies, txs): {"type": .., "description": .., "cborHex": ..}
+    with open(file_path, 'r') as file:
+        envelope = json.loads(file.read())
+    return envelope["type"], bytes.fromhex(envelope["cborHex"])
+
+
+def write_text_envelope(file_path, envelope_type, cbor_data, description=""):
+    with open(file_path, 'w') as file:
+        file.write(json.dumps({"type": envelope_type, "description": description, "cborHex": cbor_data.hex()},
+                              indent=4))
+    return file_path
+
+
+def get_tx_body_cbor(cbor_data):
+    # a tx body file contains the body (a CBOR map) or [body, metadata]; a signed tx file contains
+    # [body, witnesses, metadata]; in both cases the tx id is the hash of the exact body bytes
+    major_type = cbor_data[0] >> 5
+    if major_type == MAJOR_MAP:
+        return cbor_data
+    if major_type == MAJOR_ARRAY:
+        return split_array(cbor_data)[0]
+    raise ValueError(f"Unexpected tx CBOR (major type {major_type})")
+
+
+def calculate_tx_id(tx_body_cbor):
+    return hashlib.blake2b(tx_body_cbor, digest_size=TX_ID_SIZE).hexdigest()
+
+
+def get_tx_id_from_file(tx_file):
+    # works for both tx body files (build-raw) and signed tx files (sign)
+    _, cbor_data = read_text_envelope(tx_file)
+    return calculate_tx_id(get_tx_body_cbor(cbor_data))
+
+
+def get_tx_outputs(tx_file):
+    # [(address_bytes, amount), ...] in the order of the tx outputs (the order gives the utxo indexes)
+    _, cbor_data = read_text_envelope(tx_file)
+    tx_body, _ = decode_item(get_tx_body_cbor(cbor_data))
+    return [(tx_out[0], tx_out[1]) for tx_out in tx_body.get(1, [])]
@@ -1,17 +1,16 @@
 #!/usr/bin/env python3
 
 import os, sys
-from pathlib import Path
 
 # TO DO: this could be moved out of the scripts (somehow..)
 dir_path = os.path.dirname(os.path.realpath(__file__))
 parent_dir_path = os.path.abspath(os.path.join(dir_path, os.pardir))
 sys.path.insert(0, parent_dir_path)
 
-from e2e_scenarios.constants import ADDRESSES_DIR_PATH, USER1_SKEY_FILE_PATH
+from e2e_scenarios.constants import USER1_ADDRESS, USER1_SKEY_FILE_PATH
 from e2e_scenarios.utils import create_payment_key_pair_and_address, calculate_tx_fee, \
     build_raw_transaction, get_utxo_with_highest_value, sign_raw_transaction, submit_raw_transaction, calculate_tx_ttl, \
-    read_address_from_file
+    create_work_dir, get_tx_submit_failures
 
 # Scenario
 # 1. Step1: create 1 new payment addresses (addr0)
@@ -20,8 +19,7 @@ from e2e_scenarios.utils import create_payment_key_pair_and_address, calculate_t
 # 4. Step4: try to build, sign and send an unbalanced transaction (change = 0, transferred_amount < available funds)
 
 print("Creating a new folder for the files created by the current test...")
-tmp_directory_for_script_files = "tmp_" + sys.argv[0].split(".")[0]
-Path(tmp_directory_for_script_files).mkdir(parents=True, exist_ok=True)
+tmp_directory_for_script_files = create_work_dir(sys.argv[0])
 
 print(f"====== Step1: Creating 1 new payment key pair and address")
 created_addresses_dict = {}
@@ -32,7 +30,7 @@ created_addresses_dict[addr_name] = [addr, addr_vkey, addr_skey]
 print(f"{len(created_addresses_dict)} addresses created for the current test: {created_addresses_dict}")
 
 print(f"====== Step2: try to build, sign and send an unbalanced transaction (change = -1, 1 input, 1 output)")
-src_address = read_address_from_file(ADDRESSES_DIR_PATH, "user1")
+src_address = USER1_ADDRESS
 dst_address = created_addresses_dict.get(list(created_addresses_dict)[0])[0]
 signing_key = USER1_SKEY_FILE_PATH
 
@@ -67,7 +65,7 @@ if tx_build_result[0]:
 print(f"SUCCESS: It was not be possible to build a transaction with negative change")
 
 print(f"====== Step3: try to build, sign and send an unbalanced transaction (change = 0, transferred_amount > available funds")
-src_address = read_address_from_file(ADDRESSES_DIR_PATH, "user1")
+src_address = USER1_ADDRESS
 dst_address = created_addresses_dict.get(list(created_addresses_dict)[0])[0]
 signing_key = USER1_SKEY_FILE_PATH
 
@@ -107,14 +105,14 @@ tx_submit_result = submit_raw_transaction(tx_signed_file)
 if tx_submit_result[0]:
     print(f"ERROR: It should not be possible to submit an unbalanced transaction with change >= 0 --> {tx_submit_result[1]}")
     exit(2)
-if "ValueNotConservedUTxO" not in str(tx_submit_result[1]):
+if "ValueNotConservedUTxO" not in get_tx_submit_failures(tx_submit_result[1]):
     print(f"ERROR: 'ValueNotConservedUTxO' keyword not found into the tx_submit error message")
     exit(2)
 
 print(f"SUCCESS: It was not be possible to submit an unbalanced transaction with transferred_amount > available funds")
 
 print(f"====== Step4: try to build, sign and send an unbalanced transaction (change = 0, transferred_amount < available funds")
-src_address = read_address_from_file(ADDRESSES_DIR_PATH, "user1")
+src_address = USER1_ADDRESS
 dst_address = created_addresses_dict.get(list(created_addresses_dict)[0])[0]
 signing_key = USER1_SKEY_FILE_PATH
 
@@ -154,7 +152,7 @@ tx_submit_result = submit_raw_transaction(tx_signed_file)
 if tx_submit_result[0]:
     print(f"ERROR: It should not be possible to submit an unbalanced transaction with change >= 0 --> {tx_submit_result[1]}")
     exit(2)
-if "ValueNotConservedUTxO" not in str(tx_submit_result[1]):
+if "ValueNotConservedUTxO" not in get_tx_submit_failures(tx_submit_result[1]):
     print(f"ERROR: 'ValueNotConservedUTxO' keyword not found into the tx_submit error message")
     exit(2)
 
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import random
+import sys
+from threading import Lock
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)))
+
+from e2e_scenarios.bech32 import decode as bech32_decode
+from e2e_scenarios.cbor import encode, RawCBOR
+from e2e_scenarios.cli import run_cli
+from e2e_scenarios.constants import TESTNET_MAGIC
+from e2e_scenarios.ed25519 import get_public_key
+from e2e_scenarios.key_factory import get_address_bytes, format_address
+from e2e_scenarios.transaction import read_text_envelope, write_text_envelope, calculate_tx_id
+
+# In-process encoder of the Shelley tx bodies written by 'transaction build-raw': the same CBOR bytes (so the same
+# tx id), without a cardano-cli process + a tx body file per tx; the body stays in memory (TxBody) until a
+# cardano-cli command needs its file (ex: 'transaction sign')
+# tx body = {0: [tx_in, ...] (a set: sorted, no duplicates), 1: [tx_out, ...], 2: fee, 3: ttl,
+#            4: [certificate, ...], 5: {reward account: amount}}; the optional keys are not written when empty
+# used by utils.build_raw_transaction with E2E_TX_BODY_BUILDER=native, only if the encoder writes exactly the bodies
+# recorded with the real 'build-raw' (golden files, checked once per process; see the 'record' and 'check' commands
+# below; run_scenarios.py runs the check before the scenarios):
+#   ./python_scripts/e2e_scenarios/tx_body.py record   (needs the real cardano-cli; writes the golden files)
+#   ./python_scripts/e2e_scenarios/tx_body.py check    (compares the native bodies with the golden files)
+
+TX_BODY_BUILDER_ENV_VAR = "E2E_TX_BODY_BUILDER"
+# fraction (0..1) of the bodies that are compared with the body written by 'build-raw' (the golden file)
+TX_BODY_CHECK_RATE_ENV_VAR = "E2E_TX_BODY_CHECK_RATE"
+
+TX_INPUTS, TX_OUTPUTS, TX_FEE, TX_TTL, TX_CERTIFICATES, TX_WITHDRAWALS = 0, 1, 2, 3, 4, 5
+TX_BODY_ENVELOPE_TYPE = "TxUnsignedShelley"
+
+GOLDEN_DIR_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "golden", "tx_bodies")
+GOLDEN_CASES_FILE_NAME = "cases.json"
+
+# reward address header: 111x nnnn (x = 1 for a script credential, nnnn = network id)
+REWARD_ADDRESS_SCRIPT_BIT = 0x10
+NETWORK_ID_MASK = 0x0f
+
+# results of the checks made by the current process: [(tx id, True if the bodies are identical), ...]
+tx_body_checks = []
+# [True if the native bodies of all the golden cases are identical] once checked by the current process
+golden_check = []
+golden_check_lock = Lock()
+
+
+def is_native_builder_enabled():
+    # E2E_TX_BODY_BUILDER=native and the native encoder writes the golden bodies (checked once per process)
+    return os.environ.get(TX_BODY_BUILDER_ENV_VAR, "cli") == "native" and is_native_builder_verified()
+
+
+def is_native_builder_verified():
+    # the native encoder is used only after it wrote exactly the golden bodies recorded with the real 'build-raw'
+    with golden_check_lock:
+        if not golden_check:
+            try:
+                mismatches = check_golden_files(verbose=False)
+                if mismatches:
+                    print(f"WARNING: the native tx bodies differ from the 'build-raw' ones for: {mismatches}; "
+                          f"using 'build-raw'")
+                golden_check.append(not mismatches)
+            except FileNotFoundError as e:
+                print(f"WARNING: {e}; using 'build-raw'")
+                golden_check.append(False)
+        return golden_check[0]
+
+
+def should_check_tx_body():
+    check_rate = float(os.environ.get(TX_BODY_CHECK_RATE_ENV_VAR, "0"))
+    return check_rate > 0 and random.random() < check_rate
+
+
+def decode_address(address):
+    # bech32 (addr_test1.., stake_test1..) or hex; the Byron (base58) addresses are not supported (ValueError)
+    try:
+        return bech32_decode(address)[1]
+    except ValueError:
+        return bytes.fromhex(address)
+
+
+def parse_tx_in(tx_in):
+    # utxo_hash#utxo_ix -> (hash bytes, ix)
+    tx_hash, tx_ix = tx_in.split("#")
+    return bytes.fromhex(tx_hash), int(tx_ix)
+
+
+def _parse_amount(value, option):
+    # like cardano-cli, a negative amount is a parsing error
+    address, amount = value.rsplit("+", 1)
+    if not amount.isdigit():
+        raise ValueError(f'option {option}: unexpected "-"\nexpecting digit: {value}')
+    return decode_address(address), int(amount)
+
+
+def parse_tx_out(tx_out):
+    # address+amount -> [address bytes, amount]
+    return list(_parse_amount(tx_out, "--tx-out"))
+
+
+def parse_withdrawal(withdrawal):
+    # stake_address+amount -> (reward account bytes, amount)
+    return _parse_amount(withdrawal, "--withdrawal")
+
+
+def _reward_account_order(reward_account):
+    # the ledger map order: network id, then the script credentials before the key ones, then the hash
+    header = reward_account[0]
+    return header & NETWORK_ID_MASK, 0 if header & REWARD_ADDRESS_SCRIPT_BIT else 1, reward_account[1:]
+
+
+def encode_tx_body(tx_ins, tx_outs, fee, ttl, certificates=None, withdrawals=None):
+    # tx_ins = [(hash bytes, ix), ...]; tx_outs = [[address bytes, amount], ...]; certificates = [certificate CBOR,
+    # ...]; withdrawals = [(reward account bytes, amount), ...]
+    body = {TX_INPUTS: [list(tx_in) for tx_in in sorted(set(tuple(tx_in) for tx_in in tx_ins))],
+            TX_OUTPUTS: [list(tx_out) for tx_out in tx_outs],
+            TX_FEE: fee,
+            TX_TTL: ttl}
+    if certificates:
+        body[TX_CERTIFICATES] = [RawCBOR(certificate) for certificate in certificates]
+    if withdrawals:
+        body[TX_WITHDRAWALS] = dict(sorted(withdrawals, key=lambda withdrawal: _reward_account_order(withdrawal[0])))
+    return encode(body)
+
+
+class TxBody(str):
+    # the path of the tx body file (what build_raw_transaction returns) + the CBOR of the body; the file is written
+    # only when a cardano-cli command needs it (write())
+    def __new__(cls, file_path, cbor_data):
+        tx_body = super().__new__(cls, file_path)
+        tx_body.cbor = cbor_data
+        tx_body.written = False
+        return tx_body
+
+    @property
+    def tx_id(self):
+        return calculate_tx_id(self.cbor)
+
+    def write(self):
+        if not self.written:
+            write_text_envelope(self, TX_BODY_ENVELOPE_TYPE, self.cbor)
+            self.written = True
+        return str(self)
+
+
+def build_tx_body(ttl, fee, out_file, **options):
+    # the arguments of utils.build_raw_transaction -> TxBody (not written); ValueError if an option can't be parsed
+    # natively (ex: a Byron address, a negative amount, metadata)
+    if options.get("metadata_file") or options.get("update_proposal_file"):
+        raise ValueError("the metadata and the update proposals are not supported")
+    tx_ins = [parse_tx_in(tx_in) for tx_in in options.get("tx_in") or []]
+    tx_outs = [parse_tx_out(tx_out) for tx_out in options.get("tx_out") or []]
+    certificates = [read_text_envelope(cert_file)[1] for cert_file in options.get("certificates") or []]
+    withdrawal = options.get("withdrawal")
+    withdrawals = [parse_withdrawal(withdrawal)] if withdrawal else []
+    return TxBody(out_file, encode_tx_body(tx_ins, tx_outs, int(fee), int(ttl), certificates, withdrawals))
+
+
+def check_tx_body(tx_body, golden_file):
+    # compares the native body with the one written by 'build-raw'; returns True if they are identical
+    _, golden_cbor = read_text_envelope(golden_file)
+    identical = tx_body.cbor == golden_cbor
+    tx_body_checks.append((tx_body.tx_id, identical))
+    if not identical:
+        print(f"WARNING: the native tx body of {tx_body.tx_id} differs from the 'build-raw' one ({golden_file}):\n"
+              f"  native:    {tx_body.cbor.hex()}\n  build-raw: {golden_cbor.hex()}")
+    return identical
+
+
+# ---------------------------------------------------------------------- golden files
+def _write_vkey(file_path, envelope_type, description, seed):
+    # a verification key file like the ones written by cardano-cli, from a fixed seed (reproducible golden files)
+    vkey = get_public_key(seed)
+    write_text_envelope(file_path, envelope_type, encode(vkey), description)
+    return vkey
+
+
+def _get_golden_cases(golden_dir_path):
+    # {case name: build_raw_transaction options}; the certificates and the stake address are created by cardano-cli
+    stake_vkey_file = os.path.join(golden_dir_path, "stake.vkey")
+    cold_vkey_file = os.path.join(golden_dir_path, "cold.vkey")
+    _write_vkey(stake_vkey_file, "StakeVerificationKeyShelley_ed25519", "Stake Verification Key", bytes([1]) * 32)
+    _write_vkey(cold_vkey_file, "StakePoolVerificationKey_ed25519", "Stake Pool Operator Verification Key",
+                bytes([2]) * 32)
+    registration_cert, delegation_cert = "stake.reg.cert", "stake.deleg.cert"
+    run_cli(["stake-address", "registration-certificate", "--stake-verification-key-file", stake_vkey_file,
+             "--out-file", os.path.join(golden_dir_path, registration_cert)])
+    run_cli(["stake-address", "delegation-certificate", "--stake-verification-key-file", stake_vkey_file,
+             "--cold-verification-key-file", cold_vkey_file,
+             "--out-file", os.path.join(golden_dir_path, delegation_cert)])
+    stake_address = run_cli(["stake-address", "build", "--stake-verification-key-file", stake_vkey_file,
+                             "--testnet-magic", TESTNET_MAGIC]).strip()
+
+    addresses = [format_address(get_address_bytes(get_public_key(bytes([seed]) * 32)), "bech32")
+                 for seed in range(3, 13)]
+    # unsorted inputs, indexes and amounts around the CBOR integer size limits
+    tx_ins = [f"{(bytes([byte]) * 32).hex()}#{tx_ix}" for byte, tx_ix in
+              [(0x9c, 0), (0x01, 23), (0xff, 24), (0x01, 2), (0x40, 255), (0x40, 256), (0x07, 65535), (0x07, 65536),
+               (0xa0, 1), (0x00, 7)]]
+    amounts = [0, 23, 24, 255, 256, 65535, 65536, 2 ** 32 - 1, 2 ** 32, 45 * 10 ** 15]
+    return {
+        "1in_1out": {"ttl": 1000, "fee": 170000, "tx_in": tx_ins[:1], "tx_out": [f"{addresses[0]}+1000000"]},
+        "10in_10out": {"ttl": 2 ** 32 + 5, "fee": 2 ** 32 + 1, "tx_in": tx_ins,
+                       "tx_out": [f"{address}+{amount}" for address, amount in zip(addresses, amounts)]},
+        "certificates": {"ttl": 500000, "fee": 190000, "tx_in": tx_ins[:2], "tx_out": [f"{addresses[1]}+5000000"],
+                         "certificates": [registration_cert, delegation_cert]},
+        "withdrawal": {"ttl": 500000, "fee": 180000, "tx_in": tx_ins[2:3], "tx_out": [f"{addresses[2]}+3000000"],
+                       "withdrawal": f"{stake_address}+123456789"},
+        "all": {"ttl": 10 ** 7, "fee": 250000, "tx_in": tx_ins[3:],
+                "tx_out": [f"{addresses[3]}+1", f"{addresses[4]}+2"],
+                "certificates": [delegation_cert], "withdrawal": f"{stake_address}+0"},
+        # rejected by 'build-raw' (so not recorded) unless the cli accepts it
+        "negative_fee": {"ttl": 1000, "fee": -1, "tx_in": tx_ins[:1], "tx_out": [f"{addresses[5]}+1000000"]},
+    }
+
+
+def _get_case_options(golden_dir_path, options, out_file):
+    # the case -> the build_raw_transaction options (without the ttl and the fee)
+    case_options = {key: value for key, value in options.items() if key not in ("ttl", "fee")}
+    return dict(case_options, out_file=out_file,
+                certificates=[os.path.join(golden_dir_path, cert) for cert in options.get("certificates", [])])
+
+
+def record_golden_files(golden_dir_path=GOLDEN_DIR_PATH):
+    # writes 1 body per case with 'build-raw' (cardano-cli from CARDANO_CLI or PATH) + the cases (cases.json)
+    from e2e_scenarios.utils import build_raw_transaction_cli
+
+    os.makedirs(golden_dir_path, exist_ok=True)
+    recorded_cases = {}
+    for name, options in _get_golden_cases(golden_dir_path).items():
+        out_file = os.path.join(golden_dir_path, name + ".body")
+        result = build_raw_transaction_cli(options["ttl"], options["fee"],
+                                           **_get_case_options(golden_dir_path, options, out_file))
+        if not result[0]:
+            print(f"WARNING: 'build-raw' failed for the {name} case; not recorded")
+            continue
+        recorded_cases[name] = options
+    with open(os.path.join(golden_dir_path, GOLDEN_CASES_FILE_NAME), 'w') as file:
+        file.write(json.dumps(recorded_cases, indent=4))
+    print(f"{len(recorded_cases)} golden tx bodies written to {golden_dir_path}")
+
+
+def check_golden_files(golden_dir_path=GOLDEN_DIR_PATH, verbose=True):
+    # returns the names of the cases whose native body differs from the golden one
+    cases_file_path = os.path.join(golden_dir_path, GOLDEN_CASES_FILE_NAME)
+    if not os.path.isfile(cases_file_path):
+        raise FileNotFoundError(f"no golden tx bodies in {golden_dir_path} (run the 'record' command with the "
+                                f"real cardano-cli)")
+    with open(cases_file_path, 'r') as file:
+        cases = json.loads(file.read())
+    mismatches = []
+    for name, options in cases.items():
+        golden_file = os.path.join(golden_dir_path, name + ".body")
+        try:
+            tx_body = build_tx_body(options["ttl"], options["fee"],
+                                    **_get_case_options(golden_dir_path, options, golden_file))
+            identical = check_tx_body(tx_body, golden_file)
+        except ValueError as e:
+            print(f"WARNING: the native encoder rejects the {name} case: {e}")
+            identical = False
+        if verbose:
+            print(f"{name:<16}{'OK' if identical else 'MISMATCH'}")
+        if not identical:
+            mismatches.append(name)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/check the golden tx bodies of the native tx body encoder")
+    parser.add_argument("command", choices=["record", "check"])
+    parser.add_argument("--golden-dir", default=GOLDEN_DIR_PATH)
+    args = parser.parse_args()
+    if args.command == "record":
+        record_golden_files(args.golden_dir)
+        return
+    try:
+        mismatches = check_golden_files(args.golden_dir)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        exit(2)
+    if mismatches:
+        print(f"ERROR: the native tx bodies differ from the 'build-raw' ones for: {mismatches}")
+        exit(2)
+
+
+if __name__ == "__main__":
+    main()
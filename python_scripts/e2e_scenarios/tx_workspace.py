@@ -0,0 +1,86 @@
+import atexit
+import os
+import shutil
+import tempfile
+from threading import Lock
+
+from e2e_scenarios.constants import TX_FILES_DIR_PATH
+
+# Unique paths for the files of each build -> sign -> submit cycle (instead of the fixed tx_raw.body/tx_raw.signed
+# shared by all the scenarios and threads): every cycle gets its own directory under 1 directory per process, on
+# tmpfs (/dev/shm) when available so the tx files never hit the disk; a cycle is deleted once its tx is submitted
+# and the whole process directory at exit
+# E2E_TX_FILES_DIR = base directory (instead of /dev/shm); E2E_KEEP_TX_FILES=1 keeps the files (debugging)
+
+TMPFS_DIR_PATH = "/dev/shm"
+KEEP_TX_FILES_ENV_VAR = "E2E_KEEP_TX_FILES"
+
+TX_BODY_FILE_NAME = "tx_raw.body"
+TX_SIGNED_FILE_NAME = "tx_raw.signed"
+
+
+def get_base_dir_path():
+    if TX_FILES_DIR_PATH:
+        return TX_FILES_DIR_PATH
+    if os.path.isdir(TMPFS_DIR_PATH) and os.access(TMPFS_DIR_PATH, os.W_OK):
+        return TMPFS_DIR_PATH
+    return tempfile.gettempdir()
+
+
+class TxCycle:
+    __slots__ = ("dir_path",)
+
+    def __init__(self, dir_path):
+        self.dir_path = dir_path
+
+    @property
+    def body_file(self):
+        return os.path.join(self.dir_path, TX_BODY_FILE_NAME)
+
+    @property
+    def signed_file(self):
+        return os.path.join(self.dir_path, TX_SIGNED_FILE_NAME)
+
+
+class TxWorkspace:
+    def __init__(self, base_dir_path=None, keep_files=None):
+        self.base_dir_path = base_dir_path
+        self.keep_files = os.environ.get(KEEP_TX_FILES_ENV_VAR) == "1" if keep_files is None else keep_files
+        self.root_dir_path = None
+        self._lock = Lock()
+
+    def _get_root_dir(self):
+        # created on first use (1 per process, so the parallel scenarios never share a directory)
+        with self._lock:
+            if self.root_dir_path is None:
+                base_dir_path = self.base_dir_path or get_base_dir_path()
+                os.makedirs(base_dir_path, exist_ok=True)
+                self.root_dir_path = os.path.abspath(tempfile.mkdtemp(prefix=f"e2e-tx-{os.getpid()}-",
+                                                                      dir=base_dir_path))
+                atexit.register(self.cleanup)
+            return self.root_dir_path
+
+    def new_cycle(self):
+        return TxCycle(tempfile.mkdtemp(prefix="tx-", dir=self._get_root_dir()))
+
+    def get_cycle(self, file_path):
+        # the cycle of a file created in this workspace; None for the other files (ex: an out_file given by the
+        # caller)
+        if self.root_dir_path is None or not file_path:
+            return None
+        dir_path = os.path.dirname(os.path.abspath(file_path))
+        if os.path.dirname(dir_path) != self.root_dir_path:
+            return None
+        return TxCycle(dir_path)
+
+    def release(self, file_path):
+        # deletes the cycle of the file (once its tx is submitted); no-op for the files not created in this workspace
+        cycle = self.get_cycle(file_path)
+        if cycle is not None and not self.keep_files:
+            shutil.rmtree(cycle.dir_path, ignore_errors=True)
+
+    def cleanup(self):
+        with self._lock:
+            if self.root_dir_path is not None and not self.keep_files:
+                shutil.rmtree(self.root_dir_path, ignore_errors=True)
+                self.root_dir_path = None
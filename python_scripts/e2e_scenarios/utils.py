@@ -1,11 +1,41 @@
+import atexit
 import json
 import re
 import shutil
-import subprocess
 import os
-from time import sleep
+import tempfile
+from time import monotonic
 
+from e2e_scenarios.artifact_store import ArtifactStore
+from e2e_scenarios.chain_params import ChainParams
+from e2e_scenarios.cli import run_cli, stream_cli, CLIError
+from e2e_scenarios.coin_selection import select_coins, CoinSelectionError, no_fee
 from e2e_scenarios.constants import TESTNET_MAGIC, PROTOCOL_PARAMS_FILEPATH, NODE_SOCKET_PATH
+from e2e_scenarios.fee_estimator import estimate_min_fee, should_cross_check_fee, record_fee_cross_check, \
+    estimate_extra_inputs_fee, estimate_tx_out_fee
+from e2e_scenarios.epoch_scheduler import EpochScheduler
+from e2e_scenarios.faucet import get_faucet_pool, FaucetPool, FaucetPoolError
+from e2e_scenarios.instrumentation import timed_sleep, timed_wait, enable_profile_report
+from e2e_scenarios.key_factory import KeyFactory
+from e2e_scenarios.ledger_state import LedgerStateCache, extract_json_paths, REGISTERED_POOLS_PATH
+from e2e_scenarios.local_state_query import LocalStateQueryClient
+from e2e_scenarios.local_tx_submission import LocalTxSubmissionClient, TxRejection
+from e2e_scenarios.ouroboros import NodeClientError
+from e2e_scenarios.protocol_params import ProtocolParamsCache
+from e2e_scenarios.stake_distribution import StakeDistributionHistory
+from e2e_scenarios.tip_provider import TipProvider
+from e2e_scenarios.tip_watcher import TipWatcher, TipWaitTimeout
+from e2e_scenarios.transaction import get_tx_id_from_file, read_text_envelope
+from e2e_scenarios.tx_body import TxBody, build_tx_body, check_tx_body, is_native_builder_enabled, \
+    should_check_tx_body
+from e2e_scenarios.tx_workspace import TxWorkspace
+from e2e_scenarios.utxo import UTxO, UTxOSet, parse_utxo_table, parse_utxo_json, group_utxos_by_address
+
+# max number of slots wait_for_tx waits for a transaction to be included into a block
+WAIT_FOR_TX_TIMEOUT_NO_OF_SLOTS = 200
+
+# output addresses of the transactions submitted by send_funds (used by wait_for_tx): {tx_id: [address, ...]}
+submitted_tx_addresses = {}
 
 
 def delete_folder(location_offline_tx_folder):
@@ -19,127 +49,149 @@ def delete_folder(location_offline_tx_folder):
         print(f"Folder does not exists - {location_offline_tx_folder}")
 
 
+def create_work_dir(script_path):
+    # a new (unique) directory for the files created by the current scenario run (instead of a shared tmp_ folder);
+    # the files created by the helpers below are indexed by role in the artifact store (see artifact_store.py)
+    # and the old runs are deleted by artifact_store.gc()
+    scenario = os.path.basename(script_path).split(".")[0]
+    work_dir = artifact_store.start_run(scenario)
+    atexit.register(artifact_store.finish_run)
+    # the time spent in cardano-cli calls, sleeps and waits is printed at exit (see instrumentation.py)
+    enable_profile_report(scenario)
+    print(f"Files created by this run: {work_dir}")
+    return work_dir
+
+
+def register_artifact(kind, name, path=None, value=None):
+    # index a file (or a value, ex: a pool id) of the current scenario run; no-op outside of a scenario run
+    artifact_store.add(kind, name, path=path, value=value)
+
+
+def register_tx_file(kind, file_path):
+    # the files of the tx workspace are deleted once the tx is submitted: only the files written at a path given by
+    # the caller are indexed
+    if tx_workspace.get_cycle(file_path) is None:
+        register_artifact(kind, os.path.basename(file_path), file_path)
+
+
+def find_artifact(kind, name):
+    # the value (ex: the address) or else the path of the artifact with this role created by the current scenario
+    # run; None if not found
+    artifact = artifact_store.find_one(kind, name)
+    if artifact is None:
+        return None
+    return artifact["path"] if artifact["value"] is None else artifact["value"]
+
+
+def register_key_pair_and_address(prefix, name, addr, vkey_file, skey_file, addr_file=None):
+    register_artifact(prefix + "_vkey", name, vkey_file)
+    register_artifact(prefix + "_skey", name, skey_file)
+    register_artifact(prefix + "_addr", name, addr_file, addr)
+
+
 def set_node_socket_path_env_var():
     os.environ['CARDANO_NODE_SOCKET_PATH'] = NODE_SOCKET_PATH
 
 
 def create_payment_key_pair(location, key_name):
-    try:
-        cmd = "cardano-cli shelley address key-gen" + \
-              " --verification-key-file " + location + "/" + key_name + ".vkey" + \
-              " --signing-key-file " + location + "/" + key_name + ".skey"
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + key_name + ".vkey", location + "/" + key_name + ".skey"
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["address", "key-gen",
+             "--verification-key-file", location + "/" + key_name + ".vkey",
+             "--signing-key-file", location + "/" + key_name + ".skey"])
+    return location + "/" + key_name + ".vkey", location + "/" + key_name + ".skey"
 
 
 def build_payment_address(location, addr_name):
-    try:
-        cmd = "cardano-cli shelley address build" + \
-              " --payment-verification-key-file " + location + "/" + addr_name + ".vkey" + \
-              " --testnet-magic " + TESTNET_MAGIC + \
-              " --out-file " + location + "/" + addr_name + ".addr"
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return read_address_from_file(location, addr_name + ".addr")
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["address", "build",
+             "--payment-verification-key-file", location + "/" + addr_name + ".vkey",
+             "--testnet-magic", TESTNET_MAGIC,
+             "--out-file", location + "/" + addr_name + ".addr"])
+    return read_address_from_file(location, addr_name + ".addr")
 
 
 def create_payment_key_pair_and_address(location, addr_name):
-    addr_vkey, addr_skey = create_payment_key_pair(location, addr_name)
-    addr = build_payment_address(location, addr_name)
+    # a pre-generated key pair is used when the key stock is not empty (see key_factory.py)
+    checked_out = key_factory.checkout(location, addr_name)
+    if checked_out:
+        addr, addr_vkey, addr_skey = checked_out
+    else:
+        addr_vkey, addr_skey = create_payment_key_pair(location, addr_name)
+        addr = build_payment_address(location, addr_name)
+    register_key_pair_and_address("payment", addr_name, addr, addr_vkey, addr_skey,
+                                  location + "/" + addr_name + ".addr")
     return addr, addr_vkey, addr_skey
 
 
+def create_payment_key_pairs_and_addresses(location, addr_names):
+    # [(addr, addr_vkey, addr_skey), ...] for many addresses at once: from the key stock, then generated in Python
+    # (or by concurrent cardano-cli calls when the Python keys don't match the cardano-cli ones)
+    created = key_factory.create_key_pairs_and_addresses(location, addr_names)
+    for addr_name, (addr, addr_vkey, addr_skey) in zip(addr_names, created):
+        register_key_pair_and_address("payment", addr_name, addr, addr_vkey, addr_skey,
+                                      location + "/" + addr_name + ".addr")
+    return created
+
+
 def create_stake_key_pair(location, key_name):
-    try:
-        cmd = "cardano-cli shelley stake-address key-gen" + \
-              " --verification-key-file " + location + "/" + key_name + "_stake.vkey" + \
-              " --signing-key-file " + location + "/" + key_name + "_stake.skey"
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + key_name + "_stake.vkey", location + "/" + key_name + "_stake.skey"
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["stake-address", "key-gen",
+             "--verification-key-file", location + "/" + key_name + "_stake.vkey",
+             "--signing-key-file", location + "/" + key_name + "_stake.skey"])
+    return location + "/" + key_name + "_stake.vkey", location + "/" + key_name + "_stake.skey"
 
 
 def build_stake_address(location, addr_name):
-    try:
-        cmd = "cardano-cli shelley stake-address build" \
-              " --stake-verification-key-file " + location + "/" + addr_name + "_stake.vkey" + \
-              " --testnet-magic " + TESTNET_MAGIC + \
-              " --out-file " + location + "/" + addr_name + "_stake.addr"
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return read_address_from_file(location, addr_name + "_stake.addr")
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["stake-address", "build",
+             "--stake-verification-key-file", location + "/" + addr_name + "_stake.vkey",
+             "--testnet-magic", TESTNET_MAGIC,
+             "--out-file", location + "/" + addr_name + "_stake.addr"])
+    return read_address_from_file(location, addr_name + "_stake.addr")
 
 
 def delegate_stake_address(stake_addr_skey_file, pool_id, delegation_fee):
-    try:
-        cmd = "cardano-cli shelley stake-address delegate" \
-              " --signing-key-file " + stake_addr_skey_file + \
-              " --pool-id " + pool_id + \
-              " --delegation-fee " + str(delegation_fee)
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        if "runStakeAddressCmd" in result:
-            print(f"ERROR: command not implemented yet;\n\t- command: {cmd} \n\t- result: {result}")
-            exit(2)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    cmd = ["stake-address", "delegate",
+           "--signing-key-file", stake_addr_skey_file,
+           "--pool-id", pool_id,
+           "--delegation-fee", delegation_fee]
+    result = run_cli(cmd)
+    if "runStakeAddressCmd" in result:
+        print(f"ERROR: command not implemented yet;\n\t- command: {' '.join(map(str, cmd))} \n\t- result: {result}")
+        exit(2)
 
 
 def get_stake_address_info(stake_addr):
-    try:
-        cmd = "cardano-cli shelley query stake-address-info" \
-              " --address " + stake_addr + \
-              " --testnet-magic " + TESTNET_MAGIC
-        output = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        output_json = json.loads(output)
-        delegation = output_json[stake_addr]['delegation']
-        reward_account_balance = output_json[stake_addr]['rewardAccountBalance']
-        return delegation, reward_account_balance
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    output = run_cli(["query", "stake-address-info",
+                      "--address", stake_addr,
+                      "--testnet-magic", TESTNET_MAGIC])
+    output_json = json.loads(output)
+    delegation = output_json[stake_addr]['delegation']
+    reward_account_balance = output_json[stake_addr]['rewardAccountBalance']
+    return delegation, reward_account_balance
 
 
 def create_stake_key_pair_and_address(location, addr_name):
     stake_addr_vkey, stake_addr_skey = create_stake_key_pair(location, addr_name)
     stake_addr = build_stake_address(location, addr_name)
+    register_key_pair_and_address("stake", addr_name, stake_addr, stake_addr_vkey, stake_addr_skey,
+                                  location + "/" + addr_name + "_stake.addr")
     return stake_addr, stake_addr_vkey, stake_addr_skey
 
 
 def create_stake_addr_registration_cert(location, stake_addr_vkey_file, addr_name):
-    try:
-        suffix_str = "_stake.reg.cert"
-        cmd = "cardano-cli shelley stake-address registration-certificate" \
-              " --stake-verification-key-file " + stake_addr_vkey_file + \
-              " --out-file " + location + "/" + addr_name + suffix_str
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + addr_name + suffix_str
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    suffix_str = "_stake.reg.cert"
+    run_cli(["stake-address", "registration-certificate",
+             "--stake-verification-key-file", stake_addr_vkey_file,
+             "--out-file", location + "/" + addr_name + suffix_str])
+    register_artifact("stake_addr_registration_cert", addr_name, location + "/" + addr_name + suffix_str)
+    return location + "/" + addr_name + suffix_str
 
 
 def create_stake_addr_delegation_cert(location, stake_addr_vkey_file, node_cold_vkey_file, addr_name):
-    try:
-        suffix_str = "_stake.deleg.cert"
-        cmd = "cardano-cli shelley stake-address delegation-certificate" \
-              " --stake-verification-key-file " + stake_addr_vkey_file + \
-              " --cold-verification-key-file " + node_cold_vkey_file + \
-              " --out-file " + location + "/" + addr_name + suffix_str
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + addr_name + suffix_str
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    suffix_str = "_stake.deleg.cert"
+    run_cli(["stake-address", "delegation-certificate",
+             "--stake-verification-key-file", stake_addr_vkey_file,
+             "--cold-verification-key-file", node_cold_vkey_file,
+             "--out-file", location + "/" + addr_name + suffix_str])
+    register_artifact("stake_addr_delegation_cert", addr_name, location + "/" + addr_name + suffix_str)
+    return location + "/" + addr_name + suffix_str
 
 
 def read_address_from_file(location, address_file_name):
@@ -154,103 +206,142 @@ def write_to_file(location, content, filename):
     return location + "/" + filename
 
 
+def query_node(native_query, cli_query):
+    # native_query(local_state_query) when the native client is enabled (E2E_LOCAL_STATE_QUERY=1; see
+    # local_state_query.py), cli_query() otherwise; after a native client error, cardano-cli is used for the rest
+    # of the process
+    if local_state_query.enabled:
+        try:
+            return native_query(local_state_query)
+        except NodeClientError as e:
+            print(f"WARNING: {e}; using cardano-cli for the node queries")
+            local_state_query.disable()
+    return cli_query()
+
+
+def query_protocol_params():
+    return query_node(lambda client: client.query_protocol_params(), query_protocol_params_cli)
+
+
+def query_protocol_params_cli():
+    set_node_socket_path_env_var()
+    output = run_cli(["query", "protocol-parameters", "--testnet-magic", TESTNET_MAGIC])
+    return json.loads(output)
+
+
 def get_protocol_params():
+    # the parameters are queried once per epoch; see ProtocolParamsCache
+    return protocol_params_cache.get()
+
+
+def get_protocol_params_file():
+    # write the protocol-params.json file only for the commands that need '--protocol-params-file'
+    return protocol_params_cache.get_file(PROTOCOL_PARAMS_FILEPATH)
+
+
+def query_stake_distribution():
+    # StakeDistribution (native client) or the 'query stake-distribution' output
+    return query_node(lambda client: client.query_stake_distribution(), query_stake_distribution_cli)
+
+
+def query_stake_distribution_cli():
     set_node_socket_path_env_var()
-    try:
-        cmd = "cardano-cli shelley query protocol-parameters" \
-              " --testnet-magic " + TESTNET_MAGIC + \
-              " --out-file " + PROTOCOL_PARAMS_FILEPATH
-        return subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    return run_cli(["query", "stake-distribution", "--testnet-magic", TESTNET_MAGIC])
 
 
 def get_stake_distribution():
-    # this will create a dictionary of in this format: {stake_pool_id: staked_value}
-    set_node_socket_path_env_var()
-    stake_distribution = {}
-    try:
-        cmd = "cardano-cli shelley query stake-distribution" \
-              " --testnet-magic " + TESTNET_MAGIC
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip().splitlines()
-
-        line_no = 0
-        for line in result:
-            # stake pool values are displayed starting with line 2 from the command output
-            if line_no > 1:
-                formatted_pool_stake = re.split("[\s,]+", line)
-                stake_distribution[formatted_pool_stake[0]] = formatted_pool_stake[1]
-            line_no += 1
-        return stake_distribution
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    # StakeDistribution of the current epoch: {stake_pool_id: stake fraction (float)} + epoch_no; it is queried
+    # only once per epoch and recorded in the stake distribution history
+    return stake_distribution_history.get()
+
+
+def get_stake_distribution_diff(from_epoch_no, to_epoch_no):
+    # {"added": {..}, "removed": {..}, "changed": {pool_id: (old, new)}} between 2 recorded epochs
+    return stake_distribution_history.diff(from_epoch_no, to_epoch_no)
 
 
 def get_key_deposit():
-    get_protocol_params()
-    with open('protocol-params.json', 'r') as myfile:
-        data = myfile.read()
-    protocol_params = json.loads(data)
-    return protocol_params["keyDeposit"]
+    return get_protocol_params()["keyDeposit"]
 
 
 def get_pool_deposit():
-    get_protocol_params()
-    with open('protocol-params.json', 'r') as myfile:
-        data = myfile.read()
-    protocol_params = json.loads(data)
-    return protocol_params["poolDeposit"]
+    return get_protocol_params()["poolDeposit"]
+
+
+def query_tip():
+    return query_node(lambda client: client.query_tip(), query_tip_cli)
 
 
-def get_current_tip():
+def query_tip_cli():
     set_node_socket_path_env_var()
-    try:
-        cmd = "cardano-cli shelley query tip --testnet-magic " + TESTNET_MAGIC
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return int(re.findall(r'%s(\d+)' % 'unSlotNo = ', result)[0])
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    result = run_cli(["query", "tip", "--testnet-magic", TESTNET_MAGIC])
+    return int(re.findall(r'%s(\d+)' % 'unSlotNo = ', result)[0])
+
 
+def get_current_tip(exact=True, max_staleness=None):
+    # exact=False returns the slot extrapolated from the last observed tip (no node query while it is fresh)
+    return tip_provider.get_tip(exact=exact, max_staleness=max_staleness)
 
-def get_current_epoch_no():
-    current_epoch_no = get_current_tip()
+
+def get_current_epoch_no(exact=False):
+    current_slot_no = get_current_tip(exact=exact)
     epoch_length = get_epoch_length()
-    return int(current_epoch_no / epoch_length)
+    return int(current_slot_no / epoch_length)
 
 
-def get_address_utxos(address):
-    # this will create a list of utxos in this format: ['utxo_hash', utxo_ix, utxo_amount]
+def get_address_utxo_set(address):
+    # a single 'query utxo' call; balance, count and highest value utxo are then answered from memory
+    return query_node(lambda client: UTxOSet(address, client.query_utxo([address])),
+                      lambda: get_address_utxo_set_cli(address))
+
+
+def get_address_utxo_set_cli(address):
     set_node_socket_path_env_var()
-    available_utxos_list = []
     try:
-        cmd = "cardano-cli shelley query utxo" \
-              " --testnet-magic " + TESTNET_MAGIC + \
-              " --address " + address + " | grep '^[^- ]'"
-        address_utxo_list = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode(
-            "utf-8").strip().splitlines()
-
-        for utxo in address_utxo_list:
-            formatted_utxo = re.split("[\s,]+", utxo)
-            utxo_hash = formatted_utxo[0]
-            utxo_ix = int(formatted_utxo[1])
-            utxo_amount = int(formatted_utxo[2])
-            available_utxos_list.append([utxo_hash, utxo_ix, utxo_amount])
-        return available_utxos_list
-    except subprocess.CalledProcessError as e:
-        return available_utxos_list
+        output = run_cli(["query", "utxo", "--testnet-magic", TESTNET_MAGIC, "--address", address])
+    except CLIError:
+        return UTxOSet(address)
+    return UTxOSet(address, parse_utxo_table(output, address))
+
+
+def get_utxo_sets(addresses, whole_utxo=False):
+    # the utxos of all the addresses are fetched in one 'query utxo' call (with repeated '--address' flags) or,
+    # when whole_utxo=True, from the whole utxo set filtered locally; returns {address: UTxOSet}
+    addresses = list(dict.fromkeys(addresses))
+    return query_node(lambda client: group_utxos_by_address(
+                          client.query_utxo(None if whole_utxo or not addresses else addresses), addresses or None),
+                      lambda: get_utxo_sets_cli(addresses, whole_utxo))
+
+
+def get_utxo_sets_cli(addresses, whole_utxo=False):
+    set_node_socket_path_env_var()
+    cmd = ["query", "utxo", "--testnet-magic", TESTNET_MAGIC]
+    if not whole_utxo:
+        for address in addresses:
+            cmd += ["--address", address]
+
+    # the JSON output (that includes the address of each utxo) is available only with '--out-file'
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_file = os.path.join(tmp_dir, "utxo.json")
+        run_cli(cmd + ["--out-file", out_file])
+        with open(out_file, 'r') as file:
+            utxo_json = json.loads(file.read())
+    # no addresses: the sets of all the addresses (ex: looking for a tx in the whole utxo set)
+    return group_utxos_by_address(parse_utxo_json(utxo_json), addresses or None)
+
+
+def get_address_balances(addresses):
+    # {address: balance} with a single 'query utxo' call
+    return {address: utxo_set.balance for address, utxo_set in get_utxo_sets(addresses).items()}
+
+
+def get_address_utxos(address):
+    # this will create a list of utxos that can be used in this format: ['utxo_hash', utxo_ix, utxo_amount]
+    return list(get_address_utxo_set(address))
 
 
 def get_address_balance(address):
-    address_balance = 0
-    if get_no_of_utxos_for_address(address) > 0:
-        available_utxos_list = get_address_utxos(address)
-        for utxo in available_utxos_list:
-            utxo_amount = utxo[2]
-            address_balance += utxo_amount
-    return address_balance
+    return get_address_utxo_set(address).balance
 
 
 def assert_address_balance(address, expected_balance):
@@ -263,207 +354,361 @@ def assert_address_balance(address, expected_balance):
         print(f"Success: Correct balance: {expected_balance} for address {address}")
 
 
+def assert_address_balances(expected_balances):
+    # expected_balances = {address: expected_balance}; all the mismatches are reported before exiting
+    actual_balances = get_address_balances(expected_balances.keys())
+    mismatches = 0
+    for address, expected_balance in expected_balances.items():
+        actual_balance = actual_balances[address]
+        if actual_balance != expected_balance:
+            print(f"ERROR: Incorrect amount of funds for address {address}. "
+                  f"Actual: {actual_balance}  vs  Expected: {expected_balance}")
+            mismatches += 1
+        else:
+            print(f"Success: Correct balance: {expected_balance} for address {address}")
+    if mismatches:
+        print(f"ERROR: {mismatches} out of {len(expected_balances)} addresses have incorrect balances")
+        exit(2)
+
+
 def get_no_of_utxos_for_address(address):
-    available_utxos_list = get_address_utxos(address)
-    return len(available_utxos_list)
+    return len(get_address_utxo_set(address))
 
 
 def get_utxo_with_highest_value(address):
-    # this will return the utxo in this format: ('utxo_hash', utxo_ix, utxo_amount)
-    utxo_hash_highest_amount = ""
-    utxo_ix_highest_amount = ""
-    highest_amount = 0
-    available_utxos_list = get_address_utxos(address)
-    for utxo in available_utxos_list:
-        utxo_amount = utxo[2]
-        if utxo_amount > highest_amount:
-            highest_amount = utxo_amount
-            utxo_hash_highest_amount = utxo[0]
-            utxo_ix_highest_amount = utxo[1]
-    return [utxo_hash_highest_amount, utxo_ix_highest_amount, highest_amount]
+    # this will return the utxo in this format: ['utxo_hash', utxo_ix, utxo_amount]
+    highest_utxo = get_address_utxo_set(address).get_highest()
+    if highest_utxo is None:
+        return ["", "", 0]
+    return highest_utxo
 
 
 def calculate_tx_ttl():
-    current_tip = get_current_tip()
+    # the ttl has a margin of 1000 slots so an extrapolated tip is accurate enough
+    current_tip = get_current_tip(exact=False)
     return current_tip + 1000
 
 
 def calculate_tx_fee(tx_in_count, tx_out_count, ttl, **options):
+    # **options can be: signing_keys, certificates, withdrawal, has_metadata, use_cli
+    # the fee is estimated in-process (see fee_estimator.py); 'calculate-min-fee' is used when use_cli=True,
+    # when the tx has metadata (unknown size), for the first call of each tx shape and for a sample of the other calls
+    # (E2E_FEE_CROSS_CHECK_RATE)
+    if options.get("use_cli") or options.get("has_metadata"):
+        return calculate_tx_fee_cli(tx_in_count, tx_out_count, ttl, **options)
+
+    witness_count = len(options.get("signing_keys") or [])
+    withdrawal_count = 1 if options.get("withdrawal") else 0
+    estimated_fee = estimate_min_fee(get_protocol_params(), tx_in_count, tx_out_count, ttl, witness_count,
+                                     certificates=options.get("certificates"), withdrawal_count=withdrawal_count)
+    tx_shape = (tx_in_count, tx_out_count, witness_count, len(options.get("certificates") or []), withdrawal_count)
+    if should_cross_check_fee(tx_shape):
+        cli_fee = calculate_tx_fee_cli(tx_in_count, tx_out_count, ttl, **options)
+        record_fee_cross_check(estimated_fee, cli_fee)
+        return max(estimated_fee, cli_fee)
+    return estimated_fee
+
+
+def calculate_tx_fee_cli(tx_in_count, tx_out_count, ttl, **options):
     # **options can be: signing_keys, certificates, withdrawal, has_metadata
-    get_protocol_params()
-    cmd = "cardano-cli shelley transaction calculate-min-fee" \
-          " --testnet-magic " + TESTNET_MAGIC + \
-          " --tx-in-count " + str(tx_in_count) + \
-          " --tx-out-count " + str(tx_out_count) + \
-          " --ttl " + str(ttl) + \
-          " --protocol-params-file " + PROTOCOL_PARAMS_FILEPATH
-    try:
-        if options.get("signing_keys"):
-            signing_keys = options.get('signing_keys')
-            signing_keys_cmd = ''.join([" --signing-key-file " + key for key in signing_keys])
-            cmd = cmd + signing_keys_cmd
-        if options.get("certificates"):
-            certificates = options.get('certificates')
-            certificates_cmd = ''.join([" --certificate " + cert for cert in certificates])
-            cmd = cmd + certificates_cmd
-        if options.get("has_metadata"):
-            cmd = cmd + " --has-metadata "
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return int(result.split(': ')[1])
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    cmd = ["transaction", "calculate-min-fee",
+           "--testnet-magic", TESTNET_MAGIC,
+           "--tx-in-count", tx_in_count,
+           "--tx-out-count", tx_out_count,
+           "--ttl", ttl,
+           "--protocol-params-file", get_protocol_params_file()]
+    if options.get("signing_keys"):
+        for key in options.get('signing_keys'):
+            cmd += ["--signing-key-file", key]
+    if options.get("certificates"):
+        for cert in options.get('certificates'):
+            cmd += ["--certificate", cert]
+    if options.get("has_metadata"):
+        cmd.append("--has-metadata")
+    result = run_cli(cmd)
+    return int(result.split(': ')[1])
 
 
 def get_slot_length():
-    # TO DO: take this value from genesis; first define where genesis will be located
-    slot_length = 0.2
-    return slot_length
+    # from the genesis file (see chain_params.py)
+    return chain_params.slot_length
 
 
 def get_epoch_length():
-    # TO DO: take this value from genesis; first define where genesis will be located
-    epoch_length = 1500
-    return epoch_length
+    return chain_params.epoch_length
 
 
 def get_slots_per_kes_period():
-    # TO DO: take this value from genesis; first define where genesis will be located (slotsPerKESPeriod)``
-    slots_per_kes_period = 129600
-    return slots_per_kes_period
+    return chain_params.slots_per_kes_period
 
 
 def get_max_kes_evolutions():
-    # TO DO: take this value from genesis; first define where genesis will be located (maxKESEvolutions)``
-    max_kes_evolutions = 60
-    return max_kes_evolutions
+    return chain_params.max_kes_evolutions
 
 
-def wait_for_new_tip():
+def wait_for_new_tip(timeout_no_of_slots=200):
+    # the tip is polled by the shared tip_watcher thread (see tip_watcher.py)
     print("Waiting for a new block to be created")
-    slot_length = get_slot_length()
-    timeout_no_of_slots = 200
-    current_tip = get_current_tip()
-    initial_tip = get_current_tip()
-    print(f"initial_tip: {initial_tip}")
-    while current_tip == initial_tip:
-        sleep(slot_length)
-        current_tip = get_current_tip()
-        timeout_no_of_slots -= 1
-        if timeout_no_of_slots < 2:
-            print(f"ERROR: Waited for {timeout_no_of_slots} slots but no new block was created")
-            exit(2)
+    try:
+        with timed_wait("wait_for_new_tip"):
+            current_tip = tip_watcher.wait_for_next_block(timeout=timeout_no_of_slots * get_slot_length())
+    except TipWaitTimeout:
+        print(f"ERROR: Waited for {timeout_no_of_slots} slots but no new block was created")
+        exit(2)
     print(f"New block was created; slot number: {current_tip}")
 
 
-def wait_for_new_epoch(no_of_epochs_to_wait=1):
+def wait_for_epoch(epoch_no, timeout=None):
+    # blocks until the first block of epoch_no was created and returns the current epoch number; it sleeps until
+    # the wall-clock time of the epoch boundary (from the genesis systemStart), without querying the node, and
+    # then the tip_watcher polls for the first block of the epoch
+    # raises TipWaitTimeout (default timeout: until the end of epoch_no)
     slot_length = get_slot_length()
     epoch_length = get_epoch_length()
-    current_slot_no = get_current_tip()
-    current_epoch_no = get_current_epoch_no()
-    print(f"Current epoch: {current_epoch_no}; Waiting the beginning of epoch: {current_epoch_no + no_of_epochs_to_wait}")
+    if timeout is None:
+        timeout = (max(epoch_no - get_current_epoch_no(), 0) + 1) * epoch_length * slot_length
+    deadline = monotonic() + timeout
+    seconds_until_epoch = chain_params.get_seconds_until_slot(chain_params.get_epoch_start_slot(epoch_no))
+    if seconds_until_epoch and 0 < seconds_until_epoch < timeout:
+        print(f"Sleeping {round(seconds_until_epoch, 1)} seconds until the beginning of epoch {epoch_no}")
+        timed_sleep(seconds_until_epoch, "wait_for_epoch (until the epoch boundary)")
+    with timed_wait("wait_for_epoch (first block of the epoch)"):
+        current_slot_no = tip_watcher.wait_for_epoch(epoch_no, timeout=max(deadline - monotonic(), 0))
+    return int(current_slot_no / epoch_length)
 
-    timeout_no_of_epochs = no_of_epochs_to_wait + 1
+
+def wait_for_new_epoch(no_of_epochs_to_wait=1):
+    slot_length = get_slot_length()
+    epoch_length = get_epoch_length()
+    current_epoch_no = get_current_epoch_no(exact=True)
     expected_epoch_no = current_epoch_no + no_of_epochs_to_wait
+    print(f"Current epoch: {current_epoch_no}; Waiting the beginning of epoch: {expected_epoch_no}")
 
-    while current_epoch_no != expected_epoch_no:
-        sleep_slots = (current_epoch_no + 1) * epoch_length - current_slot_no
-        sleep_time = int(sleep_slots * slot_length) + 1
-        sleep(sleep_time)
-        current_epoch_no = get_current_epoch_no()
-        current_slot_no = get_current_tip()
-        timeout_no_of_epochs -= 1
-        if timeout_no_of_epochs < 1:
-            print(f"ERROR: Waited for {no_of_epochs_to_wait + 1} epochs and expected epoch no is not present")
-            exit(2)
+    timeout_no_of_epochs = no_of_epochs_to_wait + 1
+    try:
+        current_epoch_no = wait_for_epoch(expected_epoch_no, timeout=timeout_no_of_epochs * epoch_length * slot_length)
+    except TipWaitTimeout:
+        print(f"ERROR: Waited for {timeout_no_of_epochs} epochs and expected epoch no is not present")
+        exit(2)
     print(f"Expected epoch started; epoch number: {current_epoch_no}")
 
 
+def at_epoch(epoch_no, check, *args, name=None):
+    # run check(current_epoch_no, *args) at the beginning of epoch_no (see epoch_scheduler.py); all the checks
+    # registered in this process (so by the current scenario) share the same epoch waits
+    # returns an EpochCheck; its result() waits for the check (and raises the check errors, including exit())
+    return epoch_scheduler.at_epoch(epoch_no, check, *args, name=name)
+
+
 def build_raw_transaction(ttl, fee, **options):
-    # **options can be: tx_in, tx_out, certificates, withdrawal, metadata_file, update_proposal_file
+    # **options can be: tx_in, tx_out, certificates, withdrawal, metadata_file, update_proposal_file, out_file
     # tx_in = list of input utxos in this format: (utxo_hash#utxo_ix)
     # tx_out = list of outputs in this format: (address+amount)
+    # withdrawal = stake_address+amount
+    # out_file = path of the tx body file (default: a new build/sign/submit cycle of the tx workspace, see
+    #            tx_workspace.py)
+    # the body is written by 'build-raw' unless E2E_TX_BODY_BUILDER=native: it is then encoded in-process (see
+    # tx_body.py) and the returned path is a TxBody whose file is written only when a cardano-cli command needs it
     print(f"Building the raw transaction...")
 
-    out_file = "tx_raw.body"
+    out_file = options.get("out_file") or tx_workspace.new_cycle().body_file
+    options = dict(options, out_file=out_file)
+
+    if is_native_builder_enabled():
+        try:
+            tx_body = build_tx_body(ttl, fee, **options)
+            if not should_check_tx_body():
+                return [True, tx_body, ""]
+            # the file written by 'build-raw' (at the same path) is the golden file; it is kept if they differ
+            cli_result = build_raw_transaction_cli(ttl, fee, **options)
+            if cli_result[0] and check_tx_body(tx_body, cli_result[1]):
+                tx_body.written = True
+                return [True, tx_body, cli_result[2]]
+            return cli_result
+        except (ValueError, KeyError) as e:
+            # not supported natively (or invalid): cardano-cli builds the body (or reports the error)
+            print(f"WARNING: the tx body can't be encoded natively ({e}); using 'build-raw'")
+    return build_raw_transaction_cli(ttl, fee, **options)
+
+
+def build_raw_transaction_cli(ttl, fee, **options):
+    out_file = options.get("out_file") or tx_workspace.new_cycle().body_file
+
+    cmd = ["transaction", "build-raw",
+           "--fee", fee,
+           "--ttl", ttl,
+           "--out-file", out_file]
+    if options.get("tx_in"):
+        for tx_in_el in options.get('tx_in'):
+            cmd += ["--tx-in", tx_in_el]
+
+    if options.get("tx_out"):
+        for tx_out_el in options.get('tx_out'):
+            cmd += ["--tx-out", tx_out_el]
+
+    if options.get("certificates"):
+        for cert_file in options.get('certificates'):
+            cmd += ["--certificate-file", cert_file]
+
+    if options.get("withdrawal"):
+        cmd += ["--withdrawal", options.get("withdrawal")]
 
-    cmd = "cardano-cli shelley transaction build-raw" \
-          " --fee " + str(fee) + \
-          " --ttl " + str(ttl) + \
-          " --out-file " + out_file
     try:
-        if options.get("tx_in"):
-            tx_in = options.get('tx_in')
-            tx_in_cmd = ''.join([" --tx-in " + tx_in_el for tx_in_el in tx_in])
-            cmd = cmd + tx_in_cmd
-
-        if options.get("tx_out"):
-            tx_out = options.get('tx_out')
-            tx_out_cmd = ''.join([" --tx-out " + tx_out_el for tx_out_el in tx_out])
-            cmd = cmd + tx_out_cmd
-
-        if options.get("certificates"):
-            certificate_files = options.get('certificates')
-            certificates_cmd = ''.join([" --certificate-file " + cert_file for cert_file in certificate_files])
-            cmd = cmd + certificates_cmd
-
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
+        result = run_cli(cmd)
+        register_tx_file("tx_body", out_file)
         return [True, out_file, result]
-    except subprocess.CalledProcessError as e:
-        print(f"WARNING: command '{e.cmd}' return with error (code {e.returncode}): {' '.join(str(e.output).split())}")
-        return [False, ' '.join(str(e.output).split())]
+    except CLIError as e:
+        print(f"WARNING: {e}")
+        return [False, e.output]
 
 
 def sign_raw_transaction(tx_body_file, **options):
-    # **options can be: signing_keys
+    # **options can be: signing_keys, out_file
     # signing_keys = list of file paths for the signing keys
+    # out_file = path of the signed tx file (default: next to the tx body file when it is in the tx workspace, else
+    #            in a new cycle of the tx workspace)
     print(f"Signing the raw transaction...")
 
-    out_file = "tx_raw.signed"
+    out_file = options.get("out_file") or \
+        (tx_workspace.get_cycle(tx_body_file) or tx_workspace.new_cycle()).signed_file
+    if isinstance(tx_body_file, TxBody) and not tx_body_file.written:
+        register_tx_file("tx_body", tx_body_file.write())
 
-    cmd = "cardano-cli shelley transaction sign" \
-          " --testnet-magic " + TESTNET_MAGIC + \
-          " --tx-body-file " + tx_body_file + \
-          " --out-file " + out_file
-    try:
-        if options.get("signing_keys"):
-            signing_keys_list = options.get('signing_keys')
-            signing_key_cmd = ''.join([" --signing-key-file " + signing_key for signing_key in signing_keys_list])
-            cmd = cmd + signing_key_cmd
+    cmd = ["transaction", "sign",
+           "--testnet-magic", TESTNET_MAGIC,
+           "--tx-body-file", tx_body_file,
+           "--out-file", out_file]
+    if options.get("signing_keys"):
+        for signing_key in options.get('signing_keys'):
+            cmd += ["--signing-key-file", signing_key]
 
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
+    try:
+        result = run_cli(cmd)
+        register_tx_file("tx_signed", out_file)
         return [True, out_file, result]
-    except subprocess.CalledProcessError as e:
-        print(f"WARNING: command '{e.cmd}' return with error (code {e.returncode}): {' '.join(str(e.output).split())}")
-        return [False, ' '.join(str(e.output).split())]
+    except CLIError as e:
+        print(f"WARNING: {e}")
+        return [False, e.output]
 
 
 def submit_raw_transaction(tx_file):
+    # returns [True, result, tx_id] or [False, error]
+    # the tx is sent by the native client (see local_tx_submission.py) when E2E_TX_SUBMISSION=native; the error
+    # is then a TxRejection (the cardano-cli like text + the decoded failures); the txs submitted by concurrent
+    # threads (ex: the load generator workers) are pipelined over its connection
+    # the files of the build/sign/submit cycle of the tx (see tx_workspace.py) are deleted once it is submitted
     print(f"Submitting the raw transaction...")
+    if local_tx_submission.enabled:
+        try:
+            submit_result = get_submit_result(local_tx_submission.submit(read_text_envelope(tx_file)[1]))
+            tx_workspace.release(tx_file)
+            return submit_result
+        except NodeClientError as e:
+            print(f"WARNING: {e}; using cardano-cli for the tx submissions")
+            local_tx_submission.disable()
+    try:
+        result = run_cli(["transaction", "submit", "--testnet-magic", TESTNET_MAGIC, "--tx-file", tx_file])
+        return [True, result, get_tx_id(tx_file)]
+    except CLIError as e:
+        print(f"WARNING: {e}")
+        return [False, e.output]
+    finally:
+        tx_workspace.release(tx_file)
+
+
+def submit_raw_transactions(tx_files):
+    # 1 submit result (see submit_raw_transaction) per tx file, in the same order; with the native client, the txs
+    # are pipelined over its connection
+    if local_tx_submission.enabled:
+        print(f"Submitting {len(tx_files)} raw transactions...")
+        try:
+            submit_results = [get_submit_result(result) for result in
+                              local_tx_submission.submit_many([read_text_envelope(tx_file)[1] for tx_file in tx_files])]
+            for tx_file in tx_files:
+                tx_workspace.release(tx_file)
+            return submit_results
+        except NodeClientError as e:
+            print(f"WARNING: {e}; using cardano-cli for the tx submissions")
+            local_tx_submission.disable()
+    return [submit_raw_transaction(tx_file) for tx_file in tx_files]
+
+
+def get_submit_result(tx_submit_result):
+    # TxSubmitResult (native client) -> the submit_raw_transaction result
+    if tx_submit_result.accepted:
+        return [True, "Transaction successfully submitted.", tx_submit_result.tx_id]
+    print(f"WARNING: transaction {tx_submit_result.tx_id} rejected: {tx_submit_result.rejection}")
+    return [False, tx_submit_result.rejection]
+
+
+def get_tx_submit_failures(error):
+    # the names of the ledger failures (ex: ["ValueNotConservedUTxO"]) of a submit_raw_transaction error: decoded
+    # by the native client or found in the cardano-cli error text
+    if isinstance(error, TxRejection):
+        return error.failure_names
+    return re.findall(r"\b([A-Z]\w*(?:UTxO|UTXOW|DELEGS|DELEG|POOL))\b", str(error))
+
+
+def get_tx_id(tx_file):
+    # calculated locally (blake2b-256 of the tx body); 'transaction txid' is used only if the file can't be parsed
+    # tx_file can be a tx body file (build-raw) or a signed tx file (sign)
+    if isinstance(tx_file, TxBody):
+        return tx_file.tx_id
     try:
-        cmd = "cardano-cli shelley transaction submit" \
-              " --testnet-magic " + TESTNET_MAGIC + \
-              " --tx-file " + tx_file
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return [True, result]
-    except subprocess.CalledProcessError as e:
-        print(f"WARNING: command '{e.cmd}' return with error (code {e.returncode}): {' '.join(str(e.output).split())}")
-        return [False, ' '.join(str(e.output).split())]
+        return get_tx_id_from_file(tx_file)
+    except (ValueError, KeyError):
+        tx_file_type, _ = read_text_envelope(tx_file)
+        file_option = "--tx-body-file" if "Unsigned" in tx_file_type else "--tx-file"
+        return run_cli(["transaction", "txid", file_option, tx_file])
+
+
+def is_tx_in_ledger(tx_id, addresses=None):
+    # True if any output of the tx is in the utxo set of the given addresses (or in the whole utxo set)
+    utxo_sets = get_utxo_sets(addresses or [], whole_utxo=not addresses)
+    return any(utxo.tx_hash == tx_id for utxo_set in utxo_sets.values() for utxo in utxo_set)
+
+
+def wait_for_tx(tx_id, addresses=None, timeout=None):
+    # returns as soon as the outputs of the tx are in the utxo set; it is checked after every new block
+    # addresses = the tx output addresses (known for the txs sent by send_funds); if not known, the whole
+    #             utxo set is queried
+    # timeout = seconds to wait for the tx (default: WAIT_FOR_TX_TIMEOUT_NO_OF_SLOTS slots)
+    addresses = addresses or submitted_tx_addresses.get(tx_id)
+    if timeout is None:
+        timeout = WAIT_FOR_TX_TIMEOUT_NO_OF_SLOTS * get_slot_length()
+    deadline = monotonic() + timeout
+    print(f"Waiting for the transaction {tx_id} to be included into a block")
+    with tip_watcher:
+        while not is_tx_in_ledger(tx_id, addresses):
+            remaining_time = deadline - monotonic()
+            try:
+                if remaining_time <= 0:
+                    raise TipWaitTimeout(f"Timeout after {timeout} seconds")
+                with timed_wait("wait_for_tx"):
+                    tip_watcher.wait_for_next_block(timeout=remaining_time)
+            except TipWaitTimeout:
+                print(f"ERROR: Waited for {timeout} seconds but the transaction {tx_id} was not included into a block")
+                exit(2)
+    print(f"Transaction {tx_id} was included into a block")
 
 
 def send_funds(src_address, tx_fee, tx_ttl, **options):
-    # **options can be: transferred_amounts, destinations_list, signing_keys, certificates
-    input_utxos_list, transferred_amounts, signing_keys_list, certificates_list = [], [], [], []
+    # **options can be: transferred_amounts, destinations_list, signing_keys, certificates,
+    #                   coin_selection, max_inputs, fee_inputs, recalculate_fee, utxo_set
+    # coin_selection = name of the strategy used for selecting the inputs (see coin_selection.py); default: largest_first
+    # fee_inputs = number of inputs tx_fee was calculated for (default: 1); the fee is increased by the cost of the
+    #              extra inputs when more inputs are selected (recalculate_fee=False keeps tx_fee as it is)
+    # tx_fee must include the change output; a change lower than the cost of its output (or than minUTxOValue)
+    # goes into the fee instead of a change output
+    # utxo_set = UTxOSet of src_address used instead of querying the node; it is updated locally after the tx is
+    #            submitted (spent inputs removed, change added) so transactions can be chained back-to-back
+    #            without waiting for them to be included into a block; the change of a faucet with a utxo pool
+    #            stays leased by the caller until end_utxo_chain(utxo_set)
+    # returns the id of the submitted transaction
+    transferred_amounts, signing_keys_list, certificates_list = [], [], []
     required_funds, change = 0, 0
     tx_signed_file, tx_body_file = None, None
 
-    # get the balance of the source address
-    src_addr_balance = get_address_balance(src_address)
-
-    # get the highest amount utxo included into the source address
-    src_addr_highest_utxo_details = get_utxo_with_highest_value(src_address)
-    src_addr_highest_utxo_amount = src_addr_highest_utxo_details[2]
-
     # calculate the required funds for transaction (=sum(dest_addresses) + tx_fee)
     if options.get("transferred_amounts"):
         if not options.get("destinations_list"):
@@ -481,32 +726,86 @@ def send_funds(src_address, tx_fee, tx_ttl, **options):
     else:
         required_funds = tx_fee
 
-    # create the list of transaction inputs
-    input_utxos_list_for_tx = []
-    if src_addr_highest_utxo_amount >= required_funds:
-        input_utxo = src_addr_highest_utxo_details
-        change = src_addr_highest_utxo_amount - required_funds
-        input_utxos_list_for_tx.append(str(input_utxo[0]) + "#" + str(input_utxo[1]))
-    elif src_addr_balance >= required_funds:
-        input_utxos_list = get_address_utxos(src_address)
-        for utxo in input_utxos_list:
-            input_utxos_list_for_tx.append(str(utxo[0]) + "#" + str(utxo[1]))
-        change = src_addr_balance - required_funds
-    else:
-        print(
-            f"ERROR: Not enough funds; Required: {required_funds}  vs  Available: {src_addr_balance}; Change: {change}")
+    # get the utxos of the source address (only 1 'query utxo' call); a faucet with a utxo pool (see faucet.py)
+    # reserves 1 of its utxos for this tx instead, so the concurrent senders never spend the same utxo; when the
+    # utxos come from utxo_set (or from the node), the selected ones are claimed in the pool
+    src_addr_utxo_set = options.get("utxo_set")
+    faucet_pool = get_faucet_pool(src_address)
+    try:
+        leased_utxo = faucet_pool.lease(required_funds) if faucet_pool and src_addr_utxo_set is None else None
+    except FaucetPoolError as e:
+        print(f"ERROR: {e}")
         exit(2)
+    if leased_utxo:
+        src_addr_utxo_set = UTxOSet(src_address, [leased_utxo])
+    elif src_addr_utxo_set is None:
+        if faucet_pool:
+            print(f"WARNING: no utxo >= {required_funds} in the faucet pool of {src_address}")
+        src_addr_utxo_set = get_address_utxo_set(src_address)
+
+    # get the balance of the source address
+    src_addr_balance = src_addr_utxo_set.balance
+
+    # get the highest amount utxo included into the source address
+    src_addr_highest_utxo = src_addr_utxo_set.get_highest()
+    src_addr_highest_utxo_amount = src_addr_highest_utxo.amount if src_addr_highest_utxo else 0
+
+    # create the list of transaction inputs
+    protocol_params = get_protocol_params()
+    change_cost = estimate_tx_out_fee(protocol_params)
+    fee_for_inputs = no_fee
+    if options.get("recalculate_fee", True):
+        fee_inputs = options.get("fee_inputs", 1)
+
+        def fee_for_inputs(no_of_inputs):
+            return estimate_extra_inputs_fee(protocol_params, no_of_inputs, fee_inputs)
+
+    while True:
+        candidate_utxos = src_addr_utxo_set
+        if faucet_pool and not leased_utxo:
+            # only the pool utxos not leased by the other senders can be spent
+            available_tx_ins = faucet_pool.get_available_tx_ins()
+            candidate_utxos = [utxo for utxo in src_addr_utxo_set if utxo.tx_in in available_tx_ins]
+        try:
+            input_utxos = select_coins(candidate_utxos, required_funds,
+                                       strategy=options.get("coin_selection", "largest_first"),
+                                       fee_for_inputs=fee_for_inputs,
+                                       max_inputs=options.get("max_inputs"),
+                                       change_cost=change_cost)
+        except CoinSelectionError as e:
+            if leased_utxo:
+                faucet_pool.release([leased_utxo])
+            print(f"ERROR: Not enough funds; Required: {required_funds}  vs  Available: {src_addr_balance}; {e}")
+            exit(2)
+        # retried when a selected utxo was leased by another sender in the meantime
+        if not faucet_pool or leased_utxo or faucet_pool.claim(input_utxos):
+            break
+    # the faucet utxos leased (or claimed) for this tx
+    claimed_utxos = input_utxos if faucet_pool else []
+
+    extra_inputs_fee = fee_for_inputs(len(input_utxos))
+    tx_fee += extra_inputs_fee
+    required_funds += extra_inputs_fee
+    change = sum(utxo.amount for utxo in input_utxos) - required_funds
+    if options.get("destinations_list") and 0 < change < max(change_cost, protocol_params.get("minUTxOValue") or 0):
+        # a change output would cost more than its value (or would be rejected as too small)
+        print(f"The change ({change}) goes into the fee")
+        tx_fee += change
+        required_funds += change
+        change = 0
+    input_utxos_list_for_tx = [utxo.tx_in for utxo in input_utxos]
 
     # create the list of transaction outputs
-    out_change_list = []
+    tx_outputs = []
     if options.get("destinations_list"):
         destinations_list = options.get('destinations_list')
         for dst, dst_amount in zip(destinations_list, transferred_amounts):
-            out_change_list.append(dst + "+" + str(dst_amount))
+            tx_outputs.append((dst, dst_amount))
         if change > 0:
-            out_change_list.append(src_address + "+" + str(change))
+            tx_outputs.append((src_address, change))
     else:
-        out_change_list.append(src_address + "+" + str(change))
+        tx_outputs.append((src_address, change))
+    out_change_list = [dst + "+" + str(dst_amount) for dst, dst_amount in tx_outputs]
 
     # create the list of transaction signing keys
     if options.get("signing_keys"):
@@ -517,6 +816,7 @@ def send_funds(src_address, tx_fee, tx_ttl, **options):
         certificates_list = options.get('certificates')
 
     print(f"required_funds: {required_funds}")
+    print(f"no_of_inputs: {len(input_utxos_list_for_tx)}")
     print(f"change: {change}")
     print(f"src_addr_highest_utxo_amount: {src_addr_highest_utxo_amount}")
     print(f"src_addr_balance: {src_addr_balance}")
@@ -525,7 +825,9 @@ def send_funds(src_address, tx_fee, tx_ttl, **options):
     tx_build_result = build_raw_transaction(tx_ttl, tx_fee, tx_in=input_utxos_list_for_tx, tx_out=out_change_list,
                                             certificates=certificates_list)
     if not tx_build_result[0]:
-        print(f"ERROR: transaction not successfully builded --> {tx_build_result[2]}")
+        if claimed_utxos:
+            faucet_pool.release(claimed_utxos)
+        print(f"ERROR: transaction not successfully builded --> {tx_build_result[1]}")
         exit(2)
     else:
         tx_body_file = tx_build_result[1]
@@ -533,7 +835,9 @@ def send_funds(src_address, tx_fee, tx_ttl, **options):
     # sign the raw transaction
     tx_sign_result = sign_raw_transaction(tx_body_file, signing_keys=signing_keys_list)
     if not tx_sign_result[0]:
-        print(f"ERROR: transaction not successfully signed --> {tx_sign_result[2]}")
+        if claimed_utxos:
+            faucet_pool.release(claimed_utxos)
+        print(f"ERROR: transaction not successfully signed --> {tx_sign_result[1]}")
         exit(2)
     else:
         tx_signed_file = tx_sign_result[1]
@@ -541,51 +845,93 @@ def send_funds(src_address, tx_fee, tx_ttl, **options):
     # submit the raw transaction
     tx_submit_result = submit_raw_transaction(tx_signed_file)
     if not tx_submit_result[0]:
+        if claimed_utxos:
+            faucet_pool.release(claimed_utxos)
         print(f"ERROR: transaction not successfully submitted --> {tx_submit_result[1]}")
         exit(2)
 
+    tx_id = tx_submit_result[2]
+    submitted_tx_addresses[tx_id] = list(dict.fromkeys(dst for dst, _ in tx_outputs))
+    if claimed_utxos:
+        # the change of a chain of txs (utxo_set) stays leased: it is spent by the next tx of the chain
+        faucet_pool.spend(claimed_utxos, [UTxO(tx_id, tx_ix, dst_amount, src_address)
+                                          for tx_ix, (dst, dst_amount) in enumerate(tx_outputs) if dst == src_address],
+                          keep_leased=options.get("utxo_set") is not None)
+    if options.get("utxo_set") is not None:
+        # the outputs of the (not yet confirmed) tx can be spent by the next tx of the chain
+        for utxo in input_utxos:
+            src_addr_utxo_set.remove(utxo.tx_in)
+        for tx_ix, (dst, dst_amount) in enumerate(tx_outputs):
+            if dst == src_address:
+                src_addr_utxo_set.add(UTxO(tx_id, tx_ix, dst_amount, src_address))
+    return tx_id
+
+
+def end_utxo_chain(utxo_set):
+    # the change of the last tx of a chain (see send_funds utxo_set) goes back to the faucet pool of its address (if
+    # any), so the other senders (including the other threads of this process) can lease it
+    faucet_pool = get_faucet_pool(utxo_set.address)
+    if faucet_pool:
+        faucet_pool.release(list(utxo_set))
+
+
+def split_faucet(faucet_address, faucet_skey_file, no_of_utxos, amount_per_utxo=None):
+    # split the faucet funds into no_of_utxos utxos through a single tx and create the faucet pool (see faucet.py);
+    # after this, the concurrent send_funds calls from faucet_address use different utxos
+    # amount_per_utxo = default: the faucet balance split in equal parts
+    faucet_pool = FaucetPool(faucet_address)
+    faucet_pool.remove()
+    utxo_set = get_address_utxo_set(faucet_address)
+    tx_ttl = calculate_tx_ttl()
+    tx_fee = calculate_tx_fee(len(utxo_set), no_of_utxos + 1, tx_ttl, signing_keys=[faucet_skey_file])
+    if amount_per_utxo is None:
+        amount_per_utxo = (utxo_set.balance - tx_fee) // no_of_utxos
+
+    print(f"Splitting the faucet {faucet_address} into {no_of_utxos} utxos of {amount_per_utxo} Lovelace")
+    tx_id = send_funds(faucet_address, tx_fee, tx_ttl,
+                       destinations_list=[faucet_address] * no_of_utxos,
+                       transferred_amounts=[amount_per_utxo] * no_of_utxos,
+                       signing_keys=[faucet_skey_file],
+                       fee_inputs=len(utxo_set),
+                       utxo_set=utxo_set)
+    # all the (not yet confirmed) utxos of the faucet go into the pool; the next txs can spend them right away
+    faucet_pool.reset(list(utxo_set))
+    return tx_id
+
 
 def gen_kes_key_pair(location, node_name):
-    try:
-        cmd = "cardano-cli shelley node key-gen-KES " + \
-              " --verification-key-file " + location + "/" + node_name + "_kes.vkey" + \
-              " --signing-key-file " + location + "/" + node_name + "_kes.skey"
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + node_name + "_kes.vkey", location + "/" + node_name + "_kes.skey"
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["node", "key-gen-KES",
+             "--verification-key-file", location + "/" + node_name + "_kes.vkey",
+             "--signing-key-file", location + "/" + node_name + "_kes.skey"])
+    register_artifact("kes_vkey", node_name, location + "/" + node_name + "_kes.vkey")
+    register_artifact("kes_skey", node_name, location + "/" + node_name + "_kes.skey")
+    return location + "/" + node_name + "_kes.vkey", location + "/" + node_name + "_kes.skey"
 
 
 def gen_vrf_key_pair(location, node_name):
-    try:
-        cmd = "cardano-cli shelley node key-gen-VRF " + \
-              " --verification-key-file " + location + "/" + node_name + "_vrf.vkey" + \
-              " --signing-key-file " + location + "/" + node_name + "_vrf.skey"
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + node_name + "_vrf.vkey", location + "/" + node_name + "_vrf.skey"
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["node", "key-gen-VRF",
+             "--verification-key-file", location + "/" + node_name + "_vrf.vkey",
+             "--signing-key-file", location + "/" + node_name + "_vrf.skey"])
+    register_artifact("vrf_vkey", node_name, location + "/" + node_name + "_vrf.vkey")
+    register_artifact("vrf_skey", node_name, location + "/" + node_name + "_vrf.skey")
+    return location + "/" + node_name + "_vrf.vkey", location + "/" + node_name + "_vrf.skey"
 
 
 def gen_cold_key_pair_and_counter(location, node_name):
-    try:
-        cmd = "cardano-cli shelley node key-gen" + \
-              " --verification-key-file " + location + "/" + node_name + "_cold.vkey" + \
-              " --signing-key-file " + location + "/" + node_name + "_cold.skey" + \
-              " --operational-certificate-issue-counter " + location + "/" + node_name + "_cold.counter"
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + node_name + "_cold.vkey", location + \
-               "/" + node_name + "_cold.skey", location + \
-               "/" + node_name + "_cold.counter"
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["node", "key-gen",
+             "--verification-key-file", location + "/" + node_name + "_cold.vkey",
+             "--signing-key-file", location + "/" + node_name + "_cold.skey",
+             "--operational-certificate-issue-counter", location + "/" + node_name + "_cold.counter"])
+    register_artifact("cold_vkey", node_name, location + "/" + node_name + "_cold.vkey")
+    register_artifact("cold_skey", node_name, location + "/" + node_name + "_cold.skey")
+    register_artifact("cold_counter", node_name, location + "/" + node_name + "_cold.counter")
+    return location + "/" + node_name + "_cold.vkey", location + \
+           "/" + node_name + "_cold.skey", location + \
+           "/" + node_name + "_cold.counter"
 
 
 def get_actual_kes_period():
-    actual_slot_no = get_current_tip()
+    actual_slot_no = get_current_tip(exact=False)
     slots_per_kes_period = get_slots_per_kes_period()
     current_kes_period = int(actual_slot_no / slots_per_kes_period)
     return current_kes_period
@@ -595,100 +941,74 @@ def gen_node_operational_cert(node_kes_vkey_file, node_cold_skey_file, node_cold
     # this certificate is used when starting the node and not submitted throw a tx
     current_kes_period = get_actual_kes_period()
     suffix_str = ".opcert"
-    try:
-        cmd = "cardano-cli shelley node issue-op-cert" + \
-              " --hot-kes-verification-key-file " + node_kes_vkey_file + \
-              " --cold-signing-key-file " + node_cold_skey_file + \
-              " --operational-certificate-issue-counter " + node_cold_counter_file + \
-              " --kes-period " + str(current_kes_period) + \
-              " --out-file " + location + "/" + node_name + suffix_str
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + node_name + suffix_str
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["node", "issue-op-cert",
+             "--hot-kes-verification-key-file", node_kes_vkey_file,
+             "--cold-signing-key-file", node_cold_skey_file,
+             "--operational-certificate-issue-counter", node_cold_counter_file,
+             "--kes-period", current_kes_period,
+             "--out-file", location + "/" + node_name + suffix_str])
+    register_artifact("node_operational_cert", node_name, location + "/" + node_name + suffix_str)
+    return location + "/" + node_name + suffix_str
 
 
 def gen_pool_metadata_hash(pool_metadata_file):
-    try:
-        cmd = "cardano-cli shelley stake-pool metadata-hash" + \
-              " --pool-metadata-file " + pool_metadata_file
-        metadata_hash = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return metadata_hash
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    metadata_hash = run_cli(["stake-pool", "metadata-hash", "--pool-metadata-file", pool_metadata_file])
+    return metadata_hash
 
 
 def gen_pool_registration_cert(pool_pledge, pool_cost, pool_margin, node_vrf_vkey_file, node_cold_vkey_file,
                                owner_stake_addr_vkey_file, location, node_name, **options):
     suffix_str = "_pool_reg.cert"
-    cmd = "cardano-cli shelley stake-pool registration-certificate" + \
-          " --pool-pledge " + str(pool_pledge) + \
-          " --pool-cost " + str(pool_cost) + \
-          " --pool-margin " + str(pool_margin) + \
-          " --vrf-verification-key-file " + node_vrf_vkey_file + \
-          " --cold-verification-key-file " + node_cold_vkey_file + \
-          " --pool-reward-account-verification-key-file " + owner_stake_addr_vkey_file + \
-          " --pool-owner-stake-verification-key-file " + owner_stake_addr_vkey_file + \
-          " --testnet-magic " + TESTNET_MAGIC + \
-          " --out-file " + location + "/" + node_name + suffix_str
-    try:
-        # pool_metadata is a list of: [pool_metadata_url, pool_metadata_hash]
-        if options.get("pool_metadata") and len(options.get("pool_metadata")) == 2:
-            pool_metadata_url = options.get('pool_metadata')[0]
-            pool_metadata_hash = options.get('pool_metadata')[1]
-            pool_metadata_cmd = " --metadata-url " + pool_metadata_url + " --metadata-hash " + pool_metadata_hash
-            cmd = cmd + pool_metadata_cmd
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + node_name + suffix_str
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    cmd = ["stake-pool", "registration-certificate",
+           "--pool-pledge", pool_pledge,
+           "--pool-cost", pool_cost,
+           "--pool-margin", pool_margin,
+           "--vrf-verification-key-file", node_vrf_vkey_file,
+           "--cold-verification-key-file", node_cold_vkey_file,
+           "--pool-reward-account-verification-key-file", owner_stake_addr_vkey_file,
+           "--pool-owner-stake-verification-key-file", owner_stake_addr_vkey_file,
+           "--testnet-magic", TESTNET_MAGIC,
+           "--out-file", location + "/" + node_name + suffix_str]
+    # pool_metadata is a list of: [pool_metadata_url, pool_metadata_hash]
+    if options.get("pool_metadata") and len(options.get("pool_metadata")) == 2:
+        pool_metadata_url = options.get('pool_metadata')[0]
+        pool_metadata_hash = options.get('pool_metadata')[1]
+        cmd += ["--metadata-url", pool_metadata_url, "--metadata-hash", pool_metadata_hash]
+    run_cli(cmd)
+    register_artifact("pool_registration_cert", node_name, location + "/" + node_name + suffix_str)
+    return location + "/" + node_name + suffix_str
 
 
 def gen_pool_deregistration_cert(cold_verification_key_file, epoch_no, location, node_name):
     suffix_str = "_pool_dereg.cert"
-    cmd = "cardano-cli shelley stake-pool deregistration-certificate" + \
-          " --cold-verification-key-file " + cold_verification_key_file + \
-          " --epoch " + str(epoch_no) + \
-          " --out-file " + location + "/" + node_name + suffix_str
-    try:
-        subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return location + "/" + node_name + suffix_str
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    run_cli(["stake-pool", "deregistration-certificate",
+             "--cold-verification-key-file", cold_verification_key_file,
+             "--epoch", epoch_no,
+             "--out-file", location + "/" + node_name + suffix_str])
+    register_artifact("pool_deregistration_cert", node_name, location + "/" + node_name + suffix_str)
+    return location + "/" + node_name + suffix_str
 
 
-def get_ledger_state():
+def query_ledger_state_paths(paths):
+    # only the requested subtrees (ex: REGISTERED_POOLS_PATH) are parsed, while the ledger state is streamed
+    # from the cardano-cli stdout; returns {path: value}
     set_node_socket_path_env_var()
-    try:
-        cmd = "cardano-cli shelley query ledger-state" + \
-              " --testnet-magic " + TESTNET_MAGIC
-        output = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        output_json = json.loads(output)
-        return output_json
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    with stream_cli(["query", "ledger-state", "--testnet-magic", TESTNET_MAGIC]) as stdout:
+        return extract_json_paths(stdout, paths)
+
+
+def get_ledger_state_paths(paths):
+    # the values are reused while the tip doesn't change
+    return ledger_state_cache.get(paths)
 
 
 def get_registered_stake_pools_ledger_state():
-    ledger_state = get_ledger_state()
-    registered_pools_details = ledger_state["esLState"]["_delegationState"]["_pstate"]["_pParams"]
-    return registered_pools_details
+    return get_ledger_state_paths([REGISTERED_POOLS_PATH])[REGISTERED_POOLS_PATH]
 
 
 def get_stake_pool_id(pool_cold_vkey_file):
-    try:
-        cmd = "cardano-cli shelley stake-pool id" + \
-              " --verification-key-file " + pool_cold_vkey_file
-        pool_id = subprocess.check_output(cmd, shell=True, stderr=subprocess.STDOUT).decode("utf-8").strip()
-        return pool_id
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError("command '{}' return with error (code {}): {}".format(e.cmd, e.returncode,
-                                                                                 ' '.join(str(e.output).split())))
+    pool_id = run_cli(["stake-pool", "id", "--verification-key-file", pool_cold_vkey_file])
+    return pool_id
 
 
 def create_and_register_stake_pool(location, pool_name, pool_pledge, pool_cost, pool_margin, pool_owner, **options):
@@ -718,12 +1038,11 @@ def create_and_register_stake_pool(location, pool_name, pool_pledge, pool_cost,
     signing_keys_list = [pool_owner[2], pool_owner[5], node_cold_skey_file]
     tx_fee = calculate_tx_fee(1, 1, tx_ttl, certificates=[pool_reg_cert_file], signing_keys=signing_keys_list)
     pool_deposit = get_pool_deposit()
-    send_funds(pool_owner[0], tx_fee + pool_deposit, tx_ttl,
-               certificates=[pool_reg_cert_file],
-               signing_keys=signing_keys_list)
+    tx_id = send_funds(pool_owner[0], tx_fee + pool_deposit, tx_ttl,
+                       certificates=[pool_reg_cert_file],
+                       signing_keys=signing_keys_list)
 
-    wait_for_new_tip()
-    wait_for_new_tip()
+    wait_for_tx(tx_id)
 
     stake_pool_id = get_stake_pool_id(node_cold_vkey_file)
     return stake_pool_id, node_cold_vkey_file, node_cold_skey_file
@@ -740,9 +1059,23 @@ def deregister_stake_pool(pool_owner, node_cold_vkey_file, node_cold_skey_file,
     tx_ttl = calculate_tx_ttl()
     signing_keys_list = [pool_owner[2], pool_owner[5], node_cold_skey_file]
     tx_fee = calculate_tx_fee(1, 1, tx_ttl, certificates=[pool_dereg_cert_file], signing_keys=signing_keys_list)
-    send_funds(pool_owner[0], tx_fee, tx_ttl,
-               certificates=[pool_dereg_cert_file],
-               signing_keys=signing_keys_list)
-
-    wait_for_new_tip()
-    wait_for_new_tip()
+    tx_id = send_funds(pool_owner[0], tx_fee, tx_ttl,
+                       certificates=[pool_dereg_cert_file],
+                       signing_keys=signing_keys_list)
+
+    wait_for_tx(tx_id)
+
+
+artifact_store = ArtifactStore()
+local_state_query = LocalStateQueryClient(NODE_SOCKET_PATH, TESTNET_MAGIC)
+local_tx_submission = LocalTxSubmissionClient(NODE_SOCKET_PATH, TESTNET_MAGIC)
+chain_params = ChainParams()
+tip_provider = TipProvider(query_tip, get_slot_length)
+tip_watcher = TipWatcher(query_tip, get_slot_length, get_epoch_length, on_new_tip=tip_provider.update)
+protocol_params_cache = ProtocolParamsCache(query_protocol_params, get_current_epoch_no)
+stake_distribution_history = StakeDistributionHistory(query_stake_distribution,
+                                                      lambda: get_current_epoch_no(exact=True))
+epoch_scheduler = EpochScheduler(wait_for_epoch, lambda: get_current_epoch_no(exact=True))
+key_factory = KeyFactory()
+tx_workspace = TxWorkspace()
+ledger_state_cache = LedgerStateCache(query_ledger_state_paths, query_tip)
@@ -0,0 +1,109 @@
+import re
+
+
+class UTxO:
+    # it can be used like the old list format: ['utxo_hash', utxo_ix, utxo_amount]
+    __slots__ = ("tx_hash", "tx_ix", "amount", "address")
+
+    def __init__(self, tx_hash, tx_ix, amount, address=None):
+        self.tx_hash = tx_hash
+        self.tx_ix = tx_ix
+        self.amount = amount
+        self.address = address
+
+    @property
+    def tx_in(self):
+        # format used by 'transaction build-raw --tx-in': utxo_hash#utxo_ix
+        return f"{self.tx_hash}#{self.tx_ix}"
+
+    def __iter__(self):
+        return iter((self.tx_hash, self.tx_ix, self.amount))
+
+    def __getitem__(self, index):
+        return (self.tx_hash, self.tx_ix, self.amount)[index]
+
+    def __len__(self):
+        return 3
+
+    def __eq__(self, other):
+        if isinstance(other, UTxO):
+            return (self.tx_hash, self.tx_ix, self.amount) == (other.tx_hash, other.tx_ix, other.amount)
+        return list(self) == list(other)
+
+    def __hash__(self):
+        return hash((self.tx_hash, self.tx_ix))
+
+    def __repr__(self):
+        return f"UTxO({self.tx_in}, {self.amount})"
+
+
+def parse_utxo_table(output, address=None):
+    # output of 'query utxo': 2 header lines ('TxHash  TxIx  Lovelace' and '-----') and then 1 line per utxo
+    utxos = []
+    for line in output.splitlines()[2:]:
+        if not line.strip():
+            continue
+        formatted_utxo = re.split("[\\s,]+", line.strip())
+        utxos.append(UTxO(formatted_utxo[0], int(formatted_utxo[1]), int(formatted_utxo[2]), address))
+    return utxos
+
+
+class UTxOSet:
+    # UTxOs of one address, indexed by tx_in; the balance is kept up to date on every add/remove so all the
+    # balance/count/highest value questions are answered from memory after a single 'query utxo'
+    def __init__(self, address, utxos=()):
+        self.address = address
+        self.utxos = {}
+        self.balance = 0
+        for utxo in utxos:
+            self.add(utxo)
+
+    def __len__(self):
+        return len(self.utxos)
+
+    def __iter__(self):
+        return iter(self.utxos.values())
+
+    def __contains__(self, tx_in):
+        return tx_in in self.utxos
+
+    def add(self, utxo):
+        if utxo.tx_in in self.utxos:
+            return
+        self.utxos[utxo.tx_in] = utxo
+        self.balance += utxo.amount
+
+    def remove(self, tx_in):
+        utxo = self.utxos.pop(tx_in)
+        self.balance -= utxo.amount
+        return utxo
+
+    def get_highest(self):
+        return max(self.utxos.values(), key=lambda utxo: utxo.amount, default=None)
+
+    def get_sorted(self, reverse=True):
+        return sorted(self.utxos.values(), key=lambda utxo: utxo.amount, reverse=reverse)
+
+
+def parse_utxo_json(utxo_json):
+    # output of 'query utxo --out-file': {"utxo_hash#utxo_ix": {"address": .., "amount": ..}, ...}
+    utxos = []
+    for tx_in, tx_out in utxo_json.items():
+        tx_hash, tx_ix = tx_in.split("#")
+        amount = tx_out["amount"]
+        if isinstance(amount, dict):
+            amount = amount["lovelace"]
+        utxos.append(UTxO(tx_hash, int(tx_ix), int(amount), tx_out["address"]))
+    return utxos
+
+
+def group_utxos_by_address(utxos, addresses=None):
+    # {address: UTxOSet}; there is an (empty) set for each of the requested addresses
+    # addresses = None: 1 set for each address found in the utxos
+    utxo_sets = {address: UTxOSet(address) for address in addresses or []}
+    for utxo in utxos:
+        if addresses is None and utxo.address not in utxo_sets:
+            utxo_sets[utxo.address] = UTxOSet(utxo.address)
+        if utxo.address in utxo_sets:
+            utxo_sets[utxo.address].add(utxo)
+    return utxo_sets
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import queue
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+
+# TO DO: this could be moved out of the scripts (somehow..)
+dir_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, dir_path)
+
+from e2e_scenarios.cli import CARDANO_CLI_ENV_VAR
+from e2e_scenarios.constants import TESTS_ROOT_DIR_PATH, USER1_SKEY_FILE_PATH, \
+    SIMULATOR_LEDGER_FILE_PATH, get_user1_address
+from e2e_scenarios.faucet import FaucetPool
+from e2e_scenarios.tx_workspace import get_base_dir_path
+from e2e_scenarios.tx_body import TX_BODY_BUILDER_ENV_VAR, GOLDEN_DIR_PATH, check_golden_files
+from e2e_scenarios.utils import create_payment_key_pair_and_address, read_address_from_file, get_address_balance, \
+    get_address_balances, calculate_tx_ttl, calculate_tx_fee, send_funds, wait_for_tx, split_faucet, key_factory, \
+    artifact_store
+
+# Run the e2e scenarios in parallel (replacement for the serial loop from tests-runner.sh)
+# - each scenario runs in its own process; its output goes to e2e-tests-directory/logs/<scenario>.log and it is
+#   printed (in one block) when the scenario finishes; the exit codes are added to tests-results.txt ($test:$code)
+# - each worker has its own faucet wallet (funded by user1 through a single transaction) so the parallel scenarios
+#   don't try to spend the same user1 utxos
+# - the scenarios waiting for new epochs are started first, so the total run time is close to the run time of
+#   the longest scenario
+# Usage (from the root directory - the one containing e2e-tests-directory):
+#   ./python_scripts/run_scenarios.py --workers 4
+#   ./python_scripts/run_scenarios.py --simulator   (no cluster needed; see simulator/cardano_cli.py)
+
+SCENARIOS_DIR_PATH = os.path.join(dir_path, "e2e_scenarios")
+LOGS_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, "logs")
+WORKERS_DIR_PATH = os.path.join(TESTS_ROOT_DIR_PATH, "workers")
+TESTS_RESULTS_FILEPATH = os.path.join(TESTS_ROOT_DIR_PATH, "tests-results.txt")
+SIMULATOR_CLI_PATH = os.path.join(dir_path, "simulator", "cardano_cli.py")
+
+# scenarios calling these functions are bound by the epoch length
+EPOCH_BOUND_MARKERS = ("wait_for_new_epoch(", "at_epoch(")
+
+# exit code used for the scenarios killed after the timeout (same as the 'timeout' command)
+TIMEOUT_EXIT_CODE = 124
+
+output_lock = Lock()
+
+
+def get_scenarios(scenarios_dir_path, name_filter=None):
+    # the same scenarios as the old runner: all the files containing 'test.py'
+    scenarios = sorted(f for f in os.listdir(scenarios_dir_path) if "test.py" in f)
+    if name_filter:
+        scenarios = [f for f in scenarios if name_filter in f]
+    return scenarios
+
+
+def is_epoch_bound(scenario_path):
+    with open(scenario_path) as file:
+        source = file.read()
+    return any(marker in source for marker in EPOCH_BOUND_MARKERS)
+
+
+def order_scenarios(scenarios_dir_path, scenarios):
+    # the epoch bound scenarios first (they are the longest ones)
+    epoch_bound = [s for s in scenarios if is_epoch_bound(os.path.join(scenarios_dir_path, s))]
+    return epoch_bound + [s for s in scenarios if s not in epoch_bound]
+
+
+def start_simulator(slot_length, epoch_length):
+    # the scenarios (and this runner) call the cardano-cli simulator instead of cardano-cli; the simulated
+    # cluster (genesis file, user1 + its funds) is created by the first run
+    os.environ[CARDANO_CLI_ENV_VAR] = SIMULATOR_CLI_PATH
+    if not os.path.isfile(SIMULATOR_LEDGER_FILE_PATH):
+        subprocess.run([sys.executable, SIMULATOR_CLI_PATH, "init", "--slot-length", str(slot_length),
+                        "--epoch-length", str(epoch_length)], check=True)
+
+
+def get_worker_wallet(worker_no):
+    # the wallets (and their funds) are reused by the next runs
+    wallet_name = f"worker{worker_no}"
+    location = os.path.join(WORKERS_DIR_PATH, wallet_name)
+    Path(location).mkdir(parents=True, exist_ok=True)
+    skey_file = os.path.join(location, wallet_name + ".skey")
+    vkey_file = os.path.join(location, wallet_name + ".vkey")
+    if os.path.isfile(skey_file) and os.path.isfile(os.path.join(location, wallet_name + ".addr")):
+        address = read_address_from_file(location, wallet_name + ".addr")
+    else:
+        address, vkey_file, skey_file = create_payment_key_pair_and_address(location, wallet_name)
+    return {"name": wallet_name, "address": address, "vkey": vkey_file, "skey": skey_file, "location": location}
+
+
+def fund_worker_wallets(wallets, funds_per_worker):
+    # top up all the worker wallets from user1 through a single transaction
+    user1_address = get_user1_address()
+    balances = get_address_balances([wallet["address"] for wallet in wallets])
+    if funds_per_worker is None:
+        funds_per_worker = get_address_balance(user1_address) // (len(wallets) + 1)
+
+    top_ups = {wallet["address"]: funds_per_worker - balances[wallet["address"]] for wallet in wallets
+               if balances[wallet["address"]] < funds_per_worker}
+    if not top_ups:
+        print(f"All the {len(wallets)} worker wallets have at least {funds_per_worker} Lovelace")
+        return
+
+    print(f"Funding {len(top_ups)} worker wallet(s) with up to {funds_per_worker} Lovelace each")
+    tx_ttl = calculate_tx_ttl()
+    tx_fee = calculate_tx_fee(1, len(top_ups) + 1, tx_ttl, signing_keys=[USER1_SKEY_FILE_PATH])
+    tx_id = send_funds(user1_address, tx_fee, tx_ttl,
+                       destinations_list=list(top_ups),
+                       transferred_amounts=list(top_ups.values()),
+                       signing_keys=[USER1_SKEY_FILE_PATH])
+    wait_for_tx(tx_id)
+
+
+def run_scenario(scenario, wallets_queue, timeout):
+    wallet = wallets_queue.get()
+    try:
+        env = dict(os.environ)
+        if wallet:
+            env["E2E_FAUCET_ADDRESS"] = wallet["address"]
+            env["E2E_FAUCET_SKEY"] = wallet["skey"]
+            env["E2E_FAUCET_VKEY"] = wallet["vkey"]
+            # the tx files of the worker are kept apart (on tmpfs when available; see tx_workspace.py)
+            env["E2E_TX_FILES_DIR"] = os.path.join(get_base_dir_path(), f"e2e-{wallet['name']}")
+
+        # each scenario run creates its own work directory in the artifact store (see artifact_store.py)
+        scenario_path = os.path.relpath(os.path.join(SCENARIOS_DIR_PATH, scenario))
+        log_file_path = os.path.join(LOGS_DIR_PATH, scenario.replace(".py", ".log"))
+        start = monotonic()
+        with open(log_file_path, 'w') as log_file:
+            try:
+                exit_code = subprocess.run([sys.executable, scenario_path], stdout=log_file,
+                                           stderr=subprocess.STDOUT, env=env, timeout=timeout).returncode
+            except subprocess.TimeoutExpired:
+                exit_code = TIMEOUT_EXIT_CODE
+        duration = monotonic() - start
+
+        with output_lock:
+            with open(log_file_path) as log_file:
+                print(f"======================== {scenario} ({wallet['name'] if wallet else 'user1'}) "
+                      f"========================")
+                print(log_file.read(), end="")
+            print(f"{scenario}: exit code {exit_code}; {round(duration, 1)} seconds")
+            with open(TESTS_RESULTS_FILEPATH, 'a') as results_file:
+                results_file.write(f"{scenario}:{exit_code}\n")
+            sys.stdout.flush()
+        return scenario, exit_code, duration
+    finally:
+        if wallet:
+            # empty once the scenario process has removed its tx workspace (kept with E2E_KEEP_TX_FILES=1)
+            try:
+                os.rmdir(os.path.join(get_base_dir_path(), f"e2e-{wallet['name']}"))
+            except OSError:
+                pass
+        wallets_queue.put(wallet)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the e2e scenarios in parallel")
+    parser.add_argument("--workers", type=int, default=4, help="number of scenarios running at the same time")
+    parser.add_argument("--funds-per-worker", type=int, default=None,
+                        help="Lovelace in each worker wallet; default: user1 balance / (workers + 1)")
+    parser.add_argument("--faucet-utxos", type=int, default=0,
+                        help="split the faucet of each worker into this number of utxos (see faucet.py)")
+    parser.add_argument("--key-stock", type=int, default=0,
+                        help="top up the stock of pre-generated key pairs to this size (see key_factory.py)")
+    parser.add_argument("--keep-runs", type=int, default=1,
+                        help="work directories kept for each scenario from the previous runs (see artifact_store.py)")
+    parser.add_argument("--timeout", type=int, default=None, help="max number of seconds for each scenario")
+    parser.add_argument("--simulator", action="store_true",
+                        help="run the scenarios against the cardano-cli simulator (see simulator/cardano_cli.py)")
+    parser.add_argument("--simulator-slot-length", type=float, default=0.02,
+                        help="seconds; used when the simulator is initialized")
+    parser.add_argument("--simulator-epoch-length", type=int, default=100,
+                        help="slots; used when the simulator is initialized")
+    parser.add_argument("--filter", default=None, help="run only the scenarios containing this string")
+    args = parser.parse_args()
+
+    scenarios = order_scenarios(SCENARIOS_DIR_PATH, get_scenarios(SCENARIOS_DIR_PATH, args.filter))
+    if not scenarios:
+        print(f"ERROR: no scenarios found in {SCENARIOS_DIR_PATH}")
+        exit(2)
+    no_of_workers = max(min(args.workers, len(scenarios)), 1)
+    Path(LOGS_DIR_PATH).mkdir(parents=True, exist_ok=True)
+    if args.simulator:
+        start_simulator(args.simulator_slot_length, args.simulator_epoch_length)
+    deleted_runs = artifact_store.gc(keep_runs=args.keep_runs)
+    if deleted_runs:
+        print(f"Deleted the work directories of {len(deleted_runs)} old scenario run(s)")
+    if args.key_stock:
+        print(f"Added {key_factory.fill_stock(args.key_stock)} key pairs to the key stock")
+    if os.environ.get(TX_BODY_BUILDER_ENV_VAR) == "native":
+        # the scenarios use the native tx body encoder only if it writes the golden bodies (see tx_body.py)
+        print(f"Checking the native tx body encoder against the golden tx bodies in {GOLDEN_DIR_PATH}")
+        try:
+            mismatches = check_golden_files()
+            if mismatches:
+                print(f"WARNING: the native tx bodies differ for: {mismatches}; the scenarios use 'build-raw'")
+        except FileNotFoundError as e:
+            print(f"WARNING: {e}; the scenarios use 'build-raw'")
+
+    wallets_queue = queue.Queue()
+    if no_of_workers == 1:
+        # a single worker can use user1 directly
+        wallets = [None]
+        faucets = [(get_user1_address(), USER1_SKEY_FILE_PATH)]
+    else:
+        wallets = [get_worker_wallet(worker_no) for worker_no in range(no_of_workers)]
+        fund_worker_wallets(wallets, args.funds_per_worker)
+        faucets = [(wallet["address"], wallet["skey"]) for wallet in wallets]
+    if args.faucet_utxos > 1:
+        # 1 split tx for each faucet, submitted back-to-back
+        for tx_id in [split_faucet(address, skey_file, args.faucet_utxos) for address, skey_file in faucets]:
+            wait_for_tx(tx_id)
+    else:
+        # a pool left by a previous run might contain utxos that were spent since then
+        for address, _ in faucets:
+            FaucetPool(address).remove()
+    for wallet in wallets:
+        wallets_queue.put(wallet)
+
+    print(f"Running {len(scenarios)} scenarios with {no_of_workers} worker(s): {scenarios}")
+    start = monotonic()
+    with ThreadPoolExecutor(max_workers=no_of_workers) as executor:
+        results = list(executor.map(lambda s: run_scenario(s, wallets_queue, args.timeout), scenarios))
+    total_duration = monotonic() - start
+
+    print(f"======================== Results ({round(total_duration, 1)} seconds) ========================")
+    for scenario, exit_code, duration in results:
+        print(f"{scenario:<75} {exit_code:>4} {round(duration, 1):>10}")
+    failed = [scenario for scenario, exit_code, _ in results if exit_code != 0]
+    print(f"Scenarios with errors: {failed}")
+    exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from fractions import Fraction
+from pathlib import Path
+from time import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)))
+
+from e2e_scenarios.cbor import encode, decode, CBORTag, RawCBOR
+from e2e_scenarios.constants import TESTNET_MAGIC, GENESIS_FILE_PATH, ADDRESSES_DIR_PATH, POOL_1_DIR_PATH
+from e2e_scenarios.ed25519 import get_public_key, sign, SEED_SIZE
+from e2e_scenarios.transaction import read_text_envelope, write_text_envelope, get_tx_body_cbor, calculate_tx_id
+from e2e_scenarios.tx_body import encode_tx_body, parse_tx_in, parse_tx_out, parse_withdrawal
+from simulator.ledger import Ledger, LedgerError, DEFAULT_PROTOCOL_PARAMS, hash28, hash32, \
+    encode_address, format_stake_fraction, ENTERPRISE_ADDRESS_HEADER, BASE_ADDRESS_HEADER, \
+    REWARD_ADDRESS_HEADER, CERT_STAKE_REGISTRATION, CERT_STAKE_DELEGATION, CERT_POOL_REGISTRATION, \
+    CERT_POOL_RETIREMENT, TX_FEE
+
+# Stand-in for the 'cardano-cli shelley' subcommands used by the e2e scripts, backed by an in-memory ledger (see
+# ledger.py) with an accelerated virtual clock, so the scenarios can run offline in seconds (and the overhead of
+# the scripts can be measured without the node latency); the output formats are the ones parsed by utils.py
+# Usage:
+#   ./python_scripts/simulator/cardano_cli.py init --slot-length 0.02 --epoch-length 100
+#   CARDANO_CLI=./python_scripts/simulator/cardano_cli.py ./python_scripts/run_scenarios.py
+# (or simply: ./python_scripts/run_scenarios.py --simulator)
+
+DEFAULT_SLOT_LENGTH = 0.02
+DEFAULT_EPOCH_LENGTH = 100
+GENESIS_USER1_FUNDS = 10 ** 12
+# stake of the pool(s) started with the cluster (node-pool1)
+GENESIS_POOL_STAKE = 10 ** 12
+CBOR_BYTES_32_PREFIX = bytes([0x58, 0x20])
+
+# options without value
+FLAGS = ("--has-metadata", "--whole-utxo", "--force")
+
+
+class UsageError(RuntimeError):
+    pass
+
+
+def parse_options(args):
+    # ["--tx-in", "a", "--tx-in", "b", "--fee", "1"] -> {"--tx-in": ["a", "b"], "--fee": ["1"]}
+    options = {}
+    index = 0
+    while index < len(args):
+        option = args[index]
+        if not option.startswith("--"):
+            raise UsageError(f"Invalid argument `{option}'")
+        if option in FLAGS:
+            options.setdefault(option, []).append(True)
+            index += 1
+            continue
+        if index + 1 >= len(args):
+            raise UsageError(f"The option `{option}' expects an argument.")
+        options.setdefault(option, []).append(args[index + 1])
+        index += 2
+    return options
+
+
+def get_option(options, name, default=None):
+    if name in options:
+        return options[name][-1]
+    if default is None:
+        raise UsageError(f"Missing: {name}")
+    return default
+
+
+def write_output(options, output):
+    # --out-file or stdout
+    if "--out-file" in options:
+        with open(get_option(options, "--out-file"), 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+# ---------------------------------------------------------------------- keys
+def write_key_pair(options, skey_type, vkey_type, description, skey=None):
+    skey = skey or os.urandom(SEED_SIZE)
+    write_text_envelope(get_option(options, "--signing-key-file"), skey_type,
+                        CBOR_BYTES_32_PREFIX + skey, description.replace("Key", "Signing Key"))
+    write_text_envelope(get_option(options, "--verification-key-file"), vkey_type,
+                        CBOR_BYTES_32_PREFIX + get_public_key(skey), description.replace("Key", "Verification Key"))
+    return skey
+
+
+def read_key(file_path):
+    # the raw key from a .skey/.vkey file
+    _, cbor_data = read_text_envelope(file_path)
+    return decode(cbor_data)
+
+
+def read_vkey_hash(file_path):
+    return hash28(read_key(file_path))
+
+
+def address_key_gen(options):
+    write_key_pair(options, "PaymentSigningKeyShelley_ed25519", "PaymentVerificationKeyShelley_ed25519", "Payment Key")
+
+
+def address_build(options):
+    payment_hash = read_vkey_hash(get_option(options, "--payment-verification-key-file"))
+    if "--stake-verification-key-file" in options:
+        stake_hash = read_vkey_hash(get_option(options, "--stake-verification-key-file"))
+        address_bytes = bytes([BASE_ADDRESS_HEADER]) + payment_hash + stake_hash
+    else:
+        address_bytes = bytes([ENTERPRISE_ADDRESS_HEADER]) + payment_hash
+    write_output(options, encode_address(address_bytes))
+
+
+def stake_address_key_gen(options):
+    write_key_pair(options, "StakeSigningKeyShelley_ed25519", "StakeVerificationKeyShelley_ed25519", "Stake Key")
+
+
+def get_reward_account(stake_vkey_file):
+    return bytes([REWARD_ADDRESS_HEADER]) + read_vkey_hash(stake_vkey_file)
+
+
+def stake_address_build(options):
+    write_output(options, encode_address(get_reward_account(get_option(options, "--stake-verification-key-file"))))
+
+
+def write_certificate(options, certificate, description):
+    write_text_envelope(get_option(options, "--out-file"), "CertificateShelley", encode(certificate), description)
+
+
+def stake_address_registration_certificate(options):
+    stake_hash = read_vkey_hash(get_option(options, "--stake-verification-key-file"))
+    write_certificate(options, [CERT_STAKE_REGISTRATION, [0, stake_hash]], "Stake Address Registration Certificate")
+
+
+def stake_address_delegation_certificate(options):
+    stake_hash = read_vkey_hash(get_option(options, "--stake-verification-key-file"))
+    pool_hash = read_vkey_hash(get_option(options, "--cold-verification-key-file"))
+    write_certificate(options, [CERT_STAKE_DELEGATION, [0, stake_hash], pool_hash],
+                      "Stake Address Delegation Certificate")
+
+
+def stake_address_delegate(options):
+    # not implemented by cardano-cli either (see delegate_stake_address)
+    print(f"runStakeAddressCmd: StakeKeyDelegate {' '.join(sum(options.values(), []))}")
+
+
+def node_key_gen(options):
+    write_key_pair(options, "StakePoolSigningKey_ed25519", "StakePoolVerificationKey_ed25519", "Stake Pool Operator Key")
+    write_text_envelope(get_option(options, "--operational-certificate-issue-counter"),
+                        "NodeOperationalCertificateIssueCounter", encode(0), "Next certificate issue number: 0")
+
+
+def node_key_gen_random(options, key_type, skey_size):
+    # KES/VRF keys: only their files are needed by the scripts
+    write_text_envelope(get_option(options, "--signing-key-file"), f"{key_type}SigningKey",
+                        encode(os.urandom(skey_size)), f"{key_type} Signing Key")
+    write_text_envelope(get_option(options, "--verification-key-file"), f"{key_type}VerificationKey",
+                        encode(os.urandom(32)), f"{key_type} Verification Key")
+
+
+def node_issue_op_cert(options):
+    counter_file = get_option(options, "--operational-certificate-issue-counter")
+    counter = decode(read_text_envelope(counter_file)[1])
+    kes_vkey = read_key(get_option(options, "--hot-kes-verification-key-file"))
+    cold_skey = read_key(get_option(options, "--cold-signing-key-file"))
+    kes_period = int(get_option(options, "--kes-period"))
+    signature = sign(cold_skey, kes_vkey + counter.to_bytes(8, "big") + kes_period.to_bytes(8, "big"))
+    write_text_envelope(get_option(options, "--out-file"), "NodeOperationalCertificate",
+                        encode([[kes_vkey, counter, kes_period, signature], get_public_key(cold_skey)]))
+    write_text_envelope(counter_file, "NodeOperationalCertificateIssueCounter", encode(counter + 1),
+                        f"Next certificate issue number: {counter + 1}")
+
+
+def stake_pool_id(options):
+    print(read_vkey_hash(get_option(options, "--verification-key-file")).hex())
+
+
+def stake_pool_metadata_hash(options):
+    with open(get_option(options, "--pool-metadata-file"), 'rb') as file:
+        print(hash32(file.read()).hex())
+
+
+def stake_pool_registration_certificate(options):
+    margin = Fraction(get_option(options, "--pool-margin")).limit_denominator(10 ** 6)
+    metadata = None
+    if "--metadata-url" in options:
+        metadata = [get_option(options, "--metadata-url"), bytes.fromhex(get_option(options, "--metadata-hash"))]
+    owners = [read_vkey_hash(owner_file) for owner_file in options.get("--pool-owner-stake-verification-key-file", [])]
+    certificate = [CERT_POOL_REGISTRATION,
+                   read_vkey_hash(get_option(options, "--cold-verification-key-file")),
+                   hash32(read_key(get_option(options, "--vrf-verification-key-file"))),
+                   int(get_option(options, "--pool-pledge")),
+                   int(get_option(options, "--pool-cost")),
+                   CBORTag(30, [margin.numerator, margin.denominator]),
+                   get_reward_account(get_option(options, "--pool-reward-account-verification-key-file")),
+                   owners, [], metadata]
+    write_certificate(options, certificate, "Stake Pool Registration Certificate")
+
+
+def stake_pool_deregistration_certificate(options):
+    pool_hash = read_vkey_hash(get_option(options, "--cold-verification-key-file"))
+    write_certificate(options, [CERT_POOL_RETIREMENT, pool_hash, int(get_option(options, "--epoch"))],
+                      "Stake Pool Retirement Certificate")
+
+
+# ---------------------------------------------------------------------- transactions
+def read_certificates(options):
+    return [read_text_envelope(cert_file)[1] for cert_file in options.get("--certificate-file", [])]
+
+
+def transaction_build_raw(options):
+    # same encoder as the scripts (see tx_body.py); like cardano-cli, an option that can't be parsed is an error
+    try:
+        tx_outs = [parse_tx_out(tx_out) for tx_out in options.get("--tx-out", [])]
+        tx_ins = [parse_tx_in(tx_in) for tx_in in options.get("--tx-in", [])]
+        withdrawals = [parse_withdrawal(withdrawal) for withdrawal in options.get("--withdrawal", [])]
+    except ValueError as e:
+        raise UsageError(str(e))
+    body = encode_tx_body(tx_ins, tx_outs, int(get_option(options, "--fee")), int(get_option(options, "--ttl")),
+                         read_certificates(options), withdrawals)
+    write_text_envelope(get_option(options, "--out-file"), "TxUnsignedShelley", body)
+
+
+def get_signed_tx(body_cbor, skeys):
+    witnesses = []
+    for skey in skeys:
+        witness = [get_public_key(skey), sign(skey, hash32(body_cbor))]
+        if witness not in witnesses:
+            witnesses.append(witness)
+    return encode([RawCBOR(body_cbor), {0: witnesses} if witnesses else {}, None])
+
+
+def transaction_sign(options):
+    _, body_cbor = read_text_envelope(get_option(options, "--tx-body-file"))
+    body = decode(body_cbor)
+    if body.get(TX_FEE, 0) < 0:
+        raise UsageError(f"Negative Coin: {body[TX_FEE]}")
+    skeys = [read_key(skey_file) for skey_file in options.get("--signing-key-file", [])]
+    write_text_envelope(get_option(options, "--out-file"), "TxSignedShelley", get_signed_tx(body_cbor, skeys))
+
+
+def transaction_calculate_min_fee(options, ledger):
+    # the size of a tx with dummy inputs/outputs (enterprise addresses) and the real certificates + witnesses
+    tx_ins = [[bytes(32), tx_ix] for tx_ix in range(int(get_option(options, "--tx-in-count")))]
+    tx_outs = [[bytes(29), 0] for _ in range(int(get_option(options, "--tx-out-count")))]
+    body = encode_tx_body(tx_ins, tx_outs, 0, int(get_option(options, "--ttl")), read_certificates(options))
+    skeys = [read_key(skey_file) for skey_file in options.get("--signing-key-file", [])]
+    tx_size = len(get_signed_tx(body, skeys))
+    with open(get_option(options, "--protocol-params-file"), 'r') as file:
+        protocol_params = json.loads(file.read())
+    print(f"Estimated fee: {protocol_params['minFeeA'] * tx_size + protocol_params['minFeeB']}")
+
+
+def transaction_txid(options):
+    tx_file = get_option(options, "--tx-body-file", "") or get_option(options, "--tx-file")
+    print(calculate_tx_id(get_tx_body_cbor(read_text_envelope(tx_file)[1])))
+
+
+def transaction_submit(options, ledger):
+    _, tx_cbor = read_text_envelope(get_option(options, "--tx-file"))
+    ledger.submit(tx_cbor)
+    print("Transaction successfully submitted.")
+
+
+# ---------------------------------------------------------------------- queries
+def query_tip(options, ledger):
+    slot_no, block_no = ledger.get_tip()
+    block_hash = hash32(slot_no.to_bytes(8, "big")).hex()
+    print(f"Tip (SlotNo {{unSlotNo = {slot_no}}}) (ShelleyHash {{unShelleyHash = {block_hash}}}) "
+          f"(BlockNo {{unBlockNo = {block_no}}})")
+
+
+def query_utxo(options, ledger):
+    utxos = ledger.get_utxos(options.get("--address"))
+    if "--out-file" in options:
+        write_output(options, json.dumps({tx_in: {"address": address, "amount": amount}
+                                          for tx_in, (address, amount) in utxos.items()}, indent=4))
+        return
+    lines = [f"{'TxHash':>38}{'TxIx':>34}{'Lovelace':>16}", "-" * 94]
+    for tx_in, (_, amount) in utxos.items():
+        tx_hash, tx_ix = tx_in.split("#")
+        lines.append(f"{tx_hash}     {tx_ix:>4}     {amount:>14}")
+    print("\n".join(lines))
+
+
+def query_protocol_parameters(options, ledger):
+    write_output(options, json.dumps(ledger.state["protocol_params"], indent=4))
+
+
+def query_stake_distribution(options, ledger):
+    lines = [f"{'PoolId':>26}{'Stake frac':>46}", "-" * 82]
+    for pool_id, fraction in ledger.get_stake_distribution().items():
+        lines.append(f"{pool_id}   {format_stake_fraction(fraction)}")
+    print("\n".join(lines))
+
+
+def query_ledger_state(options, ledger):
+    write_output(options, json.dumps(ledger.get_ledger_state()))
+
+
+def query_stake_address_info(options, ledger):
+    write_output(options, json.dumps(ledger.get_stake_address_info(get_option(options, "--address")), indent=4))
+
+
+# ---------------------------------------------------------------------- init
+def init(options):
+    # a new "cluster": genesis file (read by chain_params.py), user1 keys + funds and the genesis pool
+    ledger = Ledger()
+    if os.path.isfile(GENESIS_FILE_PATH) and not ledger.exists() and "--force" not in options:
+        raise UsageError(f"{GENESIS_FILE_PATH} exists and it was not created by the simulator (use --force)")
+    slot_length = float(get_option(options, "--slot-length", DEFAULT_SLOT_LENGTH))
+    epoch_length = int(get_option(options, "--epoch-length", DEFAULT_EPOCH_LENGTH))
+    system_start = time()
+
+    Path(ADDRESSES_DIR_PATH).mkdir(parents=True, exist_ok=True)
+    Path(POOL_1_DIR_PATH).mkdir(parents=True, exist_ok=True)
+    user1_skey = write_key_pair({"--signing-key-file": [os.path.join(ADDRESSES_DIR_PATH, "user1.skey")],
+                                 "--verification-key-file": [os.path.join(ADDRESSES_DIR_PATH, "user1.vkey")]},
+                                "PaymentSigningKeyShelley_ed25519", "PaymentVerificationKeyShelley_ed25519",
+                                "Payment Key")
+    user1_address = encode_address(bytes([ENTERPRISE_ADDRESS_HEADER]) + hash28(get_public_key(user1_skey)))
+    with open(os.path.join(ADDRESSES_DIR_PATH, "user1.addr"), 'w') as file:
+        file.write(user1_address)
+
+    genesis = {
+        "systemStart": datetime.fromtimestamp(system_start, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "slotLength": slot_length,
+        "epochLength": epoch_length,
+        "slotsPerKESPeriod": 129600,
+        "maxKESEvolutions": 60,
+        "networkMagic": int(TESTNET_MAGIC),
+        "protocolParams": DEFAULT_PROTOCOL_PARAMS,
+    }
+    with open(GENESIS_FILE_PATH, 'w') as file:
+        file.write(json.dumps(genesis, indent=4))
+    genesis_pool_id = hash28(os.urandom(SEED_SIZE)).hex()
+    ledger.create(system_start, slot_length, epoch_length, dict(DEFAULT_PROTOCOL_PARAMS),
+                  [(user1_address, GENESIS_USER1_FUNDS)], {genesis_pool_id: GENESIS_POOL_STAKE})
+    print(f"Simulator initialized: slot length {slot_length} s, epoch length {epoch_length} slots; "
+          f"user1: {user1_address} ({GENESIS_USER1_FUNDS} Lovelace)")
+
+
+# (group, command) -> (function, needs the ledger)
+COMMANDS = {
+    ("address", "key-gen"): (address_key_gen, False),
+    ("address", "build"): (address_build, False),
+    ("stake-address", "key-gen"): (stake_address_key_gen, False),
+    ("stake-address", "build"): (stake_address_build, False),
+    ("stake-address", "registration-certificate"): (stake_address_registration_certificate, False),
+    ("stake-address", "delegation-certificate"): (stake_address_delegation_certificate, False),
+    ("stake-address", "delegate"): (stake_address_delegate, False),
+    ("node", "key-gen"): (node_key_gen, False),
+    ("node", "key-gen-KES"): (lambda options: node_key_gen_random(options, "KES", 608), False),
+    ("node", "key-gen-VRF"): (lambda options: node_key_gen_random(options, "VRF", 64), False),
+    ("node", "issue-op-cert"): (node_issue_op_cert, False),
+    ("stake-pool", "id"): (stake_pool_id, False),
+    ("stake-pool", "metadata-hash"): (stake_pool_metadata_hash, False),
+    ("stake-pool", "registration-certificate"): (stake_pool_registration_certificate, False),
+    ("stake-pool", "deregistration-certificate"): (stake_pool_deregistration_certificate, False),
+    ("transaction", "build-raw"): (transaction_build_raw, False),
+    ("transaction", "sign"): (transaction_sign, False),
+    ("transaction", "txid"): (transaction_txid, False),
+    ("transaction", "calculate-min-fee"): (transaction_calculate_min_fee, True),
+    ("transaction", "submit"): (transaction_submit, True),
+    ("query", "tip"): (query_tip, True),
+    ("query", "utxo"): (query_utxo, True),
+    ("query", "protocol-parameters"): (query_protocol_parameters, True),
+    ("query", "stake-distribution"): (query_stake_distribution, True),
+    ("query", "ledger-state"): (query_ledger_state, True),
+    ("query", "stake-address-info"): (query_stake_address_info, True),
+}
+
+
+def main(argv):
+    if argv[:1] == ["init"]:
+        command, needs_ledger, options = init, False, argv[1:]
+    elif argv[:1] == ["shelley"] and tuple(argv[1:3]) in COMMANDS:
+        (command, needs_ledger), options = COMMANDS[tuple(argv[1:3])], argv[3:]
+    else:
+        print(f"Invalid command: {' '.join(argv)}", file=sys.stderr)
+        return 1
+    try:
+        options = parse_options(options)
+        if not needs_ledger:
+            command(options)
+            return 0
+        ledger = Ledger()
+        if not ledger.exists():
+            print("shelley: Network.Socket.connect: <socket: 11>: does not exist (No such file or directory)"
+                  " - the simulator was not initialized (run: cardano_cli.py init)", file=sys.stderr)
+            return 1
+        with ledger.transaction():
+            command(options, ledger)
+    except (UsageError, LedgerError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
@@ -0,0 +1,446 @@
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from time import time
+
+from e2e_scenarios.bech32 import decode as bech32_decode, encode as bech32_encode
+from e2e_scenarios.cbor import decode_item, split_array, CBORTag
+from e2e_scenarios.constants import SIMULATOR_LEDGER_FILE_PATH
+from e2e_scenarios.transaction import calculate_tx_id
+
+# In-memory (JSON file) Shelley ledger used by the cardano-cli simulator: utxo, stake keys, stake pools,
+# deposits, mempool and a virtual clock (every slot has a block; the txs submitted in a slot are included into
+# the block of the next slot); the ledger rules are a subset of the Shelley ones (the ones hit by the scenarios)
+
+KEY_HASH_SIZE = 28
+ENTERPRISE_ADDRESS_HEADER = 0x60
+BASE_ADDRESS_HEADER = 0x00
+REWARD_ADDRESS_HEADER = 0xe0
+ADDRESS_HRP = "addr_test"
+STAKE_ADDRESS_HRP = "stake_test"
+
+# certificate types (first element of the certificate CBOR array)
+CERT_STAKE_REGISTRATION = 0
+CERT_STAKE_DEREGISTRATION = 1
+CERT_STAKE_DELEGATION = 2
+CERT_POOL_REGISTRATION = 3
+CERT_POOL_RETIREMENT = 4
+
+# the tx body map keys
+TX_INPUTS, TX_OUTPUTS, TX_FEE, TX_TTL, TX_CERTIFICATES, TX_WITHDRAWALS = 0, 1, 2, 3, 4, 5
+
+DEFAULT_PROTOCOL_PARAMS = {
+    "minFeeA": 44,
+    "minFeeB": 155381,
+    "maxTxSize": 16384,
+    "maxBlockBodySize": 65536,
+    "maxBlockHeaderSize": 1100,
+    "keyDeposit": 400000,
+    "poolDeposit": 5000000,
+    "eMax": 18,
+    "nOpt": 100,
+    "minUTxOValue": 0,
+    "minPoolCost": 0,
+    "decentralisationParam": 0.7,
+    "protocolVersion": {"major": 0, "minor": 0},
+}
+
+
+class LedgerError(RuntimeError):
+    # printed by the simulator like the node errors: ApplyTxError [LedgerFailure (...)]
+    pass
+
+
+def hash28(data):
+    return hashlib.blake2b(data, digest_size=KEY_HASH_SIZE).digest()
+
+
+def hash32(data):
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def decode_address(address):
+    # bech32 (addr_test1.., stake_test1..) or hex -> bytes
+    try:
+        return bech32_decode(address)[1]
+    except ValueError:
+        return bytes.fromhex(address)
+
+
+def encode_address(address_bytes):
+    hrp = STAKE_ADDRESS_HRP if address_bytes[0] >> 4 in (0xe, 0xf) else ADDRESS_HRP
+    return bech32_encode(hrp, address_bytes)
+
+
+def get_payment_key_hash(address):
+    # None for the script addresses (not used here)
+    address_bytes = decode_address(address)
+    if address_bytes[0] >> 4 in (0, 6):
+        return address_bytes[1:1 + KEY_HASH_SIZE].hex()
+    return None
+
+
+def format_stake_fraction(fraction):
+    # like the Haskell 'show' of a Double in scientific notation: 1.000e0, 2.5e-2
+    mantissa, exponent = f"{fraction:.3e}".split("e")
+    return f"{mantissa}e{int(exponent)}"
+
+
+def parse_tx(tx_cbor):
+    # [body, witnesses, metadata] (signed) or the body map (unsigned) -> (body_raw, body, witnesses)
+    if tx_cbor[0] >> 5 == 5:
+        body, _ = decode_item(tx_cbor)
+        return tx_cbor, body, {}
+    body_raw, witnesses_raw = split_array(tx_cbor)[:2]
+    return body_raw, decode_item(body_raw)[0], decode_item(witnesses_raw)[0]
+
+
+def _margin_to_float(margin):
+    if isinstance(margin, CBORTag):
+        numerator, denominator = margin.value
+        return numerator / denominator
+    return float(margin)
+
+
+def certificate_to_json(certificate):
+    # the certificate CBOR (decoded) -> JSON friendly dict stored in the ledger file
+    cert_type = certificate[0]
+    if cert_type in (CERT_STAKE_REGISTRATION, CERT_STAKE_DEREGISTRATION):
+        return {"type": cert_type, "stake_key_hash": certificate[1][1].hex()}
+    if cert_type == CERT_STAKE_DELEGATION:
+        return {"type": cert_type, "stake_key_hash": certificate[1][1].hex(), "pool_id": certificate[2].hex()}
+    if cert_type == CERT_POOL_REGISTRATION:
+        metadata = certificate[9]
+        return {"type": cert_type, "pool_id": certificate[1].hex(), "vrf": certificate[2].hex(),
+                "pledge": certificate[3], "cost": certificate[4], "margin": _margin_to_float(certificate[5]),
+                "reward_account": certificate[6].hex(), "owners": [owner.hex() for owner in certificate[7]],
+                "metadata": None if metadata is None else {"url": metadata[0], "hash": metadata[1].hex()}}
+    if cert_type == CERT_POOL_RETIREMENT:
+        return {"type": cert_type, "pool_id": certificate[1].hex(), "epoch": certificate[2]}
+    raise LedgerError(f"ApplyTxError [DecoderErrorUnknownCertificate {cert_type}]")
+
+
+class Ledger:
+    # the state is a JSON file changed under an exclusive lock (every simulated cardano-cli call is a process)
+    def __init__(self, ledger_file_path=SIMULATOR_LEDGER_FILE_PATH):
+        self.ledger_file_path = ledger_file_path
+        self.lock_file_path = ledger_file_path + ".lock"
+        self.state = None
+
+    def exists(self):
+        return os.path.isfile(self.ledger_file_path)
+
+    def create(self, system_start, slot_length, epoch_length, protocol_params, genesis_utxos, genesis_pools):
+        # genesis_utxos = [(address, amount)]; genesis_pools = {pool_id: stake}
+        self.state = {
+            "system_start": system_start,
+            "slot_length": slot_length,
+            "epoch_length": epoch_length,
+            "protocol_params": protocol_params,
+            "utxo": {},
+            "mempool": [],
+            "stake_keys": {},
+            "pools": {},
+            # {epoch: {pool_id: stake}}, taken at the beginning of each epoch
+            "snapshots": {},
+            "last_epoch": 0,
+            "last_slot": 0,
+            "block_no": 0,
+            "deposited": 0,
+            "fees": 0,
+        }
+        for address, amount in genesis_utxos:
+            self.state["utxo"][hash32(decode_address(address)).hex() + "#0"] = [address, amount]
+        for pool_id, stake in genesis_pools.items():
+            self.state["pools"][pool_id] = {"params": {"pledge": stake, "cost": 0, "margin": 0.0, "owners": [],
+                                                       "rewardAccount": None, "vrf": None, "metadata": None},
+                                            "stake": stake, "retiring": None}
+        self.state["snapshots"]["0"] = self._get_active_pools_stake()
+        Path(os.path.dirname(self.ledger_file_path)).mkdir(parents=True, exist_ok=True)
+        self._save()
+
+    def _save(self):
+        tmp_file_path = self.ledger_file_path + ".tmp"
+        with open(tmp_file_path, 'w') as file:
+            file.write(json.dumps(self.state))
+        os.replace(tmp_file_path, self.ledger_file_path)
+
+    @contextmanager
+    def transaction(self):
+        # loads the state, applies the blocks created since the last call and saves the state at the end
+        with open(self.lock_file_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.ledger_file_path, 'r') as file:
+                    self.state = json.loads(file.read())
+                self._catch_up()
+                yield self
+                self._save()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------ clock
+    def get_current_slot(self):
+        return max(int((time() - self.state["system_start"]) / self.state["slot_length"]), 0)
+
+    def get_epoch(self, slot_no):
+        return slot_no // self.state["epoch_length"]
+
+    def get_tip(self):
+        return self.state["last_slot"], self.state["block_no"]
+
+    def _catch_up(self):
+        # every slot has a block: the mempool txs are included into the block following their submission slot
+        current_slot = self.get_current_slot()
+        mempool = self.state["mempool"]
+        while mempool and mempool[0]["slot"] < current_slot:
+            entry = mempool.pop(0)
+            self._process_epoch_boundaries(self.get_epoch(entry["slot"] + 1))
+            self._apply(entry["tx"], entry["tx_id"])
+        self._process_epoch_boundaries(self.get_epoch(current_slot))
+        if current_slot > self.state["last_slot"]:
+            self.state["block_no"] += current_slot - self.state["last_slot"]
+            self.state["last_slot"] = current_slot
+
+    def _process_epoch_boundaries(self, epoch_no):
+        while self.state["last_epoch"] < epoch_no:
+            self.state["last_epoch"] += 1
+            new_epoch = self.state["last_epoch"]
+            for pool_id, pool in list(self.state["pools"].items()):
+                if pool["retiring"] is not None and pool["retiring"] <= new_epoch:
+                    self._retire_pool(pool_id, pool)
+            self.state["snapshots"][str(new_epoch)] = self._get_active_pools_stake()
+            # only the last snapshots are needed
+            for old_epoch in [e for e in self.state["snapshots"] if int(e) < new_epoch - 2]:
+                del self.state["snapshots"][old_epoch]
+
+    def _retire_pool(self, pool_id, pool):
+        # the deposit goes back to the reward account of the pool (when registered)
+        deposit = pool.get("deposit", 0)
+        self.state["deposited"] -= deposit
+        reward_account = pool["params"].get("rewardAccount")
+        if reward_account and reward_account[2:] in self.state["stake_keys"]:
+            self.state["stake_keys"][reward_account[2:]]["reward"] += deposit
+        for stake_key in self.state["stake_keys"].values():
+            if stake_key["delegation"] == pool_id:
+                stake_key["delegation"] = None
+        del self.state["pools"][pool_id]
+
+    def _get_active_pools_stake(self):
+        # the stake of a pool is its pledge (the delegated utxo stake is not simulated)
+        return {pool_id: pool["stake"] for pool_id, pool in self.state["pools"].items()}
+
+    def get_stake_distribution(self):
+        # the distribution used in the current epoch is the one taken at the beginning of the previous epoch
+        current_epoch = self.get_epoch(self.state["last_slot"])
+        snapshot = self.state["snapshots"].get(str(current_epoch - 1)) or self.state["snapshots"].get("0", {})
+        total_stake = sum(snapshot.values())
+        return {pool_id: stake / total_stake for pool_id, stake in snapshot.items()} if total_stake else {}
+
+    # ------------------------------------------------------------------ queries
+    def get_utxos(self, addresses=None):
+        # {tx_in: [address, amount]}
+        if addresses is None:
+            return dict(self.state["utxo"])
+        return {tx_in: tx_out for tx_in, tx_out in self.state["utxo"].items() if tx_out[0] in addresses}
+
+    def get_stake_address_info(self, stake_address):
+        stake_key = self.state["stake_keys"].get(decode_address(stake_address)[1:].hex())
+        if stake_key is None:
+            return {}
+        delegation = stake_key["delegation"]
+        return {stake_address: {"delegation": delegation, "rewardAccountBalance": stake_key["reward"]}}
+
+    def get_ledger_state(self):
+        # the subset of the 'query ledger-state' JSON used by the scripts
+        pools = self.state["pools"]
+        return {
+            "esAccountState": {"_treasury": 0, "_reserves": 0},
+            "esLState": {
+                "_utxoState": {
+                    "_utxo": {tx_in: {"address": address, "amount": amount}
+                              for tx_in, (address, amount) in self.state["utxo"].items()},
+                    "_deposited": self.state["deposited"],
+                    "_fees": self.state["fees"],
+                },
+                "_delegationState": {
+                    "_dstate": {
+                        "_stkCreds": {key_hash: 0 for key_hash in self.state["stake_keys"]},
+                        "_delegations": {key_hash: stake_key["delegation"]
+                                         for key_hash, stake_key in self.state["stake_keys"].items()
+                                         if stake_key["delegation"]},
+                        "_rewards": {key_hash: stake_key["reward"]
+                                     for key_hash, stake_key in self.state["stake_keys"].items()},
+                    },
+                    "_pstate": {
+                        "_pParams": {pool_id: dict(pool["params"], publicKey=pool_id) for pool_id, pool in pools.items()},
+                        "_retiring": {pool_id: pool["retiring"] for pool_id, pool in pools.items()
+                                      if pool["retiring"] is not None},
+                    },
+                },
+            },
+        }
+
+    # ------------------------------------------------------------------ transactions
+    def get_min_fee(self, tx_size):
+        return self.state["protocol_params"]["minFeeA"] * tx_size + self.state["protocol_params"]["minFeeB"]
+
+    def submit(self, tx_cbor):
+        # validates the tx against the ledger + mempool and adds it to the mempool; returns the tx id
+        body_raw, body, witnesses = parse_tx(tx_cbor)
+        tx_id = calculate_tx_id(body_raw)
+        tx = {
+            "inputs": [f"{tx_hash.hex()}#{tx_ix}" for tx_hash, tx_ix in body.get(TX_INPUTS, [])],
+            "outputs": [[encode_address(address), amount] for address, amount in body.get(TX_OUTPUTS, [])],
+            "fee": body.get(TX_FEE, 0),
+            "ttl": body.get(TX_TTL, 0),
+            "certificates": [certificate_to_json(certificate) for certificate in body.get(TX_CERTIFICATES, [])],
+            "withdrawals": {address.hex(): amount for address, amount in body.get(TX_WITHDRAWALS, {}).items()},
+            "witnesses": [hash28(vkey).hex() for vkey, _ in witnesses.get(0, [])],
+        }
+        self._validate(tx, len(tx_cbor))
+        self.state["mempool"].append({"tx_id": tx_id, "slot": self.get_current_slot(), "tx": tx})
+        return tx_id
+
+    def _get_spent_by_mempool(self):
+        return set(tx_in for entry in self.state["mempool"] for tx_in in entry["tx"]["inputs"])
+
+    def _validate(self, tx, tx_size):
+        # the failures are reported all at once, in the node format
+        utxo_failures, utxow_failures, delegs_failures, delpl_failures = [], [], [], []
+        params = self.state["protocol_params"]
+        current_slot = self.get_current_slot()
+        spent_by_mempool = self._get_spent_by_mempool()
+
+        bad_inputs = [tx_in for tx_in in tx["inputs"]
+                      if tx_in not in self.state["utxo"] or tx_in in spent_by_mempool]
+        if bad_inputs or not tx["inputs"]:
+            utxo_failures.append(f"BadInputsUTxO (fromList [{', '.join(bad_inputs)}])")
+        if tx["ttl"] < current_slot:
+            utxo_failures.append(f"ExpiredUTxO (SlotNo {{unSlotNo = {tx['ttl']}}}) "
+                                 f"(SlotNo {{unSlotNo = {current_slot}}})")
+        if tx_size > params["maxTxSize"]:
+            utxo_failures.append(f"MaxTxSizeUTxO {tx_size} {params['maxTxSize']}")
+        min_fee = self.get_min_fee(tx_size)
+        if tx["fee"] < min_fee:
+            utxo_failures.append(f"FeeTooSmallUTxO (Coin {min_fee}) (Coin {tx['fee']})")
+
+        deposits, refunds = self._get_deposits_and_refunds(tx, delegs_failures, delpl_failures)
+        consumed = sum(self.state["utxo"][tx_in][1] for tx_in in tx["inputs"] if tx_in in self.state["utxo"])
+        consumed += refunds + sum(tx["withdrawals"].values())
+        produced = sum(amount for _, amount in tx["outputs"]) + tx["fee"] + deposits
+        if consumed != produced:
+            utxo_failures.append(f"ValueNotConservedUTxO (Coin {consumed}) (Coin {produced})")
+        if any(amount < params["minUTxOValue"] for _, amount in tx["outputs"]):
+            utxo_failures.append("OutputTooSmallUTxO")
+
+        missing_witnesses = sorted(self._get_required_witnesses(tx) - set(tx["witnesses"]))
+        if missing_witnesses:
+            utxow_failures.append(f"MissingVKeyWitnessesUTXOW (WitHashes (fromList [{', '.join(missing_witnesses)}]))")
+
+        failures = [f"UtxowFailure (UtxoFailure ({failure}))" for failure in utxo_failures]
+        failures += [f"UtxowFailure ({failure})" for failure in utxow_failures]
+        failures += [f"DelegsFailure ({failure})" for failure in delegs_failures]
+        failures += [f"DelegsFailure (DelplFailure ({failure}))" for failure in delpl_failures]
+        if failures:
+            raise LedgerError("ApplyTxError [" + ", ".join(f"LedgerFailure ({failure})" for failure in failures) + "]")
+
+    def _get_deposits_and_refunds(self, tx, delegs_failures, failures):
+        # delegs_failures: the failures of the DELEGS rule itself; failures: the ones of its DELPL sub-rule
+        params = self.state["protocol_params"]
+        current_epoch = self.get_epoch(self.get_current_slot())
+        stake_keys = set(self.state["stake_keys"])
+        pools = set(self.state["pools"])
+        deposits, refunds = 0, 0
+        for certificate in tx["certificates"]:
+            cert_type = certificate["type"]
+            if cert_type == CERT_STAKE_REGISTRATION:
+                if certificate["stake_key_hash"] in stake_keys:
+                    failures.append(f"DelegFailure (StakeKeyAlreadyRegisteredDELEG "
+                                    f"(KeyHashObj (KeyHash {certificate['stake_key_hash']})))")
+                stake_keys.add(certificate["stake_key_hash"])
+                deposits += params["keyDeposit"]
+            elif cert_type == CERT_STAKE_DEREGISTRATION:
+                if certificate["stake_key_hash"] not in stake_keys:
+                    failures.append("DelegFailure (StakeKeyNotRegisteredDELEG)")
+                stake_keys.discard(certificate["stake_key_hash"])
+                refunds += params["keyDeposit"]
+            elif cert_type == CERT_STAKE_DELEGATION:
+                if certificate["stake_key_hash"] not in stake_keys:
+                    failures.append("DelegFailure (StakeDelegationImpossibleDELEG)")
+                if certificate["pool_id"] not in pools:
+                    # checked by DELEGS (not DELEG) before the certificate is passed to DELPL
+                    delegs_failures.append(f"DelegateeNotRegisteredDELEG (KeyHash {certificate['pool_id']})")
+            elif cert_type == CERT_POOL_REGISTRATION:
+                if certificate["pool_id"] not in pools:
+                    deposits += params["poolDeposit"]
+                pools.add(certificate["pool_id"])
+                if certificate["cost"] < params["minPoolCost"]:
+                    failures.append(f"PoolFailure (StakePoolCostTooLowPOOL (Coin {certificate['cost']}))")
+            elif cert_type == CERT_POOL_RETIREMENT:
+                if certificate["pool_id"] not in pools:
+                    failures.append(f"PoolFailure (StakePoolNotRegisteredOnKeyPOOL (KeyHash {certificate['pool_id']}))")
+                if not current_epoch < certificate["epoch"] <= current_epoch + params["eMax"]:
+                    failures.append(f"PoolFailure (StakePoolRetirementWrongEpochPOOL {current_epoch} "
+                                    f"{certificate['epoch']} {current_epoch + params['eMax']})")
+        return deposits, refunds
+
+    def _get_required_witnesses(self, tx):
+        required = set()
+        for tx_in in tx["inputs"]:
+            if tx_in in self.state["utxo"]:
+                key_hash = get_payment_key_hash(self.state["utxo"][tx_in][0])
+                if key_hash:
+                    required.add(key_hash)
+        for certificate in tx["certificates"]:
+            if certificate["type"] in (CERT_STAKE_DEREGISTRATION, CERT_STAKE_DELEGATION):
+                required.add(certificate["stake_key_hash"])
+            elif certificate["type"] == CERT_POOL_REGISTRATION:
+                required.add(certificate["pool_id"])
+                required.update(certificate["owners"])
+            elif certificate["type"] == CERT_POOL_RETIREMENT:
+                required.add(certificate["pool_id"])
+        for reward_account in tx["withdrawals"]:
+            required.add(reward_account[2:])
+        return required
+
+    def _apply(self, tx, tx_id):
+        params = self.state["protocol_params"]
+        if any(tx_in not in self.state["utxo"] for tx_in in tx["inputs"]):
+            # can't happen: the mempool inputs are checked at submission
+            return
+        for tx_in in tx["inputs"]:
+            del self.state["utxo"][tx_in]
+        for tx_ix, (address, amount) in enumerate(tx["outputs"]):
+            self.state["utxo"][f"{tx_id}#{tx_ix}"] = [address, amount]
+        self.state["fees"] += tx["fee"]
+        for reward_account, amount in tx["withdrawals"].items():
+            self.state["stake_keys"][reward_account[2:]]["reward"] -= amount
+
+        for certificate in tx["certificates"]:
+            cert_type = certificate["type"]
+            if cert_type == CERT_STAKE_REGISTRATION:
+                self.state["stake_keys"][certificate["stake_key_hash"]] = {"delegation": None, "reward": 0}
+                self.state["deposited"] += params["keyDeposit"]
+            elif cert_type == CERT_STAKE_DEREGISTRATION:
+                self.state["stake_keys"].pop(certificate["stake_key_hash"], None)
+                self.state["deposited"] -= params["keyDeposit"]
+            elif cert_type == CERT_STAKE_DELEGATION:
+                self.state["stake_keys"][certificate["stake_key_hash"]]["delegation"] = certificate["pool_id"]
+            elif cert_type == CERT_POOL_REGISTRATION:
+                pool = self.state["pools"].get(certificate["pool_id"])
+                if pool is None:
+                    pool = {"deposit": params["poolDeposit"], "retiring": None}
+                    self.state["deposited"] += params["poolDeposit"]
+                    self.state["pools"][certificate["pool_id"]] = pool
+                pool["stake"] = certificate["pledge"]
+                pool["retiring"] = None
+                pool["params"] = {"pledge": certificate["pledge"], "cost": certificate["cost"],
+                                  "margin": certificate["margin"], "owners": certificate["owners"],
+                                  "rewardAccount": certificate["reward_account"], "vrf": certificate["vrf"],
+                                  "metadata": certificate["metadata"]}
+            elif cert_type == CERT_POOL_RETIREMENT:
+                self.state["pools"][certificate["pool_id"]]["retiring"] = certificate["epoch"]
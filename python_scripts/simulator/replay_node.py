@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import socket
+import sys
+from threading import Lock, Thread
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)))
+
+from e2e_scenarios.cbor import decode_item, CBORDecodeError
+from e2e_scenarios.constants import NODE_SOCKET_PATH
+from e2e_scenarios.ouroboros import MuxReader, NodeClientError, encode_segments, NODE_RECORDING_FILE_ENV_VAR
+
+# Stand-in for the node socket that replays recorded node-to-client messages (handshake, chain-sync intersection,
+# local-state-query, local-tx-submission), so the native clients can be tested without a node
+# the recording is the JSONL file written by the clients when E2E_NODE_RECORDING_FILE is set (see ouroboros.py):
+# {"protocol": id, "request": cbor hex, "reply": cbor hex or null}; a request recorded many times gets its replies
+# in the recorded order (the last one is repeated); an unknown request closes the connection
+# Usage:
+#   ./python_scripts/simulator/replay_node.py --recording e2e-tests-directory/node-recording.jsonl
+
+
+def load_recording(recording_file_path):
+    # {(protocol id, request cbor): [reply cbor or None, ...]}
+    replies = {}
+    with open(recording_file_path, 'r') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            reply = None if entry["reply"] is None else bytes.fromhex(entry["reply"])
+            replies.setdefault((entry["protocol"], bytes.fromhex(entry["request"])), []).append(reply)
+    return replies
+
+
+class ReplayNode:
+    def __init__(self, socket_path, replies):
+        self.socket_path = socket_path
+        self.replies = replies
+        # how many times each request was answered
+        self.counters = {}
+        self._lock = Lock()
+
+    def _get_reply(self, protocol_id, request):
+        replies = self.replies.get((protocol_id, request))
+        if replies is None:
+            return False, None
+        with self._lock:
+            count = self.counters.get((protocol_id, request), 0)
+            self.counters[(protocol_id, request)] = count + 1
+        return True, replies[min(count, len(replies) - 1)]
+
+    def _serve(self, connection):
+        reader = MuxReader(connection)
+        buffers = {}
+        try:
+            while True:
+                protocol_id, payload = reader.read_segment()
+                buffers[protocol_id] = buffers.get(protocol_id, b"") + payload
+                while buffers[protocol_id]:
+                    try:
+                        end = decode_item(buffers[protocol_id])[1]
+                    except (CBORDecodeError, IndexError):
+                        # incomplete message
+                        break
+                    request, buffers[protocol_id] = buffers[protocol_id][:end], buffers[protocol_id][end:]
+                    found, reply = self._get_reply(protocol_id, request)
+                    if not found:
+                        print(f"WARNING: request not found in the recording (protocol {protocol_id}): {request.hex()}")
+                        return
+                    if reply is not None:
+                        connection.sendall(encode_segments(protocol_id, reply, responder=True))
+        except (NodeClientError, OSError):
+            pass
+        finally:
+            connection.close()
+
+    def run(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen()
+        print(f"Replaying {sum(len(r) for r in self.replies.values())} recorded replies on {self.socket_path}")
+        try:
+            while True:
+                connection, _ = server.accept()
+                Thread(target=self._serve, args=(connection,), daemon=True).start()
+        finally:
+            server.close()
+            os.remove(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded node-to-client messages on a Unix socket")
+    parser.add_argument("--recording", default=os.environ.get(NODE_RECORDING_FILE_ENV_VAR),
+                        help=f"JSONL file written by the clients with {NODE_RECORDING_FILE_ENV_VAR} set")
+    parser.add_argument("--socket", default=NODE_SOCKET_PATH, help="path of the socket to create")
+    args = parser.parse_args()
+    if not args.recording:
+        print("ERROR: no recording file (--recording)")
+        exit(2)
+    ReplayNode(args.socket, load_recording(args.recording)).run()
+
+
+if __name__ == "__main__":
+    main()
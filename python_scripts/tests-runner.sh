@@ -11,14 +11,10 @@ tests_dir_path=python_scripts/e2e_scenarios
 
 echo "======================== test-runner.sh ========================" 2>&1 | tee -a $output_log_filepath
 
-# List of test scripts to run:
+# All the test scripts from $tests_dir_path are run in parallel by run_scenarios.py
+# (logs of each test in $root/logs; "$test:$exit_code" lines in $tests_results_filepath)
+# Extra arguments are passed to run_scenarios.py (ex: --workers 4 --timeout 3600)
 
-
-tests=$(ls -1 $tests_dir_path | grep test.py)
-
-for test in $tests; do
-    ./$tests_dir_path/$test 2>&1 | tee -a $output_log_filepath
-    echo "$test:${PIPESTATUS[0]}" >> $tests_results_filepath
-done
+python3 python_scripts/run_scenarios.py "$@" 2>&1 | tee -a $output_log_filepath
 
 #tmux kill-server